@@ -13,9 +13,23 @@ except ImportError:
 import ecodata.panel_utils  # noqa
 import ecodata.plotting  # noqa
 from ecodata.datasets import *  # noqa
+from ecodata.collection import (
+    DatasetCollection,  # noqa
+    open_collection,  # noqa
+    open_gridded_dataset,  # noqa
+)
+from ecodata.pyramid_utils import (
+    build_pyramid,  # noqa
+    open_pyramid,  # noqa
+)
+from ecodata.regrid_utils import regrid  # noqa
 from ecodata.raster_utils import (
+    RasterStack,  # noqa
     grib2nc,  # noqa
+    grib2nc_batch,  # noqa
+    convert_batch,  # noqa
     geotif2nc,  # noqa
+    open_raster_stack,  # noqa
 )
 from ecodata.functions import (
     bbox2poly,  # noqa
@@ -37,12 +51,16 @@ from ecodata.functions import (
 from ecodata.xr_tools import (
     coarsen_dataset,  # noqa
     detect_varnames,  # noqa
+    encoding_policy,  # noqa
     get_time_res,  # noqa
     groupby_multi_time,  # noqa
     groupby_poly_time,  # noqa
     resample_time,  # noqa
+    resample_time_weighted,  # noqa
     select_spatial,  # noqa
+    spatial_mask,  # noqa
     select_time_cond,  # noqa
     select_time_range,  # noqa
     thin_dataset,  # noqa
+    write_dataset,  # noqa
 )
@@ -1,10 +1,56 @@
+import argparse
+
 import panel as pn
 
+from ecodata.app import config
+from ecodata.app.cache import get_server_cache, preload
+from ecodata.app.cluster import shutdown_cluster, start_cluster
+
 # all registered apps need to be imported to the same folder
 # as the applications is imported from. this is because
 # when the apps dict is imported, then it imports each app,
 # which registers them
 from ecodata.app.apps import applications
 
+
+def parse_args(args=None):
+    parser = argparse.ArgumentParser(prog="python -m ecodata.app", description="Serve the ecodata apps")
+    parser.add_argument("--port", type=int, default=5006, help="Port of the server, by default 5006")
+    parser.add_argument(
+        "--preload",
+        nargs="+",
+        default=[],
+        metavar="PATH",
+        help="Gridded datasets and track files (.csv) loaded into the shared cache at server start",
+    )
+    parser.add_argument(
+        "--cache-memory",
+        type=float,
+        default=config.CACHE_MEMORY_BUDGET / 2**30,
+        help=f"Memory budget of the shared cache, in GiB, by default {config.CACHE_MEMORY_BUDGET / 2**30:g}",
+    )
+    parser.add_argument("--workers", type=int, default=None, help="Number of dask workers, by default from the CPUs")
+    parser.add_argument("--threads-per-worker", type=int, default=None, help="Threads of each dask worker")
+    parser.add_argument(
+        "--memory-limit",
+        default=None,
+        help=f"Memory limit of each dask worker (e.g. 4GiB), by default {config.DASK_MEMORY_LIMIT}",
+    )
+    parser.add_argument("--spill-dir", default=None, help="Directory where the dask workers spill data to disk")
+    return parser.parse_args(args)
+
+
 if __name__ == "__main__":
-    pn.serve({url: view for url, view in applications.items()}, port=5006)
+    args = parse_args()
+    get_server_cache().max_bytes = int(args.cache_memory * 2**30)
+    start_cluster(
+        n_workers=args.workers,
+        threads_per_worker=args.threads_per_worker,
+        memory_limit=args.memory_limit,
+        local_directory=args.spill_dir,
+    )
+    try:
+        preload(args.preload)
+        pn.serve({url: view for url, view in applications.items()}, port=args.port)
+    finally:
+        shutdown_cluster()
@@ -11,14 +11,37 @@ import panel as pn
 import param
 import xarray as xr
 from panel.reactive import ReactiveHTML, Viewable
-from dask.diagnostics import ProgressBar, Callback
 
 import ecodata as eco
+from ecodata.chunking import rechunk_for
 from ecodata.panel_utils import param_widget, register_view, try_catch, rename_param_widgets
-from ecodata.plotting import plot_avg_timeseries, plot_gridded_data, GriddedPlotWithSlider
-from ecodata.xr_tools import detect_varnames, set_time_encoding_modis
+from ecodata.plotting import (
+    GriddedPlotWithSlider,
+    SpatialMeanCache,
+    data_version,
+    plot_avg_timeseries,
+    plot_gridded_data,
+)
+from ecodata.pyramid_utils import is_pyramid
+from ecodata.xr_tools import COMPRESSION_LEVELS, detect_varnames, get_time_index, set_time_encoding_modis
+from ecodata.app.cache import open_gridded_dataset_cached
+from ecodata.app.jobs import JobExecutor, load
+from ecodata.app.pipeline import Pipeline
 from ecodata.app.models import SimpleDashboardCard, FileSelector
 from ecodata.app.config import DEFAULT_TEMPLATE
+from dask.base import tokenize
+
+
+def filter_dataset(ds, timevar, date_range, time_cond, poly=None, invert=False):
+    """
+    Time and spatial filters of the explorer, as a pipeline step
+    """
+    ds = eco.select_time_range(ds, time_var=timevar, start_time=date_range[0], end_time=date_range[1])
+    ds = eco.select_time_cond(ds, time_var=timevar, **time_cond)
+    if poly is not None:
+        ds = eco.select_spatial(ds, boundary=poly, invert=invert)
+    return ds
+
 
 class HTML_WidgetBox(ReactiveHTML):
     object = param.ClassSelector(class_=Viewable)
@@ -33,34 +56,6 @@ class HTML_WidgetBox(ReactiveHTML):
         super().__init__(object=object, **params)
 
 
-class Progress(Callback):
-    def __init__(self, *args, parent, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.parent = parent
-
-    def _start_state(self, dsk, state):
-        """runs on start of tasks"""
-        self.parent.progress_percent.visible = True
-        self.parent.progress_indicator.visible = True
-
-    def _pretask(self, key, dsk, state):
-        """runs before every series of tasks"""
-        s = state
-        ndone = len(s["finished"])
-        ntasks = sum(len(s[k]) for k in ["ready", "waiting", "running"]) + ndone
-        ratio = min(ndone / ntasks if ntasks else 0, 1)
-        self.value = round(ratio * 100)
-        # self.parent.view[3][2].value = self.value
-        self.parent.progress_indicator.value = self.value
-        self.parent.progress_percent.value  = f"{self.value}%"
-
-    def _finish(self, *args, **kwargs):
-        """runs after all tasks are done"""
-        self.parent.progress_indicator.value = 100
-        self.parent.progress_percent.value = "100%"
-    #     super()._finish(*args, **kwargs)
-
-
 class GriddedDataExplorer(param.Parameterized):
 
     filein = param_widget(FileSelector(constrain_path=False, expanded=True))
@@ -112,6 +107,12 @@ class GriddedDataExplorer(param.Parameterized):
     revert_filters = param_widget(
         pn.widgets.Button(button_type="primary", name="Revert filters")
     )
+    undo_button = param_widget(
+        pn.widgets.Button(button_type="default", name="Undo")
+    )
+    redo_button = param_widget(
+        pn.widgets.Button(button_type="default", name="Redo")
+    )
 
     # Time resampling
     rs_time_quantity = param_widget(
@@ -128,6 +129,9 @@ class GriddedDataExplorer(param.Parameterized):
     space_coarsen_factor = param_widget(
         pn.widgets.FloatInput(name="Window size", value=2.0, step=1, start=2, end=100)
     )
+    space_area_weighted = param_widget(
+        pn.widgets.Checkbox(name="Area-weighted mean", value=False)
+    )
     rs_space = param_widget(
         pn.widgets.Button(button_type="primary", name="Resample space",)
     )
@@ -153,8 +157,22 @@ class GriddedDataExplorer(param.Parameterized):
     save_ds = param_widget(
         pn.widgets.Button(name="Save dataset", button_type="primary")
     )
+    save_compression = param_widget(
+        pn.widgets.Select(options={"zlib": "zlib", "zstd": "zstd", "None": None}, value="zlib", name="Compression")
+    )
+    save_complevel = param_widget(
+        pn.widgets.IntSlider(name="Compression level", start=1, end=9, value=4)
+    )
+    save_pack = param_widget(
+        pn.widgets.Checkbox(name="Pack to 16-bit integers", value=False)
+    )
+
+    # Cancel the running and queued jobs
+    cancel_jobs = param_widget(
+        pn.widgets.Button(name="Cancel jobs", button_type="warning")
+    )
 
-    # Progress bar and percent for saving
+    # Progress bar and percent of the running job
     progress_indicator = param.ClassSelector(pn.indicators.Progress)
     progress_percent = param.ClassSelector(pn.widgets.StaticText)
 
@@ -181,6 +199,30 @@ class GriddedDataExplorer(param.Parameterized):
     def __init__(self, **params):
         super().__init__(**params)
 
+        # Dataset produced by the last time/space filters (or load/revert) and the spatial mask that was applied, so
+        # the time series can be taken from the cached spatial aggregates of the raw dataset
+        self.filter_state = None
+        self.spatial_mean = None
+        self.spatial_mean_key = None
+        # Multiscale pyramid of the loaded file, if it is one
+        self.pyramid = None
+
+        # Filters and processing are steps of a pipeline with memoized results, so changing a step only recomputes
+        # the steps after it, and undo/revert reuse earlier results. applied_steps are the steps of self.ds.
+        self.pipeline = Pipeline()
+        self.applied_steps = ()
+        self.masks = {}
+
+        # Long-running operations run as background jobs, queued in order. The result of a job is applied to self.ds
+        # when the job is polled, if the pipeline wasn't changed again in the meantime. The jobs compute on the
+        # server's cluster once the session's client is set (see view).
+        self.jobs = JobExecutor()
+        self.jobs_callback = None
+        self.jobs_pane = pn.pane.Markdown("No jobs", sizing_mode="stretch_width")
+
+        # Handle to the loaded dataset in the server cache, shared with the other sessions
+        self.ds_handle = None
+
         # Reset names for panel widgets
         rename_param_widgets(
             self,
@@ -197,15 +239,22 @@ class GriddedDataExplorer(param.Parameterized):
                 "selection_type",
                 "update_filters",
                 "revert_filters",
+                "undo_button",
+                "redo_button",
                 "rs_time_quantity",
                 "rs_time_unit",
                 "rs_time",
                 "space_coarsen_factor",
+                "space_area_weighted",
                 "rs_space",
                 "group_selector",
                 "calculate_stats",
                 "output_fname",
                 "save_ds",
+                "save_compression",
+                "save_complevel",
+                "save_pack",
+                "cancel_jobs",
                 "stats_fname",
                 "save_stats",
             ]
@@ -234,7 +283,7 @@ class GriddedDataExplorer(param.Parameterized):
         self.hour_selection = pn.widgets.MultiChoice()
 
 
-        # Progress bar and percent for saving
+        # Progress bar and percent of the running job
         self.progress_indicator = pn.indicators.Progress(name='Progress', height=20, bar_color="success", visible=False)
         self.progress_percent = pn.widgets.StaticText(name="Progress", value="0%", visible=False)
 
@@ -252,11 +301,17 @@ class GriddedDataExplorer(param.Parameterized):
         self.rs_time_widgets = pn.Card(
             pn.Row(self.rs_time_quantity, self.rs_time_unit, self.rs_time), title="Time resampling"
         )
-        self.rs_space_widgets = pn.Card(pn.Row(self.space_coarsen_factor, self.rs_space), title="Spatial resolution")
+        self.rs_space_widgets = pn.Card(
+            pn.Row(self.space_coarsen_factor, self.space_area_weighted, self.rs_space), title="Spatial resolution"
+        )
 
         self.groupby_widgets = pn.Card(pn.Row(self.group_selector), self.calculate_stats, title="Calculate statistics")
 
-        self.outfile_widgets = pn.Card(pn.Row(self.output_fname, self.save_ds, self.progress_percent, self.progress_indicator), title="Output file")
+        self.outfile_widgets = pn.Card(
+            pn.Row(self.output_fname, self.save_ds, self.progress_percent, self.progress_indicator),
+            pn.Row(self.save_compression, self.save_complevel, self.save_pack),
+            title="Output file",
+        )
 
         self.save_stats_widgets[:] = [pn.Row(self.stats_fname, self.save_stats), self.stats]
 
@@ -271,15 +326,28 @@ class GriddedDataExplorer(param.Parameterized):
                     self.selection_type,
                     self.update_filters,
                     self.revert_filters,
+                    pn.Row(self.undo_button, self.redo_button),
                 ),
             ),
             (
                 "Processing Options",
                 pn.Column(
-                    self.rs_time_quantity, self.rs_time_unit, self.rs_time, self.space_coarsen_factor, self.rs_space
+                    self.rs_time_quantity,
+                    self.rs_time_unit,
+                    self.rs_time,
+                    self.space_coarsen_factor,
+                    self.space_area_weighted,
+                    self.rs_space,
                 ),
             ),
-            active=[0, 1],
+            (
+                "Jobs",
+                pn.Column(
+                    self.jobs_pane,
+                    self.cancel_jobs,
+                ),
+            ),
+            active=[0, 1, 2],
             sizing_mode="stretch_width"
         )
 
@@ -318,6 +386,7 @@ class GriddedDataExplorer(param.Parameterized):
     def update_ds_varnames(self):
         if self.ds_raw is not None and self.zvar.value is not None:
             self.ds = self.ds_raw[self.vars_to_save.value].copy()
+            self.set_pipeline_source(self.ds)
             self.update_selection_widgets()
 
     @try_catch()
@@ -333,10 +402,11 @@ class GriddedDataExplorer(param.Parameterized):
 
             self.time_cond_args = []
             tabs = pn.Tabs()
+            time_index = get_time_index(self.ds_raw, self.timevar.value)
 
             def update_time_selection(time_str, range_widget, selection_widget):
                 time_unit = time_str.replace(" ", "")
-                time_values = pd.unique(getattr(self.ds_raw[self.timevar.value].dt, time_unit))
+                time_values = time_index.unique(time_unit)
                 if len(time_values) > 1:
 
                     range_check = pn.widgets.Checkbox(value=True, name="Range Values")
@@ -398,6 +468,7 @@ class GriddedDataExplorer(param.Parameterized):
                 tabs,
                 self.update_filters,
                 self.revert_filters,
+                pn.Row(self.undo_button, self.redo_button),
             ]
 
     @try_catch()
@@ -405,8 +476,15 @@ class GriddedDataExplorer(param.Parameterized):
     def load_data(self):
         if self.filein.value:
             self.status_text = "Loading data..."
-
-            ds_raw = xr.open_dataset(self.filein.value, chunks='auto').unify_chunks()
+            self.jobs.cancel_all()
+
+            handle = open_gridded_dataset_cached(self.filein.value, chunks="auto")
+            if self.ds_handle is not None:
+                self.ds_handle.release()
+            self.ds_handle = handle
+            # unify_chunks returns a new dataset, so the shared dataset isn't modified below
+            ds_raw = handle.value.unify_chunks()
+            self.pyramid = eco.open_pyramid(self.filein.value) if is_pyramid(self.filein.value) else None
             matched_vars, ds_vars, unmatched_vars = detect_varnames(ds_raw)
             self.timevar.options = list(ds_vars)
             self.latvar.options = list(ds_vars)
@@ -427,6 +505,7 @@ class GriddedDataExplorer(param.Parameterized):
             self.status_text = "File loaded"
             self.ds_raw = ds_raw
             self.ds = ds_raw.copy()
+            self.set_pipeline_source(self.ds)
         else:
             self.status_text = "File path must be selected first!"
 
@@ -445,29 +524,29 @@ class GriddedDataExplorer(param.Parameterized):
     @param.depends("update_filters.value", watch=True)
     def update_ds(self):
         if self.ds_raw is not None:
-            self.status_text = "Updating..."
-            _ds = eco.select_time_range(
-                self.ds_raw,
-                time_var=self.timevar.value,
-                start_time=self.date_range.value[0],
-                end_time=self.date_range.value[1],
-            )
-            kwargs = {}
+            time_cond = {}
             for time_unit, range_widget, selection_widget in zip(
                 self.time_units, self.range_widgets, self.selection_widgets
             ):
                 if time_unit in self.time_cond_args:
                     if getattr(self.selection_widgets[selection_widget], "visible"):
-                        kwargs[selection_widget] = getattr(self.selection_widgets[selection_widget], "value")
+                        time_cond[selection_widget] = getattr(self.selection_widgets[selection_widget], "value")
                     if getattr(self.range_widgets[range_widget], "visible"):
                         range_values = getattr(self.range_widgets[range_widget], "value")
-                        kwargs[range_widget] = (int(range_values[0]), int(range_values[1]))
-            _ds = eco.select_time_cond(_ds, time_var=self.timevar.value, **kwargs)
+                        time_cond[range_widget] = (int(range_values[0]), int(range_values[1]))
 
-            if self.poly is not None:
-                _ds = eco.select_spatial(_ds, boundary=self.poly, invert=self.selection_type.value)
-            self.ds = _ds
-            self.status_text = "Applied updated filters"
+            # The filters are always the first step, so changing them recomputes the processing after them
+            self.pipeline.set_step(
+                "filters",
+                filter_dataset,
+                index=0,
+                timevar=self.timevar.value,
+                date_range=tuple(self.date_range.value),
+                time_cond=time_cond,
+                poly=self.poly,
+                invert=self.selection_type.value,
+            )
+            self.run_pipeline("Updating filters", "Applied updated filters")
         else:
             self.status_text = "No dataset available"
 
@@ -477,33 +556,182 @@ class GriddedDataExplorer(param.Parameterized):
         # self.date_range.values = (self.ds_raw.time.min().values, self.ds_raw.time.max().values)
         self.update_selection_widgets()
         if self.ds_raw is not None:
-            self.ds = self.ds_raw.copy()
-            self.status_text = "Filters reverted"
+            self.pipeline.reset()
+            self.run_pipeline("Reverting", "Filters reverted")
+
+    @try_catch()
+    @param.depends("undo_button.value", watch=True)
+    def undo(self):
+        if self.pipeline.undo():
+            self.run_pipeline("Undoing", "Undone")
+        else:
+            self.status_text = "Nothing to undo"
+
+    @try_catch()
+    @param.depends("redo_button.value", watch=True)
+    def redo(self):
+        if self.pipeline.redo():
+            self.run_pipeline("Redoing", "Redone")
+        else:
+            self.status_text = "Nothing to redo"
 
     @try_catch(msg="Resampling failed.")
     @param.depends("rs_time.value", watch=True)
     def resample_time(self):
-        self.status_text = "Resampling..."
-        self.ds = eco.resample_time(
-            self.ds,
+        self.pipeline.add_step(
+            "resample_time",
+            eco.resample_time,
             timevar=self.timevar.value,
             time_quantity=self.rs_time_quantity.value,
             time_unit=self.rs_time_unit.value,
         )
-        self.status_text = "Dataset resampled"
+        self.run_pipeline("Resampling", "Dataset resampled", error_msg="Resampling failed.")
 
     @try_catch(msg="Aggregation failed.")
     @param.depends("rs_space.value", watch=True)
     def resample_space(self):
-        self.status_text = "Calculating..."
-        self.ds = eco.coarsen_dataset(
-            self.ds,
+        self.pipeline.add_step(
+            "resample_space",
+            eco.coarsen_dataset,
             n_window={
                 self.latvar.value: int(self.space_coarsen_factor.value),
                 self.lonvar.value: int(self.space_coarsen_factor.value),
             },
+            area_weighted=self.space_area_weighted.value,
+            latvar=self.latvar.value,
         )
-        self.status_text = "Aggregation completed."
+        self.run_pipeline("Calculating", "Aggregation completed.", error_msg="Aggregation failed.")
+
+    def set_pipeline_source(self, ds):
+        self.jobs.cancel_all()
+        self.pipeline.set_source(ds)
+        self.applied_steps = ()
+        self.masks = {}
+        self.filter_state = (ds, None)
+
+    def run_pipeline(self, name, msg, error_msg="Error... Check options and try again"):
+        """
+        Compute the current steps of the pipeline in a background job, and show the result once it's loaded. Steps
+        that are cached aren't computed again, so undoing a change is quick.
+        """
+        steps = self.pipeline.steps
+
+        def on_done(result):
+            if not self.pipeline.is_current(steps):
+                # The pipeline changed while this was computed, and the newer steps will be shown instead
+                return
+            ds, filter_state, masks, spatial_mean = result
+            self.masks.update(masks)
+            if spatial_mean is not None:
+                self.set_spatial_mean(*spatial_mean)
+            filters_changed = self.filter_state is None or any(
+                new is not old for new, old in zip(filter_state, self.filter_state)
+            )
+            self.applied_steps = steps
+            self.filter_state = filter_state
+            self.ds = ds
+            if filters_changed:
+                self.update_plot_view()
+            self.status_text = msg
+
+        self.submit_job(name, self.compute_pipeline, steps, on_done=on_done, error_msg=error_msg)
+
+    def compute_pipeline(self, steps):
+        """
+        Dataset after the steps of the pipeline, and the dataset after the filters with the mask they applied.
+
+        Runs in a job: the results of the steps are loaded by the pipeline (within its memory budget), and so is the
+        spatial mean of the plotted variable if only filters were applied, so showing the result doesn't compute
+        anything on the thread of the session. The job doesn't modify the state of the session: the new masks and
+        spatial mean aggregates are returned, and applied by the session once the job is done.
+        """
+        ds = self.pipeline.compute(steps)
+        filter_steps = steps[:1] if steps and steps[0].name == "filters" else ()
+        key = self.filters_mask_key(steps)
+        masks = {}
+        mask = self.masks.get(key)
+        if key is not None and mask is None:
+            params = filter_steps[0].params
+            mask = masks[key] = eco.spatial_mask(self.ds_raw, boundary=params["poly"], invert=params["invert"]).values
+        filter_state = (self.pipeline.compute(filter_steps), mask)
+        spatial_mean = None
+        if filter_state[0] is ds and self.can_plot():
+            # The aggregates of the current spatial mean are updated, or those of a new one if the variable changed
+            mean_key = self.get_spatial_mean_key()
+            cache = self.spatial_mean if self.spatial_mean_key == mean_key else None
+            if cache is None:
+                cache = self.new_spatial_mean()
+            spatial_mean = (mean_key, cache, cache.aggregates(mask))
+        return ds, filter_state, masks, spatial_mean
+
+    def filters_mask_key(self, steps):
+        """
+        Key of the spatial mask applied by the filters, or None if they don't have one
+        """
+        if not steps or steps[0].name != "filters" or steps[0].params["poly"] is None:
+            return None
+        return tokenize(self.pipeline.source_token, steps[0].params["poly"], steps[0].params["invert"])
+
+    def submit_job(self, name, func, *args, on_done, error_msg="Error... Check options and try again"):
+        """
+        Run a function as a background job, and follow the jobs until they are all finished.
+        """
+
+        def on_error(e):
+            self.status_text = error_msg
+
+        job = self.jobs.submit(name, func, *args, on_done=on_done, on_error=on_error)
+        self.status_text = f"{name}..." if len(self.jobs.active_jobs) == 1 else f"{name} (queued)..."
+        if self.jobs_callback is None:
+            self.jobs_callback = pn.state.add_periodic_callback(self.poll_jobs, period=500)
+        self.update_jobs_view()
+        return job
+
+    def poll_jobs(self):
+        """
+        Apply the results of the finished jobs, and show the progress of the running one.
+        """
+        active_jobs = self.jobs.poll()
+        self.update_jobs_view()
+        if not active_jobs and self.jobs_callback is not None:
+            self.jobs_callback.stop()
+            self.jobs_callback = None
+
+    def update_jobs_view(self):
+        running = self.jobs.running_job
+        progress = round(100 * running.progress) if running is not None and running.progress is not None else None
+        self.progress_indicator.visible = self.progress_percent.visible = running is not None
+        self.progress_indicator.value = progress if progress is not None else -1
+        self.progress_percent.value = f"{progress}%" if progress is not None else ""
+
+        rows = [
+            f"| {job.name} | {job.status} | {'' if job.progress is None else f'{round(100 * job.progress)}%'} |"
+            for job in self.jobs.jobs[::-1]
+        ]
+        header = ["| Job | Status | Progress |", "|---|---|---|"]
+        self.jobs_pane.object = "\n".join(header + rows) if rows else "No jobs"
+
+    @param.depends("save_compression.value", watch=True)
+    def update_complevel_bounds(self):
+        """
+        Range of the compression level slider for the selected compression.
+        """
+        compression = self.save_compression.value
+        self.save_complevel.disabled = compression is None
+        if compression is not None:
+            low, high = COMPRESSION_LEVELS[compression]
+            self.save_complevel.value = min(max(self.save_complevel.value, low), high)
+            self.save_complevel.param.update(start=low, end=high)
+
+    @try_catch()
+    @param.depends("cancel_jobs.value", watch=True)
+    def cancel_all_jobs(self):
+        if self.jobs.active_jobs:
+            self.jobs.cancel_all()
+            # The cancelled changes are discarded, so the pipeline goes back to the dataset that is shown
+            self.pipeline.restore(self.applied_steps)
+            self.status_text = "Jobs cancelled"
+        self.update_jobs_view()
 
     @try_catch()
     @param.depends("status_text", watch=True)
@@ -518,30 +746,42 @@ class GriddedDataExplorer(param.Parameterized):
         self.figs_with_widget.__setitem__(1, self.ds_pane)
 
     @try_catch()
-    @param.depends("update_varnames.value", "update_filters.value","disable_plotting_button.value", "poly", watch=True)
+    @param.depends("update_varnames.value", "disable_plotting_button.value", "poly", watch=True)
     def update_plot_view(self):
         # self.ds_pane.object = self.ds
         # if self.disable_plotting_button.value:
         #     self.figs_with_widget[:] = [("Data", self.ds_pane)]
 
-        if not self.disable_plotting_button.value and all([self.timevar.value, self.latvar.value, self.lonvar.value, self.zvar.value]):
+        if self.can_plot():
             self.status_text = "Creating plot"
             width = 500
+            # The pyramid levels only have the time filters applied (by the slider), not the spatial ones
+            filtered_ds, mask = self.filter_state or (None, None)
+            use_pyramid = self.pyramid is not None and filtered_ds is self.ds and mask is None
             ds_plot = GriddedPlotWithSlider(
                 self.ds, timevar=self.timevar.value, zvar=self.zvar.value,
-                lonvar=self.lonvar.value, latvar=self.latvar.value, width=width
+                lonvar=self.lonvar.value, latvar=self.latvar.value, width=width,
+                pyramid=self.pyramid if use_pyramid else None,
             )
             # .opts(frame_width=width)
             if self.poly is not None:
                 ds_plot.fig.object = ds_plot.fig.object * gv.Path(self.poly).opts(line_color="k", line_width=2)
 
-            ds_ts_plot = plot_avg_timeseries(
-                self.ds.reindex_like(self.ds_raw),
-                x=self.lonvar.value,
-                y=self.latvar.value,
-                z=self.zvar.value,
-                time=self.timevar.value,
-            )
+            if filtered_ds is self.ds:
+                # Only filters were applied, so the mean of the filtered data can be updated from the raw dataset
+                ds_ts_plot = plot_avg_timeseries(
+                    self.ds,
+                    time=self.timevar.value,
+                    spatial_mean=self.get_spatial_mean().update(mask),
+                )
+            else:
+                ds_ts_plot = plot_avg_timeseries(
+                    self.ds.reindex_like(self.ds_raw),
+                    x=self.lonvar.value,
+                    y=self.latvar.value,
+                    z=self.zvar.value,
+                    time=self.timevar.value,
+                )
             self.plot_col.objects = [ds_plot.fig_with_widget, ds_ts_plot]
 
             # self.figs_with_widget[:] = [
@@ -556,42 +796,76 @@ class GriddedDataExplorer(param.Parameterized):
         else:
             self.status_text = "Please specify variable names"
 
+    def can_plot(self):
+        return not self.disable_plotting_button.value and all(
+            [self.timevar.value, self.latvar.value, self.lonvar.value, self.zvar.value]
+        )
+
+    def get_spatial_mean(self):
+        """
+        Cached spatial mean of the selected variable of the raw dataset, created again if the variable changed.
+        """
+        key = self.get_spatial_mean_key()
+        if self.spatial_mean is None or self.spatial_mean_key != key:
+            self.spatial_mean = self.new_spatial_mean()
+            self.spatial_mean_key = key
+        return self.spatial_mean
+
+    def get_spatial_mean_key(self):
+        return (data_version(self.ds_raw[self.zvar.value]), self.zvar.value, self.timevar.value,
+                self.latvar.value, self.lonvar.value)
+
+    def new_spatial_mean(self):
+        return SpatialMeanCache(
+            self.ds_raw[self.zvar.value], x=self.lonvar.value, y=self.latvar.value, time=self.timevar.value
+        )
+
+    def set_spatial_mean(self, key, spatial_mean, aggregates):
+        """
+        Apply the spatial mean aggregates computed by a job, if they are still for the selected variable.
+        """
+        if key != self.get_spatial_mean_key():
+            return
+        if self.spatial_mean is not spatial_mean:
+            self.spatial_mean = spatial_mean
+            self.spatial_mean_key = key
+        spatial_mean.set_aggregates(aggregates)
+
     @try_catch()
     @param.depends("calculate_stats.value", watch=True)
     def groupby_apply(self):
-        self.status_text = "Calculating..."
-
-        select_list = self.group_selector.value
-
-        # Check if grouping by polygon
-        if "polygon" in select_list:
-            time_list = select_list.copy()
-            time_list.remove("polygon")
-            poly = self.poly.reset_index()
-            result = eco.groupby_poly_time(
-                vector_data=poly,
-                vector_var="index",
-                ds=self.ds,
-                ds_var=self.zvar.value,
-                latvar=self.latvar.value,
-                lonvar=self.lonvar.value,
-                timevar=self.timevar.value,
-                groupby_vars=time_list,
-            )
-            self.stats = result
-
-        else:
-            result = eco.groupby_multi_time(
-                ds=self.ds, var=self.zvar.value, time=self.timevar.value, groupby_vars=select_list
-            )
+        select_list = list(self.group_selector.value)
+        zvar, latvar, lonvar, timevar = self.zvar.value, self.latvar.value, self.lonvar.value, self.timevar.value
+        poly = self.poly
+        steps = self.pipeline.steps
+
+        def calculate():
+            ds = self.pipeline.compute(steps)
+            # Check if grouping by polygon
+            if "polygon" in select_list:
+                time_list = select_list.copy()
+                time_list.remove("polygon")
+                return eco.groupby_poly_time(
+                    vector_data=poly.reset_index(),
+                    vector_var="index",
+                    ds=ds,
+                    ds_var=zvar,
+                    latvar=latvar,
+                    lonvar=lonvar,
+                    timevar=timevar,
+                    groupby_vars=time_list,
+                )
+
+            result = load(eco.groupby_multi_time(ds=ds, var=zvar, time=timevar, groupby_vars=select_list))
             result = result.to_dataframe().reorder_levels(select_list).sort_index()
-            result = result[["count", "mean", "std", "min", "25%", "50%", "75%", "max"]]
-            self.stats = result
-            # self.stats_widget.value = result
+            return result[["count", "mean", "std", "min", "25%", "50%", "75%", "max"]]
 
-        self.status_text = "Calculations completed"
+        def on_done(result):
+            self.stats = result
+            self.status_text = "Calculations completed"
+            self.save_stats_widgets.objects = [pn.Row(self.stats_fname, self.save_stats), self.stats]
 
-        self.save_stats_widgets.objects = [pn.Row(self.stats_fname, self.save_stats), self.stats]
+        self.submit_job("Calculating", calculate, on_done=on_done)
 
     @try_catch(msg="File couldn't be saved.")
     @param.depends("save_stats.value", watch=True)
@@ -603,26 +877,51 @@ class GriddedDataExplorer(param.Parameterized):
     @try_catch(msg="File couldn't be saved.")
     @param.depends("save_ds.value", watch=True)
     def save_dataset(self):
-        with Progress(parent=self):
-            outfile = Path(self.output_fname.value).resolve()
+        outfile = Path(self.output_fname.value).resolve()
+        timevar = self.timevar.value
+        steps = self.pipeline.steps
+        kwargs = dict(
+            compression=self.save_compression.value,
+            complevel=self.save_complevel.value,
+            pack=self.save_pack.value,
+            timevar=timevar,
+        )
+
+        def save():
+            # Make sure dataset is rechunked before computations are triggered
+            ds = rechunk_for(self.pipeline.compute(steps), "save", timevar=timevar)
 
             # Set the time encoding to match MODIS format
-            set_time_encoding_modis(self.ds)
-            print(self.ds.time.encoding)
+            set_time_encoding_modis(ds)
 
-            # Make sure dataset is rechunked before computations are triggered
-            self.ds = self.ds.chunk(chunks='auto')
+            eco.write_dataset(ds, outfile, **kwargs)
+            return outfile
 
-            self.ds.to_netcdf(outfile)
+        def on_done(outfile):
             self.status_text = f"File saved to: {outfile}"
-        # self.progress_indicator.value = 100
+
+        self.submit_job("Saving dataset", save, on_done=on_done, error_msg="File couldn't be saved.")
+
+    def on_session_destroyed(self, session_context):
+        """
+        Stop the jobs of the session and release its dataset from the server cache.
+        """
+        self.jobs.shutdown()
+        if self.ds_handle is not None:
+            self.ds_handle.release()
+            self.ds_handle = None
 
 
 @register_view(ext_args=['floatpanel'])
 def view():
     viewer = GriddedDataExplorer()
+    if pn.state.curdoc is not None and pn.state.curdoc.session_context is not None:
+        pn.state.on_session_destroyed(viewer.on_session_destroyed)
+    # Each session gets a client of the server's cluster, which is started on first use if the server didn't
+    dashboard = SimpleDashboardCard()
+    viewer.jobs.client = dashboard.dask_client
     template = DEFAULT_TEMPLATE(
-        main=[viewer.alert, viewer.figs_with_widget, viewer.view],
+        main=[viewer.alert, viewer.figs_with_widget, viewer.view, dashboard.dask_processing_card],
         sidebar=[viewer.sidebar],
     )
     return template
@@ -3,25 +3,40 @@ from pathlib import Path
 
 import panel as pn
 import param
-from panel.io.loading import start_loading_spinner, stop_loading_spinner
 
+import ecodata as eco
 from ecodata.app.config import DEFAULT_TEMPLATE
+from ecodata.movie_utils import start_mp4_from_dataset
 from ecodata.panel_utils import (
-    make_mp4_from_frames,
+    ENCODER_PRESETS,
+    start_mp4_from_frames,
     param_widget,
     register_view,
     try_catch, rename_param_widgets,
 )
 from ecodata.app.models import FileSelector
+from ecodata.xr_tools import detect_varnames
 
 logger = logging.getLogger(__file__)
 
 
 class MovieMaker(param.Parameterized):
 
+    # Make the movie from a directory of frames, or render the frames from a dataset
+    source = param_widget(
+        pn.widgets.RadioButtonGroup(options=["Frames directory", "Dataset"], value="Frames directory", name="Source")
+    )
+
     # Frames directory
     frames_dir = param_widget(FileSelector(constrain_path=False, expanded=True))
 
+    # Dataset to render, one frame per timestep
+    dataset_file = param_widget(FileSelector(constrain_path=False, expanded=True))
+    zvar = param_widget(pn.widgets.TextInput(placeholder="Variable to plot (e.g. t2m)", name="Variable"))
+    cmap = param_widget(
+        pn.widgets.Select(options=["viridis", "magma", "coolwarm", "Greens", "Blues"], value="viridis", name="Colormap")
+    )
+
     # Output file
     output_file = param_widget(
         pn.widgets.TextInput(placeholder="Choose an output file...", value="output.mp4", name="Output file")
@@ -31,8 +46,15 @@ class MovieMaker(param.Parameterized):
         pn.widgets.EditableIntSlider(name="Frame rate", start=1, end=30, step=1, value=1, sizing_mode="fixed")
     )
 
-    # Go button
+    # Encoding speed and quality
+    preset = param_widget(pn.widgets.Select(options=list(ENCODER_PRESETS), value="Balanced", name="Encoding"))
+    crf = param_widget(
+        pn.widgets.IntSlider(name="Quality (CRF, lower is better)", start=0, end=51, step=1, value=23)
+    )
+
+    # Go and cancel buttons
     go_button = param_widget(pn.widgets.Button(name="Make movie", button_type="primary", sizing_mode="fixed"))
+    cancel_button = param_widget(pn.widgets.Button(name="Cancel", button_type="warning", sizing_mode="fixed"))
 
     # Status
     status_text = param.String("Ready...")
@@ -44,17 +66,30 @@ class MovieMaker(param.Parameterized):
         rename_param_widgets(
             self,
             [
+                "source",
                 "frames_dir",
+                "dataset_file",
+                "zvar",
+                "cmap",
                 "output_file",
                 "frame_rate",
+                "preset",
+                "crf",
                 "go_button",
+                "cancel_button",
             ]
         )
 
+        # Encoding job running in the background, and the callback following its progress. Only the progress bar
+        # shows that it's running, as a loading spinner over the widgets would also cover the cancel button.
+        self.job = None
+        self.job_callback = None
+        self.progress = pn.indicators.Progress(value=0, max=100, visible=False, sizing_mode="stretch_width")
+        self.cancel_button.disabled = True
+
         # Widget groups
-        self.movie_widgets = pn.Card(
-            self.frames_dir, self.frame_rate, self.output_file, self.go_button, title="Movie maker"
-        )
+        self.movie_widgets = pn.Card(title="Movie maker")
+        self.update_source_widgets()
 
         self.status = pn.pane.Alert(self.status_text)
 
@@ -63,32 +98,122 @@ class MovieMaker(param.Parameterized):
 
         self.alert = pn.pane.Markdown(self.status_text)
 
-        self.view = pn.Column(self.movie_widgets)
+        self.view = pn.Column(self.movie_widgets, self.progress)
 
     @try_catch()
     @param.depends("status_text", watch=True)
     def update_status_text(self):
         self.alert.object = self.status_text
 
+    @try_catch()
+    @param.depends("source.value", watch=True)
+    def update_source_widgets(self):
+        if self.source.value == "Dataset":
+            source_widgets = [self.dataset_file, self.zvar, self.cmap]
+        else:
+            source_widgets = [self.frames_dir]
+        self.movie_widgets.objects = [
+            self.source,
+            *source_widgets,
+            self.frame_rate,
+            self.preset,
+            self.crf,
+            self.output_file,
+            pn.Row(self.go_button, self.cancel_button),
+        ]
+
+    @try_catch()
+    @param.depends("preset.value", watch=True)
+    def update_crf(self):
+        self.crf.value = ENCODER_PRESETS[self.preset.value]["crf"]
+
     @try_catch()
     @param.depends("go_button.value", watch=True)
     def make_movie(self):
+        """
+        Start encoding the movie in the background, and follow its progress without blocking the server
+        """
+        if self.job is not None and self.job.running:
+            return
 
         self.status_text = "Creating movie..."
-        start_loading_spinner(self.view)
         try:
-            output_file = make_mp4_from_frames(
-                self.frames_dir.value, self.output_file.value, frame_rate=self.frame_rate.value
-            )
-            assert output_file.exists()
-            self.status_text = f"Movie saved to: {output_file}"
-
+            encoding = dict(preset=ENCODER_PRESETS[self.preset.value]["preset"], crf=self.crf.value)
+            if self.source.value == "Dataset":
+                self.job = self.make_movie_from_dataset(**encoding)
+            else:
+                self.job = start_mp4_from_frames(
+                    self.frames_dir.value, self.output_file.value, frame_rate=self.frame_rate.value, **encoding
+                )
         except Exception as e:
             msg = "Error creating movie...."
             logger.warning(msg + f":\n{e!r}")
             self.status_text = msg
-        finally:
-            stop_loading_spinner(self.view)
+            return
+
+        self.go_button.disabled = True
+        self.cancel_button.disabled = False
+        self.progress.value = 0 if self.job.progress is not None else -1
+        self.progress.visible = True
+        self.job_callback = pn.state.add_periodic_callback(self.update_progress, period=500)
+
+    @try_catch()
+    @param.depends("cancel_button.value", watch=True)
+    def cancel_movie(self):
+        if self.job is not None and self.job.running:
+            self.status_text = "Cancelling..."
+            self.job.cancel()
+
+    def update_progress(self):
+        """
+        Show the progress of the encoding job, and its result once it's finished
+        """
+        job = self.job
+        if job.progress is not None:
+            self.progress.value = int(100 * job.progress)
+        if job.running:
+            speed = f" ({job.speed})" if job.speed else ""
+            self.status_text = f"Creating movie... frame {job.frame}/{job.n_frames or '?'}{speed}"
+            return
+
+        self.job_callback.stop()
+        self.job_callback = None
+        if job.status == "done":
+            self.status_text = f"Movie saved to: {job.output_file}"
+        elif job.status == "cancelled":
+            self.status_text = "Movie cancelled"
+        else:
+            msg = "Error creating movie...."
+            logger.warning(msg + f":\n{job.error}")
+            self.status_text = msg
+        self.progress.visible = False
+        self.go_button.disabled = False
+        self.cancel_button.disabled = True
+
+    def make_movie_from_dataset(self, **kwargs):
+        """
+        Start rendering one frame per timestep of the selected variable and encoding them, without writing the frames
+        to disk
+        """
+        ds = eco.open_gridded_dataset(self.dataset_file.value)
+        matched_vars, _, unmatched_vars = detect_varnames(ds)
+        zvar = self.zvar.value or next(var for var in ds.data_vars if var in unmatched_vars)
+
+        # Relative output paths are relative to the dataset, like they are relative to the frames directory
+        output_file = Path(self.output_file.value)
+        if output_file.root == "":
+            output_file = Path(self.dataset_file.value).absolute().parent / output_file
+
+        return start_mp4_from_dataset(
+            ds[zvar],
+            output_file,
+            frame_rate=self.frame_rate.value,
+            timevar=matched_vars["timevar"],
+            lonvar=matched_vars["lonvar"],
+            latvar=matched_vars["latvar"],
+            cmap=self.cmap.value,
+            **kwargs,
+        )
 
 
 @register_view()
@@ -6,9 +6,12 @@ import panel as pn
 import param
 
 import ecodata as eco
+from ecodata.app.cache import read_track_data_cached
+from ecodata.app.jobs import JobExecutor, current_job
 from ecodata.app.models import PMVCard, FileSelector
 from ecodata.panel_utils import param_widget, register_view, try_catch, rename_param_widgets
-from ecodata.plotting import map_tile_options, plot_tracks_with_tiles
+from ecodata.plotting import map_tile_options, plot_map_tiles, plot_tracks_with_tiles
+from ecodata.tile_utils import build_track_tiles
 from ecodata.app.config import DEFAULT_TEMPLATE
 
 # from panel_jstree.widgets.jstree import FileTree
@@ -76,6 +79,20 @@ class TracksExplorer(param.Parameterized):
         # params["view"] = pn.Column(sizing_mode="stretch_both")
         super().__init__(**params)
 
+        # Density pyramid of the loaded tracks
+        self.density = None
+
+        # Handle to the loaded tracks in the server cache, shared with the other sessions
+        self.tracks_handle = None
+
+        # Loading the tracks and building their density pyramid run as background jobs, applied when they are polled
+        self.jobs = JobExecutor()
+        self.jobs_callback = None
+
+        # Plot layers (basemap, points, extent), and the inputs each one was built from
+        self.layers = {}
+        self.layer_keys = {}
+
         # Reset names for panel widgets
         rename_param_widgets(
             self,
@@ -132,16 +149,46 @@ class TracksExplorer(param.Parameterized):
     def load_data(self):
         if self.tracksfile.value:
             # if self.file_selector.value:
-            self.status_text = "Loading data..."
+            self.status_text = "Loading data and building density tiles..."
             val = self.tracksfile.value  # or self.filetree.value[0]
             # val = self.file_selector.value[0]
             self.tracksfile.expanded = False
-            tracks = eco.read_track_data(val)
-            self.status_text = "Track file loaded"
-            self.tracks_extent = eco.get_tracks_extent(
-                tracks, boundary_shape=self.tracks_boundary_shape.value, buffer=self.tracks_buffer.value
-            )
-            self.tracks = tracks
+            boundary_shape, buffer = self.tracks_boundary_shape.value, self.tracks_buffer.value
+
+            def load():
+                handle = read_track_data_cached(val)
+                try:
+                    # The parsed tracks are shared with the other sessions, so they are only used through a shallow
+                    # copy
+                    tracks = handle.value.copy(deep=False)
+                    # Fix counts per map pixel are computed once per file and stored on disk, and reused for every
+                    # view and session
+                    stat = Path(val).stat()
+                    density = build_track_tiles(tracks, key=f"{Path(val).resolve()}-{stat.st_mtime}-{stat.st_size}")
+                    extent = eco.get_tracks_extent(tracks, boundary_shape=boundary_shape, buffer=buffer)
+                    # A load replaced by another one, or of a closed session, doesn't keep the tracks in use
+                    current_job().check_cancelled()
+                except Exception:
+                    handle.release()
+                    raise
+                return handle, tracks, density, extent
+
+            def on_done(result):
+                handle, tracks, density, extent = result
+                if self.tracks_handle is not None:
+                    self.tracks_handle.release()
+                self.tracks_handle = handle
+                self.density = density
+                self.status_text = "Track file loaded"
+                self.tracks_extent = extent
+                self.tracks = tracks
+
+            def on_error(e):
+                self.status_text = "Error... Check options and try again"
+
+            self.jobs.cancel_all()
+            self.jobs.submit("Loading tracks", load, on_done=on_done, on_error=on_error)
+            self.start_polling()
 
         else:
             self.status_text = "File path must be selected first!"
@@ -163,9 +210,29 @@ class TracksExplorer(param.Parameterized):
     @try_catch()
     @param.depends("boundary_update.value", watch=True)
     def update_tracks_extent(self):
-        self.tracks_extent = eco.get_tracks_extent(
-            self.tracks, boundary_shape=self.tracks_boundary_shape.value, buffer=self.tracks_buffer.value
+        if self.tracks is None:
+            self.status_text = "Tracks data must be added before the boundary can be updated!"
+            return
+        tracks, boundary_shape, buffer = self.tracks, self.tracks_boundary_shape.value, self.tracks_buffer.value
+        self.status_text = "Updating tracks boundary..."
+
+        def on_done(extent):
+            self.tracks_extent = extent
+            self.status_text = "Tracks boundary updated"
+
+        def on_error(e):
+            self.status_text = "Error... Check options and try again"
+
+        self.jobs.submit(
+            "Updating boundary",
+            eco.get_tracks_extent,
+            tracks,
+            boundary_shape=boundary_shape,
+            buffer=buffer,
+            on_done=on_done,
+            on_error=on_error,
         )
+        self.start_polling()
 
     # @param.depends("output_file_button.value", watch=True)
     # def get_output_fname(self):
@@ -188,32 +255,88 @@ class TracksExplorer(param.Parameterized):
         else:
             self.status_text = "Tracks data must be added before a tracks extent file can be saved!"
 
+    def start_polling(self):
+        """
+        Poll the jobs periodically until they are all finished.
+        """
+        if self.jobs_callback is None:
+            self.jobs_callback = pn.state.add_periodic_callback(self.poll_jobs, period=500)
+
+    def poll_jobs(self):
+        """
+        Apply the results of the finished jobs, and stop polling once they are all finished.
+        """
+        if not self.jobs.poll() and self.jobs_callback is not None:
+            self.jobs_callback.stop()
+            self.jobs_callback = None
+
     @try_catch()
     @param.depends("status_text", watch=True)
     def update_status_view(self):
         self.alert.object = self.status_text
 
     @try_catch()
-    @param.depends("tracks", "boundary_update.value", "ds_checkbox.value", "map_tile.value", watch=True)
-    def update_view(self):
+    @param.depends("tracks", "ds_checkbox.value", watch=True)
+    def update_points_layer(self):
+        if self.tracks is None:
+            return
         self.status_text = "Creating plot..."
-
-        plot = (
-            plot_tracks_with_tiles(
+        key = (id(self.tracks), self.ds_checkbox.value)
+        if self.layer_keys.get("points") != key:
+            self.layers["points"] = plot_tracks_with_tiles(
                 self.tracks,
-                tiles=self.map_tile.value,
+                tiles=None,
                 datashade=self.ds_checkbox.value,
                 cmap="fire",
                 c="r",
                 marker="circle",
                 alpha=0.3,
+                density=self.density,
             ).opts(
                 responsive=True,
             )
-            * self.tracks_extent.hvplot(fill_color=None, line_color="r", geo=True, project=True).opts(
+            self.layer_keys["points"] = key
+        self.update_view()
+
+    @try_catch()
+    @param.depends("tracks_extent", watch=True)
+    def update_extent_layer(self):
+        if self.tracks_extent is None:
+            return
+        key = id(self.tracks_extent)
+        if self.layer_keys.get("extent") != key:
+            self.layers["extent"] = self.tracks_extent.hvplot(
+                fill_color=None, line_color="r", geo=True, project=True
+            ).opts(
                 responsive=True,
             )
-        ).opts(
+            self.layer_keys["extent"] = key
+        self.update_view()
+
+    @try_catch()
+    @param.depends("map_tile.value", watch=True)
+    def update_basemap_layer(self):
+        key = self.map_tile.value
+        if self.layer_keys.get("basemap") != key:
+            self.layers["basemap"] = plot_map_tiles(self.map_tile.value)
+            self.layer_keys["basemap"] = key
+        self.update_view()
+
+    def update_view(self):
+        """
+        Overlay the cached layers. Each layer is only rebuilt when its own inputs change, so changing the map tiles
+        or the boundary doesn't process the track points again.
+        """
+        if "points" not in self.layers or "extent" not in self.layers:
+            return
+        if "basemap" not in self.layers:
+            self.layers["basemap"] = plot_map_tiles(self.map_tile.value)
+            self.layer_keys["basemap"] = self.map_tile.value
+
+        plot = self.layers["points"] * self.layers["extent"]
+        if self.layers["basemap"] is not None:
+            plot = self.layers["basemap"] * plot
+        plot = plot.opts(
             # responsive=True,
             # sizing_mode="stretch_both",
             frame_height=800,
@@ -235,10 +358,21 @@ class TracksExplorer(param.Parameterized):
 
         self.status_text = "Plot created!"
 
+    def on_session_destroyed(self, session_context):
+        """
+        Stop the jobs of the session and release its tracks from the server cache.
+        """
+        self.jobs.shutdown()
+        if self.tracks_handle is not None:
+            self.tracks_handle.release()
+            self.tracks_handle = None
+
 
 @register_view()
 def view():
     viewer = TracksExplorer()
+    if pn.state.curdoc is not None and pn.state.curdoc.session_context is not None:
+        pn.state.on_session_destroyed(viewer.on_session_destroyed)
     template = DEFAULT_TEMPLATE(
         sidebar=[viewer.options_col],
         main=[viewer.alert, viewer.plot_pane, viewer.widgets],
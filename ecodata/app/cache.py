@@ -0,0 +1,263 @@
+"""
+Server-wide cache of opened datasets and parsed track files, shared by all the sessions of the app server, so a file
+is only opened once no matter how many users load it.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import panel as pn
+import xarray as xr
+
+import ecodata as eco
+from ecodata.app import config
+
+logger = logging.getLogger(__file__)
+
+CACHE_KEY = "ecodata_datasets"
+
+# Suffixes of the files preloaded as track data rather than gridded datasets
+TRACK_SUFFIXES = (".csv",)
+
+
+class CacheHandle:
+    """
+    Reference to a cached dataset. The entry can't be evicted until the handle is released.
+    """
+
+    def __init__(self, cache, key, value):
+        self.cache = cache
+        self.key = key
+        self.value = value
+        self.released = False
+
+    def __repr__(self):
+        return f"CacheHandle(key={self.key}, released={self.released})"
+
+    def __enter__(self):
+        return self.value
+
+    def __exit__(self, *exc):
+        self.release()
+
+    def release(self):
+        if not self.released:
+            self.released = True
+            self.cache.release(self.key)
+
+
+class _Entry:
+    def __init__(self, value, nbytes):
+        self.value = value
+        self.nbytes = nbytes
+        self.refcount = 0
+
+
+class DatasetCache:
+    """
+    Cache of opened files, keyed on their path, modification time and size, with a memory budget.
+
+    Entries are reference counted through the :class:`CacheHandle` returned by :meth:`get`. When the cache holds more
+    than ``max_bytes``, the least recently used entries without handles are evicted. Entries that are in use are
+    never evicted, so the budget can be exceeded while sessions hold them. Files are only loaded once even if several
+    sessions request them at the same time.
+
+    Parameters
+    ----------
+    max_bytes : int, optional
+        Memory budget of the cache, by default ``ecodata.app.config.CACHE_MEMORY_BUDGET``
+    """
+
+    def __init__(self, max_bytes=None):
+        self.max_bytes = max_bytes if max_bytes is not None else config.CACHE_MEMORY_BUDGET
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._loading = {}
+
+    def __repr__(self):
+        return f"DatasetCache(entries={len(self.entries)}, nbytes={self.nbytes}, max_bytes={self.max_bytes})"
+
+    @property
+    def nbytes(self):
+        return sum(entry.nbytes for entry in self.entries.values())
+
+    def get(self, path, loader, kind="dataset"):
+        """
+        Get a handle to a cached file, loading it if it isn't in the cache.
+
+        Parameters
+        ----------
+        path : str or pathlib.Path
+            Path of the file (or directory)
+        loader : callable
+            Function loading the file, called with the path
+        kind : str, optional
+            Kind of data, distinguishing different loaders of the same file, by default 'dataset'
+
+        Returns
+        -------
+        CacheHandle
+            Handle to the loaded data. Release it once it's no longer used.
+        """
+        key = file_key(path, kind)
+        with self._lock:
+            load_lock = self._loading.setdefault(key, threading.Lock())
+
+        # Sessions loading the same file wait for the first one, rather than loading it again
+        with load_lock:
+            with self._lock:
+                entry = self.entries.get(key)
+                if entry is not None:
+                    self.hits += 1
+                    self.entries.move_to_end(key)
+                    entry.refcount += 1
+                    # The load lock is only needed while the file isn't cached
+                    self._release_load_lock(key, load_lock)
+                    return CacheHandle(self, key, entry.value)
+
+            logger.info(f"Loading {path} into the server cache")
+            try:
+                value = loader(path)
+                entry = _Entry(value, memory_size(value))
+                with self._lock:
+                    self.misses += 1
+                    self._drop_stale(key)
+                    entry.refcount += 1
+                    self.entries[key] = entry
+                    self._evict()
+            finally:
+                # Also when the loader fails, so the next request tries again with a new lock
+                with self._lock:
+                    self._release_load_lock(key, load_lock)
+            return CacheHandle(self, key, value)
+
+    def release(self, key):
+        """
+        Release a reference to an entry (see :meth:`CacheHandle.release`).
+        """
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                entry.refcount = max(entry.refcount - 1, 0)
+            self._evict()
+
+    def clear(self):
+        """
+        Remove the entries that aren't in use.
+        """
+        with self._lock:
+            for key in [key for key, entry in self.entries.items() if entry.refcount == 0]:
+                del self.entries[key]
+
+    def info(self):
+        """
+        Summary of the cache, e.g. for logging or an admin page.
+        """
+        return pd.DataFrame(
+            [
+                dict(kind=key[0], path=key[1], nbytes=entry.nbytes, refcount=entry.refcount)
+                for key, entry in self.entries.items()
+            ],
+            columns=["kind", "path", "nbytes", "refcount"],
+        )
+
+    def _release_load_lock(self, key, load_lock):
+        """Forget the load lock of a key, unless it was already replaced by a newer one"""
+        if self._loading.get(key) is load_lock:
+            del self._loading[key]
+
+    def _drop_stale(self, key):
+        """Drop unused entries of older versions of the same file"""
+        for other in [k for k in self.entries if k[:2] == key[:2] and k != key]:
+            if self.entries[other].refcount == 0:
+                del self.entries[other]
+
+    def _evict(self):
+        total = self.nbytes
+        for key in list(self.entries):
+            if total <= self.max_bytes:
+                break
+            entry = self.entries[key]
+            if entry.refcount == 0:
+                logger.info(f"Evicting {key[1]} from the server cache")
+                total -= entry.nbytes
+                del self.entries[key]
+        if total > self.max_bytes:
+            logger.warning(f"Server cache holds {total} bytes in use, over its budget of {self.max_bytes} bytes")
+
+
+def file_key(path, kind="dataset"):
+    """
+    Cache key of a file: its kind, resolved path, modification time and size, so modified files are loaded again.
+    """
+    path = Path(path).resolve()
+    stat = path.stat()
+    return (kind, str(path), stat.st_mtime_ns, stat.st_size)
+
+
+def memory_size(value):
+    """
+    Memory used by a cached value, in bytes. Only the in-memory variables of datasets count: dask-backed variables
+    are read from the file when they are computed, and aren't held by the cache.
+    """
+    if isinstance(value, xr.Dataset):
+        return int(sum(var.nbytes for var in value.variables.values() if var.chunks is None))
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    return 0
+
+
+def get_server_cache():
+    """
+    Cache shared by all the sessions of the server, stored in ``pn.state.cache``.
+    """
+    cache = pn.state.cache.get(CACHE_KEY)
+    if cache is None:
+        cache = pn.state.cache[CACHE_KEY] = DatasetCache()
+    return cache
+
+
+def open_gridded_dataset_cached(path, **kwargs):
+    """
+    Handle to a gridded dataset from the server cache (see :func:`ecodata.open_gridded_dataset`).
+
+    The dataset is shared between sessions, so it must not be modified in place: use a (shallow) copy.
+    """
+    kind = "dataset" + (f"-{sorted(kwargs.items())}" if kwargs else "")
+    return get_server_cache().get(path, lambda p: eco.open_gridded_dataset(p, **kwargs), kind=kind)
+
+
+def read_track_data_cached(path):
+    """
+    Handle to parsed track data from the server cache (see :func:`ecodata.read_track_data`).
+
+    The tracks are shared between sessions, so they must not be modified in place: use a (shallow) copy.
+    """
+    return get_server_cache().get(path, eco.read_track_data, kind="tracks")
+
+
+def preload(paths):
+    """
+    Load files into the server cache at server start. Track files (.csv) are parsed as tracks, and other files are
+    opened as gridded datasets the way the explorer opens them.
+    """
+    for path in paths:
+        try:
+            if Path(path).suffix.lower() in TRACK_SUFFIXES:
+                handle = read_track_data_cached(path)
+            else:
+                handle = open_gridded_dataset_cached(path, chunks="auto")
+            # Preloaded entries aren't used by a session yet, so they can be evicted like any other entry
+            handle.release()
+            logger.info(f"Preloaded {path}")
+        except Exception as e:
+            logger.warning(f"Couldn't preload {path}: {e!r}")
@@ -0,0 +1,113 @@
+"""
+Dask cluster of the app server, so the computations of the apps run on managed workers with memory limits and
+spilling, rather than on the threaded scheduler inside the Panel process.
+"""
+from __future__ import annotations
+
+import atexit
+import logging
+import threading
+
+import panel as pn
+
+from ecodata.app import config
+
+logger = logging.getLogger(__file__)
+
+CLUSTER_KEY = "ecodata_dask_cluster"
+
+_lock = threading.Lock()
+
+
+def cluster_settings(**overrides):
+    """
+    Settings of the cluster from ``ecodata.app.config``, updated with the arguments that aren't None.
+    """
+    settings = dict(
+        n_workers=config.DASK_N_WORKERS,
+        threads_per_worker=config.DASK_THREADS_PER_WORKER,
+        memory_limit=config.DASK_MEMORY_LIMIT,
+        local_directory=config.DASK_SPILL_DIRECTORY,
+        dashboard_address=config.DASK_DASHBOARD_ADDRESS,
+    )
+    settings.update({key: value for key, value in overrides.items() if value is not None})
+    return {key: value for key, value in settings.items() if value is not None}
+
+
+def start_cluster(**kwargs):
+    """
+    Start the cluster of the server, if it isn't running yet.
+
+    The cluster and a client are stored in ``pn.state.cache``, so all the sessions of the server share them, and they
+    are shut down when the server exits. The client isn't set as the default scheduler: the computations of the apps
+    run on the cluster when they are submitted through a client (e.g. by the jobs of a session, see
+    ``ecodata.app.jobs``), which follows their progress and can cancel them.
+
+    Parameters
+    ----------
+    **kwargs :
+        Settings of the cluster (n_workers, threads_per_worker, memory_limit, local_directory, dashboard_address),
+        overriding the ones from ``ecodata.app.config``
+
+    Returns
+    -------
+    distributed.LocalCluster
+        The running cluster
+    """
+    from distributed import Client, LocalCluster
+
+    with _lock:
+        state = pn.state.cache.get(CLUSTER_KEY)
+        if state is not None and state["cluster"].status.name == "running":
+            return state["cluster"]
+
+        settings = cluster_settings(**kwargs)
+        logger.info(f"Starting dask cluster: {settings}")
+        cluster = LocalCluster(**settings)
+        # A default client would take over every computation of the server, including the ones followed by the local
+        # callbacks of jobs, whose progress and cancellation would stop working
+        client = Client(cluster, set_as_default=False)
+        pn.state.cache[CLUSTER_KEY] = dict(cluster=cluster, client=client)
+        logger.info(f"Dask cluster running, dashboard at {cluster.dashboard_link}")
+        return cluster
+
+
+def get_cluster():
+    """
+    Cluster of the server, started with the settings of ``ecodata.app.config`` if it isn't running.
+    """
+    return start_cluster()
+
+
+def session_client():
+    """
+    Client of the server's cluster for the current session, closed when the session is destroyed.
+
+    Returns
+    -------
+    distributed.Client
+        Client connected to the cluster. It isn't set as the default scheduler, so use it explicitly, e.g. as the
+        client of a ``JobExecutor``.
+    """
+    from distributed import Client
+
+    client = Client(get_cluster(), set_as_default=False)
+    if pn.state.curdoc is not None and pn.state.curdoc.session_context is not None:
+        pn.state.on_session_destroyed(lambda session_context: client.close())
+    return client
+
+
+def shutdown_cluster():
+    """
+    Close the clients and the cluster of the server.
+    """
+    with _lock:
+        state = pn.state.cache.pop(CLUSTER_KEY, None)
+        if state is None:
+            return
+        logger.info("Shutting down dask cluster")
+        state["client"].close()
+        state["cluster"].close()
+
+
+atexit.register(shutdown_cluster)
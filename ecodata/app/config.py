@@ -24,6 +24,22 @@ PALETTE = [
 
 DEFAULT_TEMPLATE: Type[pn.template.BaseTemplate] = pn.template.FastListTemplate
 
+# Memory budget of the datasets and tracks shared between the sessions of the server (see ecodata.app.cache)
+CACHE_MEMORY_BUDGET = 4 * 2**30
+# Memory budget of the intermediate results loaded by the processing pipeline of each session (see
+# ecodata.app.pipeline)
+PIPELINE_MEMORY_BUDGET = 2**30
+
+# Dask cluster started by the app server (see ecodata.app.cluster). None uses dask's defaults, from the CPUs and
+# memory of the machine.
+DASK_N_WORKERS = None
+DASK_THREADS_PER_WORKER = None
+# Memory limit of each worker (e.g. "4GiB"). Workers spill to disk as they approach it.
+DASK_MEMORY_LIMIT = "auto"
+# Directory where the workers spill data, by default the system temporary directory
+DASK_SPILL_DIRECTORY = None
+DASK_DASHBOARD_ADDRESS = ":8787"
+
 
 def extension(
     *args,
@@ -0,0 +1,329 @@
+"""
+Background jobs for long-running operations in the apps, so the widgets of a session stay interactive while the
+work runs.
+"""
+from __future__ import annotations
+
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+
+import dask
+from dask.callbacks import Callback
+
+logger = logging.getLogger(__file__)
+
+JOB_STATUSES = ("queued", "running", "done", "failed", "cancelled")
+
+_current = threading.local()
+
+
+class JobCancelled(Exception):
+    """Raised inside a job's computation when the job was cancelled"""
+
+
+class Job:
+    """
+    Operation submitted to a :class:`JobExecutor`.
+
+    The progress of a job is the fraction of the dask tasks of its current computation that have finished. A running
+    job is cancelled before the next dask task starts, or when it calls :meth:`check_cancelled`.
+
+    With a distributed client, the collections loaded by the job (see :func:`load`) are computed on the client's
+    cluster, and their progress is the fraction of their chunks that are done. Cancelling the job cancels them.
+
+    Parameters
+    ----------
+    name : str
+        Description of the job, shown to the user
+    func : callable
+        Function run by the job
+    on_done : callable, optional
+        Called with the result of the function once the job is done, from :meth:`JobExecutor.poll`
+    on_error : callable, optional
+        Called with the exception if the job failed, from :meth:`JobExecutor.poll`
+    client : distributed.Client, optional
+        Client of the cluster computing the collections loaded by the job
+    """
+
+    _ids = itertools.count(1)
+
+    def __init__(self, name, func, on_done=None, on_error=None, client=None):
+        self.id = next(self._ids)
+        self.name = name
+        self.func = func
+        self.on_done = on_done
+        self.on_error = on_error
+        self.client = client
+        self.status = "queued"
+        self.progress = None
+        self.result = None
+        self.error = None
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self.future = None
+        self._cancel_requested = threading.Event()
+        self._handled = False
+
+    def __repr__(self):
+        return f"Job(id={self.id}, name={self.name!r}, status={self.status!r}, progress={self.progress})"
+
+    @property
+    def active(self):
+        return self.status in ("queued", "running")
+
+    @property
+    def cancelled(self):
+        return self._cancel_requested.is_set()
+
+    def cancel(self):
+        """
+        Cancel the job. Queued jobs won't run, and running jobs stop before their next dask task.
+        """
+        self._cancel_requested.set()
+        if self.future is not None and self.future.cancel():
+            self.status = "cancelled"
+            self.finished = time.time()
+
+    def check_cancelled(self):
+        """
+        Raise :class:`JobCancelled` if the job was cancelled. Can be called by the job's function between steps that
+        don't use dask.
+        """
+        if self.cancelled:
+            raise JobCancelled(f"Job {self.name!r} was cancelled")
+
+    def load(self, obj):
+        """
+        Compute a dask collection as part of the job, and return it with its data in memory.
+        """
+        if self.client is None:
+            # Followed by the job's callback
+            return dask.persist(obj)[0]
+
+        from distributed import futures_of
+
+        persisted = self.client.persist(obj)
+        futures = futures_of(persisted)
+        self.progress = 0.0
+        while True:
+            if self.cancelled:
+                self.client.cancel(futures)
+                raise JobCancelled(f"Job {self.name!r} was cancelled")
+            n_done = sum(future.done() for future in futures)
+            self.progress = n_done / len(futures) if futures else 1.0
+            if n_done == len(futures):
+                break
+            # Wakes up right away when the job is cancelled
+            self._cancel_requested.wait(0.1)
+        # The chunks are gathered into this process, so the result can be used without the client, and raises the
+        # error of the computation if it failed
+        return self.client.compute(persisted, sync=True)
+
+    def _run(self):
+        if self.cancelled:
+            self.status = "cancelled"
+            raise JobCancelled(f"Job {self.name!r} was cancelled")
+        self.status = "running"
+        self.started = time.time()
+        _current.job = self
+        try:
+            with _JobCallback(self):
+                self.result = self.func()
+            self.status = "done"
+            self.progress = 1.0
+        except JobCancelled:
+            self.status = "cancelled"
+            raise
+        except Exception as e:
+            self.status = "failed"
+            self.error = e
+            raise
+        finally:
+            _current.job = None
+            self.finished = time.time()
+        return self.result
+
+
+def current_job():
+    """
+    Job running in the current thread, or None outside of jobs.
+    """
+    return getattr(_current, "job", None)
+
+
+def load(obj):
+    """
+    Compute a dask collection (e.g. a lazy dataset), and return it with its data in memory.
+
+    Jobs should load their results before returning them, so the callbacks of the jobs, which run on the thread of
+    the session, don't trigger the computations. Inside a job, the computation is followed by the job's progress and
+    stops when the job is cancelled, and it runs on the cluster of the job's client if it has one.
+
+    Parameters
+    ----------
+    obj : dask collection
+        E.g. an xarray.Dataset with dask arrays
+
+    Returns
+    -------
+    object
+        The collection persisted in memory, or its computed value if it was computed on the cluster of a client (for
+        xarray objects, the same object backed by numpy arrays)
+    """
+    job = current_job()
+    return job.load(obj) if job is not None else dask.persist(obj)[0]
+
+
+class JobExecutor:
+    """
+    Runs jobs in background threads, in the order they are submitted.
+
+    Each session of an app should have its own executor. With the default single worker, jobs queue behind each other,
+    so an operation can use the result of the one submitted before it. The ``on_done`` and ``on_error`` callbacks of
+    the jobs aren't called from the worker threads, but from :meth:`poll`, which the app calls periodically (e.g.
+    with ``pn.state.add_periodic_callback``) so the callbacks can safely update widgets.
+
+    Parameters
+    ----------
+    max_workers : int, optional
+        Number of jobs running at once, by default 1
+    max_history : int, optional
+        Number of finished jobs kept in :attr:`jobs`, by default 20
+    client : distributed.Client, optional
+        Client of the cluster computing the collections loaded by the jobs, by default they are computed in the
+        threads of the jobs
+
+    Examples
+    --------
+    >>> executor = JobExecutor()
+    >>> job = executor.submit("Resample time", resample, on_done=show_result)
+    >>> executor.poll()  # Calls show_result once the job is done
+    """
+
+    def __init__(self, max_workers=1, max_history=20, client=None):
+        self.max_workers = max_workers
+        self.max_history = max_history
+        self.client = client
+        self.jobs = []
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def submit(self, name, func, *args, on_done=None, on_error=None, **kwargs):
+        """
+        Submit a function to run in the background.
+
+        Parameters
+        ----------
+        name : str
+            Description of the job
+        func : callable
+            Function to run, with the following arguments
+        on_done : callable, optional
+            Called with the result of the function once the job is done
+        on_error : callable, optional
+            Called with the exception if the job failed
+
+        Returns
+        -------
+        Job
+            The queued job
+        """
+        job = Job(name, lambda: func(*args, **kwargs), on_done=on_done, on_error=on_error, client=self.client)
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="ecodata-job")
+            job.future = self._executor.submit(job._run)
+            self.jobs.append(job)
+        return job
+
+    @property
+    def active_jobs(self):
+        return [job for job in self.jobs if job.active]
+
+    @property
+    def running_job(self):
+        return next((job for job in self.jobs if job.status == "running"), None)
+
+    def cancel_all(self):
+        """
+        Cancel the running job and all the queued jobs.
+        """
+        for job in self.active_jobs:
+            job.cancel()
+
+    def poll(self):
+        """
+        Call the callbacks of the jobs that finished since the last poll.
+
+        Returns
+        -------
+        list[Job]
+            The jobs that are still queued or running
+        """
+        for job in list(self.jobs):
+            if job._handled or job.active:
+                continue
+            job._handled = True
+            if job.status == "done" and job.on_done is not None:
+                job.on_done(job.result)
+            elif job.status == "failed":
+                logger.warning(f"Job {job.name!r} failed: {job.error!r}")
+                if job.on_error is not None:
+                    job.on_error(job.error)
+
+        with self._lock:
+            finished = [job for job in self.jobs if not job.active and job._handled]
+            for job in finished[: max(len(finished) - self.max_history, 0)]:
+                self.jobs.remove(job)
+        return self.active_jobs
+
+    def wait(self, timeout=None):
+        """
+        Wait for all the submitted jobs to finish, and call their callbacks.
+        """
+        for job in list(self.jobs):
+            try:
+                job.future.result(timeout=timeout)
+            except (CancelledError, Exception):
+                pass
+        self.poll()
+
+    def shutdown(self, cancel=True):
+        """
+        Stop the worker threads, cancelling the remaining jobs by default (e.g. when the session is destroyed).
+        """
+        if cancel:
+            self.cancel_all()
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=cancel)
+                self._executor = None
+
+
+class _JobCallback(Callback):
+    """
+    Dask callback following the progress of a job and stopping it when it's cancelled.
+
+    Dask callbacks are global, so only the computations started from the job's thread are followed.
+    """
+
+    def __init__(self, job):
+        super().__init__()
+        self.job = job
+        self.thread = threading.get_ident()
+
+    def _start_state(self, dsk, state):
+        if threading.get_ident() == self.thread:
+            self.job.progress = 0.0
+
+    def _pretask(self, key, dsk, state):
+        if threading.get_ident() != self.thread:
+            return
+        self.job.check_cancelled()
+        n_done = len(state["finished"])
+        n_tasks = sum(len(state[k]) for k in ["ready", "waiting", "running"]) + n_done
+        self.job.progress = min(n_done / n_tasks if n_tasks else 0.0, 1.0)
@@ -10,6 +10,7 @@ import webbrowser
 from panel.util import fullpath
 
 from ecodata.app import config
+from ecodata.app.cluster import get_cluster, session_client
 from ecodata.panel_utils import param_widget
 
 from distributed.dashboard.components.scheduler import TaskProgress
@@ -19,14 +20,14 @@ class SimpleDashboardCard(param.Parameterized):
 
     open_dashboard_button = param_widget(
         pn.widgets.Button(button_type="primary", name="Open processing dashboard", align="start", sizing_mode="fixed"))
-    def __init__(self, dask_client, **params):
+    def __init__(self, dask_client=None, **params):
         super().__init__(**params)
 
         # Reset names for panel widgets
         self.open_dashboard_button.name = "Open processing dashboard"
 
-
-        self.dask_client = dask_client
+        # By default, a client of the server's cluster for this session
+        self.dask_client = dask_client if dask_client is not None else session_client()
         self.dash_address = self.dask_client.dashboard_link
         print("Dash address:")
         print(self.dash_address)
@@ -55,14 +56,14 @@ class DaskDashboardCard():
 
     open_dashboard_button = param_widget(
         pn.widgets.Toggle(button_type="primary", name="Open processing dashboard", align="end", sizing_mode="fixed"))
-    def __init__(self, dask_cluster, **params):
+    def __init__(self, dask_cluster=None, **params):
         super().__init__(**params)
 
         # Reset names for panel widgets
         self.open_dashboard_button.name = "Open processing dashboard"
 
-
-        self.dask_cluster = dask_cluster
+        # By default, the server's cluster
+        self.dask_cluster = dask_cluster if dask_cluster is not None else get_cluster()
         # self.dash_address = self.dask_client.dashboard_link
         self.dash_address = self.dask_cluster.dashboard_link
         print("Dash address:")
@@ -0,0 +1,251 @@
+"""
+Processing pipelines with memoized intermediate results, so changing one step of an app's processing only recomputes
+the steps after it, and undoing or reverting a change reuses the results that were already computed.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable, NamedTuple
+
+from dask.base import tokenize
+
+from ecodata.app import config
+from ecodata.app.jobs import load as load_result
+
+logger = logging.getLogger(__file__)
+
+
+class Step(NamedTuple):
+    """
+    Step of a :class:`Pipeline`: ``func(ds, **params)`` returns the dataset after the step.
+    """
+
+    name: str
+    func: Callable
+    params: dict
+
+    @property
+    def token(self):
+        return tokenize(self.name, f"{self.func.__module__}.{self.func.__qualname__}", self.params)
+
+
+class Pipeline:
+    """
+    Ordered steps applied to a source dataset, with the result of every step memoized.
+
+    The result of each step is cached under a key of the source and the names and parameters of all the steps up to
+    it. Computing the pipeline starts from the longest cached prefix of the steps, so after changing a step, only that
+    step and the ones after it run again. Every change to the steps is recorded, so :meth:`undo` and :meth:`redo`
+    restore earlier pipelines, whose results are usually still cached.
+
+    Results that fit in the memory budget are loaded before they are cached, so the next steps and the results reused
+    later don't read and compute the steps before them again. Larger results are cached lazily.
+
+    Parameters
+    ----------
+    source : xarray.Dataset, optional
+        Dataset the steps are applied to
+    max_cached : int, optional
+        Number of intermediate results kept, least recently used first out, by default 32
+    max_bytes : int, optional
+        Memory budget of the loaded results, by default ``ecodata.app.config.PIPELINE_MEMORY_BUDGET``
+    load : callable, optional
+        Function loading a result in memory, by default ``ecodata.app.jobs.load``, which computes the result as part
+        of the job running the pipeline
+
+    Examples
+    --------
+    >>> pipeline = Pipeline(ds_raw)
+    >>> pipeline.set_step("filters", select_time_range, time_var="time", start_time="2000", end_time="2001")
+    >>> pipeline.add_step("resample_time", resample_time, time_quantity=1, time_unit="D")
+    >>> ds = pipeline.compute()
+    >>> pipeline.undo()
+    >>> ds = pipeline.compute()  # From the cache
+    """
+
+    def __init__(self, source=None, max_cached=32, max_bytes=None, load=None):
+        self.max_cached = max_cached
+        self.max_bytes = config.PIPELINE_MEMORY_BUDGET if max_bytes is None else max_bytes
+        self.load = load_result if load is None else load
+        self._lock = threading.RLock()
+        self.set_source(source)
+
+    def __repr__(self):
+        return f"Pipeline(steps={[step.name for step in self.steps]}, cached={len(self._results)})"
+
+    def __len__(self):
+        return len(self.steps)
+
+    def set_source(self, source):
+        """
+        Set the source dataset, removing all the steps, the history and the cached results.
+        """
+        with self._lock:
+            self.source = source
+            self.source_token = tokenize(source) if source is not None else None
+            self.steps = ()
+            self._undo = []
+            self._redo = []
+            # Cached results and their size in memory (0 for the lazy ones), least recently used first
+            self._results = OrderedDict()
+
+    def step(self, name):
+        """
+        Step with the given name, or None.
+        """
+        return next((step for step in self.steps if step.name == name), None)
+
+    def set_step(self, name, func, index=None, **params):
+        """
+        Set the parameters of a step, replacing the step with the same name, or inserting it at ``index`` (by default
+        at the end) if there isn't one.
+        """
+        new_step = Step(name, func, params)
+        steps = list(self.steps)
+        position = next((i for i, step in enumerate(steps) if step.name == name), None)
+        if position is not None:
+            if steps[position].token == new_step.token:
+                return
+            steps[position] = new_step
+        else:
+            steps.insert(len(steps) if index is None else index, new_step)
+        self._set_steps(tuple(steps))
+
+    def add_step(self, name, func, **params):
+        """
+        Append a step, even if there is already a step with the same name (e.g. resampling twice).
+        """
+        n = sum(1 for step in self.steps if step.name.split("#")[0] == name)
+        self._set_steps(self.steps + (Step(f"{name}#{n}" if n else name, func, params),))
+
+    def remove_step(self, name):
+        if self.step(name) is not None:
+            self._set_steps(tuple(step for step in self.steps if step.name != name))
+
+    def restore(self, steps):
+        """
+        Set all the steps at once, e.g. back to the steps of a result that is displayed. Can be undone.
+        """
+        steps = tuple(steps)
+        if not self.is_current(steps):
+            self._set_steps(steps)
+
+    def reset(self):
+        """
+        Remove all the steps, going back to the source. Can be undone.
+        """
+        if self.steps:
+            self._set_steps(())
+
+    def undo(self):
+        """
+        Go back to the steps before the last change. Returns False if there is nothing to undo.
+        """
+        with self._lock:
+            if not self._undo:
+                return False
+            self._redo.append(self.steps)
+            self.steps = self._undo.pop()
+            return True
+
+    def redo(self):
+        """
+        Apply the last undone change again. Returns False if there is nothing to redo.
+        """
+        with self._lock:
+            if not self._redo:
+                return False
+            self._undo.append(self.steps)
+            self.steps = self._redo.pop()
+            return True
+
+    def is_current(self, steps):
+        """
+        Whether a snapshot of the steps (e.g. taken when a computation started) is still the current pipeline.
+        """
+        # Steps are only replaced when they change, and their parameters can't always be compared, e.g. dataframes
+        return len(steps) == len(self.steps) and all(a is b for a, b in zip(steps, self.steps))
+
+    @property
+    def can_undo(self):
+        return bool(self._undo)
+
+    @property
+    def can_redo(self):
+        return bool(self._redo)
+
+    def keys(self, steps=None):
+        """
+        Cache keys of the results of each step.
+        """
+        steps = self.steps if steps is None else steps
+        keys = []
+        key = self.source_token
+        for step in steps:
+            key = tokenize(key, step.token)
+            keys.append(key)
+        return keys
+
+    def is_cached(self, steps=None):
+        """
+        Whether the result of the pipeline is cached, so computing it is instant.
+        """
+        keys = self.keys(steps)
+        return not keys or keys[-1] in self._results
+
+    def compute(self, steps=None):
+        """
+        Result of the pipeline (by default with its current steps), applying the steps that aren't cached.
+
+        Parameters
+        ----------
+        steps : tuple[Step], optional
+            Steps to apply, e.g. a snapshot of :attr:`steps` taken before the pipeline changed, by default the
+            current steps
+
+        Returns
+        -------
+        xarray.Dataset
+            Dataset after the last step
+        """
+        steps = self.steps if steps is None else tuple(steps)
+        keys = self.keys(steps)
+        ds = self.source
+        start = 0
+        with self._lock:
+            for i in range(len(keys) - 1, -1, -1):
+                if keys[i] in self._results:
+                    ds = self._results[keys[i]][0]
+                    self._results.move_to_end(keys[i])
+                    start = i + 1
+                    break
+
+        for step, key in zip(steps[start:], keys[start:]):
+            logger.info(f"Pipeline: applying {step.name}")
+            ds = step.func(ds, **step.params)
+            nbytes = int(getattr(ds, "nbytes", 0))
+            if nbytes <= self.max_bytes:
+                ds = self.load(ds)
+            else:
+                logger.info(f"Pipeline: {step.name} result ({nbytes} bytes) is over the memory budget, kept lazy")
+                nbytes = 0
+            with self._lock:
+                self._results[key] = (ds, nbytes)
+                while len(self._results) > self.max_cached or self.nbytes > self.max_bytes:
+                    self._results.popitem(last=False)
+        return ds
+
+    @property
+    def nbytes(self):
+        """
+        Memory used by the loaded results.
+        """
+        return sum(nbytes for _, nbytes in self._results.values())
+
+    def _set_steps(self, steps):
+        with self._lock:
+            self._undo.append(self.steps)
+            self._redo.clear()
+            self.steps = steps
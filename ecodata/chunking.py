@@ -0,0 +1,217 @@
+"""
+Chunk layouts for dask-backed gridded datasets, chosen based on the operation that will be applied to the dataset.
+"""
+from __future__ import annotations
+
+import math
+
+import numpy as np
+import xarray as xr
+
+# Target size of one chunk of one variable, in bytes
+DEFAULT_CHUNK_MEMORY = 128 * 2**20
+
+OPERATIONS = ("timeseries", "map", "save")
+
+
+def plan_chunks(ds, operation, timevar="time", chunk_memory=DEFAULT_CHUNK_MEMORY):
+    """
+    Choose chunk sizes for a dataset based on the operation that will be applied to it.
+
+    Operations:
+        - **timeseries**: Operations along time (resampling, temporal statistics). The time dimension is kept in one
+          chunk where possible, and the other dimensions are split into tiles.
+        - **map**: Operations on one or a few timesteps at a time (plotting maps). The other dimensions are kept in
+          one chunk where possible, and the time dimension is split.
+        - **save**: Writing to a file. Same layout as ``map``, so each chunk is a contiguous block of timesteps.
+
+    Parameters
+    ----------
+    ds : xarray.Dataset or xarray.DataArray
+        Gridded dataset
+    operation : str
+        One of 'timeseries', 'map', or 'save'
+    timevar : str, optional
+        Label of the time dimension in the dataset, by default 'time'
+    chunk_memory : int, optional
+        Maximum size of one chunk of one variable, in bytes. By default 128 MiB.
+
+    Returns
+    -------
+    dict
+        Chunk size for each dimension of the dataset
+    """
+    if operation not in OPERATIONS:
+        raise ValueError(f"plan_chunks: operation must be one of {OPERATIONS}, not {operation!r}")
+
+    sizes = dict(ds.sizes)
+    max_elements = max(chunk_memory // _itemsize(ds), 1)
+    other_dims = [dim for dim in sizes if dim != timevar]
+    n_other = math.prod(sizes[dim] for dim in other_dims)
+
+    chunks = {}
+    if timevar not in sizes:
+        chunks.update(_split_dims({dim: sizes[dim] for dim in other_dims}, max_elements))
+    elif operation == "timeseries":
+        chunks[timevar] = min(sizes[timevar], max_elements)
+        chunks.update(_split_dims({dim: sizes[dim] for dim in other_dims}, max(max_elements // chunks[timevar], 1)))
+    else:
+        chunks.update(_split_dims({dim: sizes[dim] for dim in other_dims}, max_elements))
+        chunks[timevar] = min(sizes[timevar], max(max_elements // max(n_other, 1), 1))
+    return {dim: chunks[dim] for dim in sizes}
+
+
+def plan_rechunk(ds, target_chunks, chunk_memory=DEFAULT_CHUNK_MEMORY):
+    """
+    Plan the stages for rechunking a dask-backed dataset to new chunk sizes.
+
+    Rechunking between layouts that conflict (e.g. from chunks that are long in time to chunks that are large in space)
+    can require dask to hold many source chunks in memory at once to build each target chunk. In that case the
+    dataset is first rechunked to an intermediate layout, built from groups of source chunks that fit in
+    ``chunk_memory`` and split to be no larger than the target chunks. The final stage then only merges chunks.
+
+    Parameters
+    ----------
+    ds : xarray.Dataset or xarray.DataArray
+        Dask-backed dataset
+    target_chunks : dict
+        Target chunk size for each dimension
+    chunk_memory : int, optional
+        Maximum size of one chunk of one variable, in bytes. By default 128 MiB.
+
+    Returns
+    -------
+    list[dict]
+        Chunk sizes for each rechunking stage, ending with the target chunks. Empty if the dataset already has the
+        target chunks.
+    """
+    source_chunks = _source_chunks(ds)
+    target_chunks = {dim: ds.sizes[dim] if size == -1 else size for dim, size in target_chunks.items()}
+    common_dims = [dim for dim in target_chunks if dim in source_chunks]
+
+    if all(source_chunks[dim] == target_chunks[dim] for dim in common_dims):
+        return []
+
+    splits = any(source_chunks[dim] > target_chunks[dim] for dim in common_dims)
+    merges = any(source_chunks[dim] < target_chunks[dim] for dim in common_dims)
+    if not (splits and merges):
+        return [target_chunks]
+
+    # Memory needed to assemble one target chunk from the source chunks it overlaps
+    itemsize = _itemsize(ds)
+    read_elements = math.prod(
+        _overlap_extent(source_chunks[dim], target_chunks[dim]) if dim in common_dims else source_chunks[dim]
+        for dim in source_chunks
+    )
+    if read_elements * itemsize <= chunk_memory:
+        return [target_chunks]
+
+    # Read as many whole source chunks at once as fit in memory, growing along the dimensions where the target chunks
+    # are larger, then split them to no larger than the target chunks so the last stage only merges chunks
+    read_chunks = dict(source_chunks)
+    for dim in sorted(common_dims, key=lambda dim: target_chunks[dim] / source_chunks[dim], reverse=True):
+        if target_chunks[dim] <= source_chunks[dim]:
+            continue
+        other_elements = math.prod(size for other, size in read_chunks.items() if other != dim)
+        n_chunks = max(chunk_memory // (itemsize * other_elements * source_chunks[dim]), 1)
+        read_chunks[dim] = min(n_chunks * source_chunks[dim], target_chunks[dim])
+    intermediate = {dim: min(read_chunks[dim], target_chunks.get(dim, read_chunks[dim])) for dim in read_chunks}
+    return [intermediate, target_chunks]
+
+
+def rechunk(ds, target_chunks, chunk_memory=DEFAULT_CHUNK_MEMORY):
+    """
+    Rechunk a dask-backed dataset to new chunk sizes, through an intermediate layout if needed (see
+    :func:`plan_rechunk`). Datasets that aren't backed by dask are returned unchanged.
+
+    Parameters
+    ----------
+    ds : xarray.Dataset or xarray.DataArray
+        Gridded dataset
+    target_chunks : dict
+        Target chunk size for each dimension
+    chunk_memory : int, optional
+        Maximum size of one chunk of one variable, in bytes. By default 128 MiB.
+
+    Returns
+    -------
+    xarray.Dataset or xarray.DataArray
+        Rechunked dataset
+    """
+    if not is_dask_backed(ds):
+        return ds
+    for stage in plan_rechunk(ds, target_chunks, chunk_memory=chunk_memory):
+        ds = ds.chunk(stage)
+    return ds
+
+
+def rechunk_for(ds, operation, timevar="time", chunk_memory=DEFAULT_CHUNK_MEMORY):
+    """
+    Rechunk a dask-backed dataset to the layout planned for an operation (see :func:`plan_chunks`). Datasets that
+    aren't backed by dask are returned unchanged.
+
+    Parameters
+    ----------
+    ds : xarray.Dataset or xarray.DataArray
+        Gridded dataset
+    operation : str
+        One of 'timeseries', 'map', or 'save'
+    timevar : str, optional
+        Label of the time dimension in the dataset, by default 'time'
+    chunk_memory : int, optional
+        Maximum size of one chunk of one variable, in bytes. By default 128 MiB.
+
+    Returns
+    -------
+    xarray.Dataset or xarray.DataArray
+        Rechunked dataset
+    """
+    if not is_dask_backed(ds):
+        return ds
+    target_chunks = plan_chunks(ds, operation, timevar=timevar, chunk_memory=chunk_memory)
+    return rechunk(ds, target_chunks, chunk_memory=chunk_memory)
+
+
+def is_dask_backed(ds):
+    """
+    Check whether a dataset or data array contains dask arrays.
+    """
+    if isinstance(ds, xr.DataArray):
+        return ds.chunks is not None
+    return any(var.chunks is not None for var in ds.data_vars.values())
+
+
+def _source_chunks(ds):
+    """Largest chunk size along each dimension, across the variables of a dataset"""
+    variables = [ds] if isinstance(ds, xr.DataArray) else ds.data_vars.values()
+    chunks = {}
+    for var in variables:
+        for dim, sizes in zip(var.dims, var.chunks or var.shape):
+            size = max(sizes) if isinstance(sizes, tuple) else sizes
+            chunks[dim] = max(chunks.get(dim, 0), size)
+    return chunks
+
+
+def _itemsize(ds):
+    if isinstance(ds, xr.DataArray):
+        return ds.dtype.itemsize
+    return max([var.dtype.itemsize for var in ds.data_vars.values()] or [np.dtype(float).itemsize])
+
+
+def _split_dims(sizes, max_elements):
+    """Split dimensions evenly so the product of the chunk sizes is at most max_elements"""
+    chunks = dict(sizes)
+    while chunks and math.prod(chunks.values()) > max_elements:
+        # Halve the largest chunk until the chunks fit
+        dim = max(chunks, key=chunks.get)
+        if chunks[dim] == 1:
+            break
+        chunks[dim] = math.ceil(chunks[dim] / 2)
+    return chunks
+
+
+def _overlap_extent(source_chunk, target_chunk):
+    """Extent of the source chunks that have to be read to assemble one target chunk"""
+    if source_chunk >= target_chunk:
+        return source_chunk
+    return math.ceil(target_chunk / source_chunk) * source_chunk
@@ -0,0 +1,105 @@
+"""
+Command line interface for ecodata.
+"""
+from pathlib import Path
+
+import click
+
+from ecodata.raster_utils import GRIB_SUFFIXES, MANIFEST_FILENAME, convert_batch
+from ecodata.xr_tools import COMPRESSION_LEVELS
+
+
+@click.group()
+def main():
+    """
+    Tools for converting and preparing environmental data.
+    """
+
+
+@main.command()
+@click.argument("inputs", nargs=-1, required=True, type=click.Path(exists=True, path_type=Path))
+@click.option(
+    "--out-dir",
+    type=click.Path(file_okay=False, path_type=Path),
+    required=True,
+    help="Directory where the converted files will be written",
+)
+@click.option(
+    "--format",
+    "out_format",
+    type=click.Choice(["netcdf", "zarr"]),
+    default="netcdf",
+    help="Format of the converted files, by default netcdf",
+)
+@click.option(
+    "--workers",
+    "-j",
+    type=int,
+    default=None,
+    help="Number of files converted at once, by default the number of CPUs",
+)
+@click.option(
+    "--compression",
+    type=click.Choice(["zlib", "zstd", "none"]),
+    default="zlib",
+    help="Compression of the netCDF variables, by default zlib",
+)
+@click.option(
+    "--complevel",
+    type=click.IntRange(1, 22),
+    default=4,
+    help="Compression level, 1-9 for zlib and 1-22 for zstd, by default 4",
+)
+@click.option("--pack", is_flag=True, default=False, help="Pack floating point variables to 16-bit integers")
+@click.option(
+    "--no-resume",
+    is_flag=True,
+    default=False,
+    help=f"Convert all inputs again, even if they are recorded as completed in {MANIFEST_FILENAME}",
+)
+def convert(inputs, out_dir, out_format, workers, compression, complevel, pack, no_resume):
+    """
+    Convert GRIB files to netCDF (or Zarr), and directories of GeoTIFF files to one netCDF file each.
+
+    INPUTS can be GRIB files, directories of GeoTIFF files, or directories of GRIB files.
+    """
+    if compression in COMPRESSION_LEVELS:
+        low, high = COMPRESSION_LEVELS[compression]
+        if not low <= complevel <= high:
+            raise click.BadParameter(
+                f"{complevel} is not in the range of {compression}, {low} to {high}", param_hint="'--complevel'"
+            )
+
+    files = []
+    for path in inputs:
+        gribs = sorted(f for f in path.iterdir() if f.suffix in GRIB_SUFFIXES) if path.is_dir() else []
+        files.extend(gribs or [path])
+
+    click.echo(f"Converting {len(files)} inputs with {workers or 'all'} workers...")
+    report = convert_batch(
+        files,
+        out_dir,
+        suffix=".zarr" if out_format == "zarr" else ".nc",
+        max_workers=workers,
+        resume=not no_resume,
+        compression=None if compression == "none" else compression,
+        complevel=complevel,
+        pack=pack,
+    )
+
+    n_converted = len(report["converted"])
+    seconds = max(report["seconds"], 1e-9)
+    click.echo(
+        f"Converted {n_converted} inputs ({report['bytes'] / 2**20:.1f} MiB) in {report['seconds']:.1f} s: "
+        f"{n_converted / seconds:.2f} files/s, {report['bytes'] / 2**20 / seconds:.2f} MiB/s"
+    )
+    if report["skipped"]:
+        click.echo(f"Skipped {len(report['skipped'])} inputs that were already converted")
+    for filein, error in report["failed"].items():
+        click.echo(f"Failed to convert {filein}: {error}", err=True)
+    if report["failed"]:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
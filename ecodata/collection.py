@@ -0,0 +1,293 @@
+"""
+Collections of gridded dataset files (e.g. one netCDF or GRIB file per day) that are opened as one dataset.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+import xarray as xr
+
+from ecodata.pyramid_utils import is_pyramid, open_pyramid
+from ecodata.xr_tools import detect_varnames
+
+logger = logging.getLogger(__file__)
+
+INDEX_FILENAME = ".ecodata_index.json"
+
+_engines = {".grib": "cfgrib", ".grib2": "cfgrib", ".grb": "cfgrib", ".grb2": "cfgrib", ".zarr": "zarr"}
+
+
+class DatasetCollection:
+    """
+    A directory of gridded dataset files that share a grid and are split along time.
+
+    The directory is scanned once, and the time coverage, grid and variables of each file are recorded in an index
+    file in the directory. Later scans only read files that were added or modified since the index was written.
+    Opening the collection for a time range only opens the files that overlap that range.
+
+    Parameters
+    ----------
+    directory : str or pathlib.Path
+        Directory containing the dataset files
+    pattern : str, optional
+        Glob pattern for the dataset files in the directory, by default '*.nc'
+    timevar : str, optional
+        Label of the time coordinate in the files. If not specified, it is detected from the first file.
+    index_file : str or pathlib.Path, optional
+        Path of the index file, by default '.ecodata_index.json' in the directory
+    max_workers : int, optional
+        Number of threads used to read the file headers, by default the ThreadPoolExecutor default
+
+    Examples
+    --------
+    >>> collection = DatasetCollection("era5_daily", pattern="*.nc")
+    >>> ds = collection.open(start_time="2020-06-01", end_time="2020-08-31")
+    """
+
+    def __init__(self, directory, pattern="*.nc", timevar=None, index_file=None, max_workers=None):
+        self.directory = Path(directory)
+        self.pattern = pattern
+        self.timevar = timevar
+        self.index_file = Path(index_file) if index_file is not None else self.directory / INDEX_FILENAME
+        self.max_workers = max_workers
+        self.entries = {}
+        self.scan()
+
+    def scan(self):
+        """
+        Update the index with files that were added, modified or removed since the last scan, and write it to the
+        index file.
+        """
+        index = self._read_index()
+        entries = {}
+        to_read = []
+        for path in sorted(self.directory.glob(self.pattern)):
+            name = path.relative_to(self.directory).as_posix()
+            stat = path.stat()
+            entry = index.get(name)
+            if entry is not None and entry["mtime"] == stat.st_mtime and entry["size"] == stat.st_size:
+                entries[name] = entry
+            else:
+                to_read.append(path)
+
+        if to_read:
+            logger.info(f"Reading {len(to_read)} file headers in {self.directory}")
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                for entry in executor.map(self._read_header, to_read):
+                    entries[entry["path"]] = entry
+
+        self.entries = dict(sorted(entries.items(), key=lambda item: (item[1]["start"] or "", item[0])))
+        if self.timevar is None and self.entries:
+            self.timevar = next(iter(self.entries.values()))["timevar"]
+        self._write_index()
+        return self
+
+    def files(self, start_time=None, end_time=None):
+        """
+        Paths of the files that overlap a time range, in time order.
+
+        Parameters
+        ----------
+        start_time : str or datetime-like, optional
+            Start of the time range. If not provided, the range starts at the beginning of the collection.
+        end_time : str or datetime-like, optional
+            End of the time range. If not provided, the range ends at the end of the collection.
+
+        Returns
+        -------
+        list[pathlib.Path]
+            Paths of the overlapping files
+        """
+        start_time = pd.Timestamp(start_time) if start_time is not None else None
+        end_time = pd.Timestamp(end_time) if end_time is not None else None
+        files = []
+        for entry in self.entries.values():
+            if start_time is not None and pd.Timestamp(entry["end"]) < start_time:
+                continue
+            if end_time is not None and pd.Timestamp(entry["start"]) > end_time:
+                continue
+            files.append(self.directory / entry["path"])
+        return files
+
+    def open(self, start_time=None, end_time=None, variables=None, chunks=None, parallel=True, **kwargs):
+        """
+        Open the files overlapping a time range as one lazy dataset.
+
+        Parameters
+        ----------
+        start_time : str or datetime-like, optional
+            Start of the time range. If not provided, the range starts at the beginning of the collection.
+        end_time : str or datetime-like, optional
+            End of the time range. If not provided, the range ends at the end of the collection.
+        variables : list, optional
+            Variables to include in the dataset, by default all variables
+        chunks : dict, optional
+            Chunks for the dask arrays, by default one chunk per file
+        parallel : bool, optional
+            Whether to open the files in parallel with dask, by default True
+        **kwargs :
+            Additional arguments to be passed to xarray.open_mfdataset
+
+        Returns
+        -------
+        xarray.Dataset
+            Dataset with the data in the time range
+        """
+        files = self.files(start_time, end_time)
+        if not files:
+            raise ValueError(f"DatasetCollection: no files in {self.directory} overlap the time range.")
+
+        engine = _engines.get(files[0].suffix)
+        if engine is not None:
+            kwargs.setdefault("engine", engine)
+        if variables is not None:
+            kwargs.setdefault("preprocess", lambda ds: ds[variables])
+
+        ds = xr.open_mfdataset(
+            [str(f) for f in files],
+            combine="by_coords",
+            chunks=chunks if chunks is not None else {},
+            parallel=parallel,
+            data_vars="minimal",
+            coords="minimal",
+            compat="override",
+            **kwargs,
+        )
+        return ds.sel({self.timevar: slice(start_time, end_time)})
+
+    @property
+    def time_coverage(self):
+        """
+        Start and end time of the collection
+        """
+        if not self.entries:
+            return None, None
+        starts = [pd.Timestamp(entry["start"]) for entry in self.entries.values()]
+        ends = [pd.Timestamp(entry["end"]) for entry in self.entries.values()]
+        return min(starts), max(ends)
+
+    @property
+    def variables(self):
+        """
+        Variables contained in any of the files of the collection
+        """
+        return sorted({var for entry in self.entries.values() for var in entry["variables"]})
+
+    def to_dataframe(self):
+        """
+        Index of the collection as a dataframe, with one row per file
+        """
+        return pd.DataFrame(list(self.entries.values()))
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __repr__(self):
+        start, end = self.time_coverage
+        return f"DatasetCollection({str(self.directory)!r}, files={len(self)}, start={start}, end={end})"
+
+    def _read_header(self, path):
+        engine = _engines.get(path.suffix)
+        with xr.open_dataset(path, engine=engine, chunks={}) as ds:
+            timevar = self.timevar or detect_varnames(ds)[0]["timevar"]
+            times = pd.DatetimeIndex(ds.indexes[timevar]) if timevar in ds.indexes else pd.DatetimeIndex([])
+            stat = path.stat()
+            return dict(
+                path=path.relative_to(self.directory).as_posix(),
+                mtime=stat.st_mtime,
+                size=stat.st_size,
+                timevar=timevar,
+                start=str(times.min()) if len(times) else None,
+                end=str(times.max()) if len(times) else None,
+                ntime=len(times),
+                variables=sorted(ds.data_vars),
+                grid={dim: size for dim, size in ds.sizes.items() if dim != timevar},
+            )
+
+    def _read_index(self):
+        if not self.index_file.exists():
+            return {}
+        try:
+            index = json.loads(self.index_file.read_text())
+        except (OSError, ValueError):
+            logger.warning(f"Couldn't read collection index {self.index_file}, rescanning.")
+            return {}
+        if index.get("pattern") != self.pattern:
+            return {}
+        return {entry["path"]: entry for entry in index["files"]}
+
+    def _write_index(self):
+        index = dict(pattern=self.pattern, timevar=self.timevar, files=list(self.entries.values()))
+        try:
+            tmp_file = self.index_file.with_suffix(".tmp")
+            tmp_file.write_text(json.dumps(index, indent=1))
+            os.replace(tmp_file, self.index_file)
+        except OSError:
+            logger.warning(f"Couldn't write collection index {self.index_file}.")
+
+
+def open_collection(directory, pattern="*.nc", start_time=None, end_time=None, **kwargs):
+    """
+    Open a directory of gridded dataset files as one lazy dataset. See :class:`DatasetCollection`.
+
+    Parameters
+    ----------
+    directory : str or pathlib.Path
+        Directory containing the dataset files
+    pattern : str, optional
+        Glob pattern for the dataset files in the directory, by default '*.nc'
+    start_time : str or datetime-like, optional
+        Start of the time range to open
+    end_time : str or datetime-like, optional
+        End of the time range to open
+    **kwargs :
+        Additional arguments to be passed to DatasetCollection.open
+
+    Returns
+    -------
+    xarray.Dataset
+        Dataset with the data in the time range
+    """
+    return DatasetCollection(directory, pattern=pattern).open(start_time=start_time, end_time=end_time, **kwargs)
+
+
+def open_gridded_dataset(path, chunks="auto", **kwargs):
+    """
+    Open a gridded dataset from a netCDF or GRIB file, a Zarr store (the full resolution level, for multiscale
+    pyramids), or a directory of files (as a
+    :class:`ecodata.raster_utils.RasterStack` if the directory contains GeoTIFFs, or as a :class:`DatasetCollection`
+    of the netCDF files in the directory).
+
+    Parameters
+    ----------
+    path : str or pathlib.Path
+        Path to the dataset
+    chunks : dict or str, optional
+        Chunks for the dask arrays, by default 'auto'
+    **kwargs :
+        Additional arguments to be passed to the xarray open function
+
+    Returns
+    -------
+    xarray.Dataset
+        Lazily loaded dataset
+    """
+    path = Path(path)
+    if path.suffix == ".zarr":
+        if is_pyramid(path):
+            # Full resolution level of a multiscale pyramid
+            return open_pyramid(path, chunks=chunks)[0]
+        return xr.open_zarr(path, chunks=chunks, **kwargs)
+    if path.is_dir() and any(path.glob("*.tif")):
+        # Imported here because raster_utils builds on this module
+        from ecodata.raster_utils import RasterStack
+
+        return RasterStack(path).open(chunks=chunks if isinstance(chunks, dict) else None)
+    if path.is_dir():
+        return DatasetCollection(path).open(chunks=chunks, **kwargs)
+    return xr.open_dataset(path, engine=_engines.get(path.suffix), chunks=chunks, **kwargs)
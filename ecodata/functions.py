@@ -196,13 +196,31 @@ def get_tracks_extent(tracks, boundary_shape="rectangular", buffer=0):
         return gpd.GeoDataFrame(geometry=boundary)
 
 
+# Geometries with more features or vertices than this are rasterized on the server in plot_subset_interactive,
+# rather than sent to the browser as vector glyphs
+MAX_INTERACTIVE_FEATURES = 10_000
+MAX_INTERACTIVE_VERTICES = 200_000
+
+
 def plot_subset_interactive(
-    subset, boundary, bounding_geom=None, track_points=None, datashade_tracks=False, projection=ccrs.PlateCarree()
+    subset,
+    boundary,
+    bounding_geom=None,
+    track_points=None,
+    datashade_tracks=None,
+    projection=ccrs.PlateCarree(),
+    rasterize=None,
+    max_features=MAX_INTERACTIVE_FEATURES,
+    max_vertices=MAX_INTERACTIVE_VERTICES,
 ):
     """
     Plots the results of the subset_data function in an interactive plot using
     hvplot/geoviews.
 
+    The subset, bounding geometry and track points are each rasterized with datashader on the server when they have
+    more than ``max_features`` features or ``max_vertices`` vertices, so the browser only receives an image. The
+    rasterized layers are recomputed for the visible range when zooming, so zoomed views show the full detail.
+
     Parameters
     ----------
     subset_data : geopandas.GeoDataFrame
@@ -213,6 +231,16 @@ def plot_subset_interactive(
         Bounding geometry used for subsetting, by default None
     track_points : geopandas.GeoDataFrame, optional
         Track points used for subsetting, by default None
+    datashade_tracks : bool, optional
+        Whether to datashade the track points, by default depending on the number of points
+    projection : cartopy.crs.Projection, optional
+        Projection of the plot, by default PlateCarree
+    rasterize : bool, optional
+        Whether to rasterize the subset and bounding geometry, by default depending on their size
+    max_features : int, optional
+        Number of features above which layers are rasterized, by default MAX_INTERACTIVE_FEATURES
+    max_vertices : int, optional
+        Number of vertices above which layers are rasterized, by default MAX_INTERACTIVE_VERTICES
 
     Returns
     -------
@@ -230,22 +258,31 @@ def plot_subset_interactive(
 
     # Check the geometry type of the subset
     subset_geom_type = set(pd.unique(subset.geom_type))
+    if not (
+        subset_geom_type.issubset({"Point", "MultiPoint"})
+        or subset_geom_type.issubset({"LineString", "MultiLineString"})
+    ):
+        # TODO: Add polygon option
+        raise TypeError("plot_subset_interactive: Geometry type of the subset is not supported.")
 
+    if _rasterize_layer(rasterize, subset, max_features, max_vertices):
+        subset_plot = _rasterized_geometries(subset, projection, color="k")
     # Use hvplot for points
-    if subset_geom_type.issubset({"Point", "MultiPoint"}):
+    elif subset_geom_type.issubset({"Point", "MultiPoint"}):
         subset_plot = subset.hvplot.points(hover=False, geo=True, projection=projection)
     # Use geoviews for paths
-    if subset_geom_type.issubset({"LineString", "MultiLineString"}):
-        subset_plot = gv.Path(subset).opts(projection=projection, color="k")
-    # TODO: Add polygon option
     else:
-        raise TypeError("plot_subset_interactive: Geometry type of the subset is not supported.")
+        subset_plot = gv.Path(subset).opts(projection=projection, color="k")
 
     plot = boundary_plot * subset_plot
 
     # Plot for bounding_geom
     if bounding_geom is not None:
-        bounding_geom_plot = bounding_geom.to_crs(subset.crs).hvplot(geo=True, alpha=0.3)
+        bounding_geom = bounding_geom.to_crs(subset.crs)
+        if _rasterize_layer(rasterize, bounding_geom, max_features, max_vertices):
+            bounding_geom_plot = _rasterized_geometries(bounding_geom, projection, color="b", alpha=0.3)
+        else:
+            bounding_geom_plot = bounding_geom.hvplot(geo=True, alpha=0.3)
         plot = bounding_geom_plot * plot
 
     # Plot for track points
@@ -255,7 +292,7 @@ def plot_subset_interactive(
             "location_lat",
             hover=False,
             geo=True,
-            datashade=datashade_tracks,
+            datashade=_rasterize_layer(datashade_tracks, track_points, max_features, max_vertices),
             dynspread=True,
             projection=projection,
             color="r",
@@ -267,10 +304,46 @@ def plot_subset_interactive(
     return plot
 
 
-def plot_subset(subset, boundary, bounding_geom=None, track_points=None):
+def _rasterize_layer(rasterize, gdf, max_features, max_vertices):
+    """Whether to rasterize a layer: as requested, or if it's too large to be drawn as vector glyphs"""
+    if rasterize is not None:
+        return rasterize
+    if len(gdf) > max_features:
+        return True
+    # Only count the vertices of layers with few enough features, so the count stays cheap
+    return len(gdf.geometry.get_coordinates()) > max_vertices
+
+
+def _rasterized_geometries(gdf, projection, color="k", alpha=1.0):
+    """
+    Geometries aggregated with datashader in the projection of the plot, re-rasterized for the visible range when
+    zooming
+    """
+    import holoviews as hv
+    from holoviews.operation.datashader import dynspread, rasterize
+
+    geoms = gdf.geometry.to_crs(projection)
+    x, y = _geometry_coordinates(geoms)
+    # The coordinates are already projected, so plain holoviews elements are used rather than geoviews ones
+    if geoms.geom_type.isin(["Point", "MultiPoint"]).all():
+        return dynspread(
+            rasterize(hv.Points((x, y), ["x", "y"]), aggregator="any").opts(cmap=[color], alpha=alpha)
+        )
+    return rasterize(hv.Path([{"x": x, "y": y}], ["x", "y"]), aggregator="any").opts(cmap=[color], alpha=alpha)
+
+
+# Subsets with more features than this are rasterized with datashader in plot_subset, if it's installed
+MAX_VECTOR_FEATURES = 50_000
+
+
+def plot_subset(subset, boundary, bounding_geom=None, track_points=None, method="auto"):
     """
     Plots the results of the subset_data function in a static plot using matplotlib.
 
+    The subset is drawn from its coordinate arrays as a single path (lines and polygon outlines) or a single scatter
+    (points), rather than one artist per feature, so large subsets plot quickly. Above ``MAX_VECTOR_FEATURES``
+    features, it's rasterized at the resolution of the figure with datashader instead.
+
     Parameters
     ----------
     subset : geopandas.GeoDataFrame
@@ -281,23 +354,101 @@ def plot_subset(subset, boundary, bounding_geom=None, track_points=None):
         Bounding geometry used for subsetting, by default None
     track_points : geopandas.GeoDataFrame, optional
         Track points used for subsetting, by default None
+    method : str, optional
+        How the subset is drawn: 'vector', 'raster' (needs datashader) or 'auto' to choose from the number of
+        features, by default 'auto'
 
     Returns
     -------
     matplotlib.pyplot.figure
         Figure showing the subset results, along with the bounding geometry or track points provided.
     """
+    if method not in ("auto", "vector", "raster"):
+        raise ValueError(f"plot_subset: method must be 'auto', 'vector' or 'raster', not {method!r}")
+    if method == "auto":
+        method = "raster" if len(subset) > MAX_VECTOR_FEATURES and _has_datashader() else "vector"
+
     plt.ioff()
     fig, ax = plt.subplots()
     boundary.plot(ax=ax, color="c", alpha=0.4)
-    subset.plot(ax=ax, color="b", linewidth=0.75)
+    if method == "raster":
+        _rasterize_geometries(ax, subset.geometry, color="b")
+    else:
+        _draw_geometries(ax, subset.geometry, color="b", linewidth=0.75)
     if bounding_geom is not None:
         bounding_geom.to_crs(subset.crs).plot(ax=ax, color="r")
     if track_points is not None:
-        track_points.to_crs(subset.crs).plot(ax=ax, color="r", marker=".", alpha=0.4)
+        track_points = track_points.to_crs(subset.crs)
+        ax.scatter(track_points.geometry.x, track_points.geometry.y, color="r", marker=".", alpha=0.4)
     return fig
 
 
+def _has_datashader():
+    try:
+        import datashader  # noqa
+    except ImportError:
+        return False
+    return True
+
+
+def _geometry_coordinates(geoms):
+    """
+    x and y coordinates of a GeoSeries, as flat arrays. Lines and polygon outlines have NaN between their parts, so
+    they can be drawn as a single path.
+    """
+    geoms = geoms[~(geoms.is_empty | geoms.isna())]
+    if geoms.geom_type.isin(["Polygon", "MultiPolygon"]).any():
+        geoms = geoms.boundary
+    if geoms.geom_type.str.startswith("Multi").any():
+        geoms = geoms.explode(index_parts=False)
+    # One row per part, so the index of the coordinates identifies their part
+    coords = geoms.reset_index(drop=True).get_coordinates()
+    x, y = coords["x"].to_numpy(), coords["y"].to_numpy()
+    if geoms.geom_type.isin(["Point"]).all():
+        return x, y
+
+    breaks = np.flatnonzero(np.diff(coords.index.to_numpy())) + 1
+    return np.insert(x, breaks, np.nan), np.insert(y, breaks, np.nan)
+
+
+def _draw_geometries(ax, geoms, color="b", linewidth=0.75, marker="."):
+    x, y = _geometry_coordinates(geoms)
+    if geoms.geom_type.isin(["Point", "MultiPoint"]).all():
+        ax.scatter(x, y, color=color, marker=marker, s=linewidth * 4)
+    else:
+        ax.plot(x, y, color=color, linewidth=linewidth)
+
+
+def _rasterize_geometries(ax, geoms, color="b"):
+    """Draw geometries as an image with one value per pixel of the axes, aggregated with datashader"""
+    import datashader as ds
+    from matplotlib.colors import ListedColormap
+
+    x, y = _geometry_coordinates(geoms)
+    bbox = ax.get_window_extent()
+    xmin, ymin, xmax, ymax = geoms.total_bounds
+    canvas = ds.Canvas(
+        plot_width=max(int(bbox.width), 1),
+        plot_height=max(int(bbox.height), 1),
+        x_range=(xmin, xmax),
+        y_range=(ymin, ymax),
+    )
+    df = pd.DataFrame({"x": x, "y": y})
+    if geoms.geom_type.isin(["Point", "MultiPoint"]).all():
+        agg = canvas.points(df, "x", "y", agg=ds.count())
+    else:
+        agg = canvas.line(df, "x", "y", agg=ds.count())
+    covered = np.ma.masked_equal(agg.values > 0, False)
+    ax.imshow(
+        covered,
+        cmap=ListedColormap([color]),
+        extent=(xmin, xmax, ymin, ymax),
+        origin="lower",
+        interpolation="nearest",
+        aspect=ax.get_aspect(),
+    )
+
+
 def bbox2poly(bbox):
     long_min = bbox[0]
     lat_min = bbox[1]
@@ -0,0 +1,177 @@
+"""
+Rendering movies of gridded datasets, with the frames rendered in parallel and piped directly into ffmpeg.
+"""
+from __future__ import annotations
+
+import logging
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from ecodata.chunking import rechunk_for
+from ecodata.panel_utils import VideoEncodeJob
+from ecodata.plotting import sample_clim
+
+logger = logging.getLogger(__file__)
+
+
+def start_mp4_from_dataset(
+    da,
+    output_file,
+    frame_rate=10,
+    timevar="time",
+    lonvar="longitude",
+    latvar="latitude",
+    cmap="viridis",
+    clim=None,
+    width=800,
+    height=600,
+    max_workers=None,
+    preset="medium",
+    crf=23,
+    ffmpeg="ffmpeg",
+):
+    """
+    Start making an mp4 movie of a gridded variable in the background, with one frame per timestep.
+
+    The frames are rendered with matplotlib in a process pool and their raw RGB pixels are written to ffmpeg's stdin
+    in time order, so no image files are written. While the frames are rendered, the next timesteps are loaded from
+    the dataset, and the number of frames in flight is bounded so memory use doesn't grow with the movie length.
+
+    Parameters
+    ----------
+    da : xarray.DataArray
+        Gridded variable with a time dimension
+    output_file : str or pathlib.Path
+        Path of the mp4 file to write
+    frame_rate : int, optional
+        Frames per second, by default 10
+    timevar : str, optional
+        Label of the time dimension, by default 'time'
+    lonvar : str, optional
+        Label of the longitude dimension, by default 'longitude'
+    latvar : str, optional
+        Label of the latitude dimension, by default 'latitude'
+    cmap : str, optional
+        Matplotlib colormap, by default 'viridis'
+    clim : tuple, optional
+        Color limits, the same for all frames. By default they are estimated from a sample of the data.
+    width : int, optional
+        Width of the frames, in pixels, by default 800
+    height : int, optional
+        Height of the frames, in pixels, by default 600
+    max_workers : int, optional
+        Number of processes rendering frames, by default the number of CPUs
+    preset : str, optional
+        x264 preset (encoding speed), by default 'medium'
+    crf : int, optional
+        x264 constant rate factor (0-51, lower is better quality), by default 23
+    ffmpeg : str, optional
+        ffmpeg executable, by default 'ffmpeg'
+
+    Returns
+    -------
+    ecodata.panel_utils.VideoEncodeJob
+        The running job. Use its ``progress``, ``cancel()`` and ``wait()`` to follow, stop or wait for it.
+    """
+    output_file = Path(output_file).absolute()
+    da = rechunk_for(da.transpose(timevar, latvar, lonvar), "map", timevar=timevar)
+    clim = tuple(clim) if clim is not None else sample_clim(da)
+    extent = (
+        float(da[lonvar].min()),
+        float(da[lonvar].max()),
+        float(da[latvar].min()),
+        float(da[latvar].max()),
+    )
+    style = dict(cmap=cmap, clim=clim, extent=extent, width=width, height=height, label=da.name or "")
+
+    input_args = ["-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{width}x{height}", "-framerate", str(frame_rate),
+                  "-i", "-"]  # fmt: skip
+    frames = _render_frames(da, timevar, latvar, style, max_workers)
+    return VideoEncodeJob(
+        input_args, output_file, n_frames=da.sizes[timevar], frames=frames, preset=preset, crf=crf, ffmpeg=ffmpeg
+    ).start()
+
+
+def make_mp4_from_dataset(da, output_file, frame_rate=10, **kwargs):
+    """
+    Make an mp4 movie of a gridded variable, with one frame per timestep, and wait for it to finish.
+    See :func:`start_mp4_from_dataset` for the arguments.
+
+    Returns
+    -------
+    pathlib.Path
+        Path to the movie
+    """
+    return start_mp4_from_dataset(da, output_file, frame_rate=frame_rate, **kwargs).wait()
+
+
+def _render_frames(da, timevar, latvar, style, max_workers):
+    """Render the frames of a movie in a process pool, and yield their pixels in time order"""
+    times = pd.DatetimeIndex(da[timevar].values) if np.issubdtype(da[timevar].dtype, np.datetime64) else None
+    # Rows of the frames are drawn from the top, so north up needs ascending rows in the data to be flipped
+    flip = da[latvar].values[0] < da[latvar].values[-1]
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        # Frames are yielded in submission order, with a bounded number of frames rendering at once
+        max_in_flight = 2 * (max_workers or os.cpu_count() or 1)
+        in_flight = deque()
+        try:
+            for i in range(da.sizes[timevar]):
+                values = np.asarray(da.isel({timevar: i}).values)
+                title = str(times[i]) if times is not None else str(da[timevar].values[i])
+                in_flight.append(executor.submit(render_frame, values[::-1] if flip else values, title, **style))
+                if len(in_flight) >= max_in_flight:
+                    yield in_flight.popleft().result()
+            while in_flight:
+                yield in_flight.popleft().result()
+        finally:
+            # Don't wait for frames that won't be written if the job was cancelled
+            for future in in_flight:
+                future.cancel()
+
+
+def render_frame(values, title="", cmap="viridis", clim=None, extent=None, width=800, height=600, label="", dpi=100):
+    """
+    Render a map of a 2D array with matplotlib, as raw RGB pixels.
+
+    Parameters
+    ----------
+    values : numpy.ndarray
+        2D array, with the first row at the north edge
+    title : str, optional
+        Title of the frame (e.g. the timestamp)
+    cmap : str, optional
+        Matplotlib colormap, by default 'viridis'
+    clim : tuple, optional
+        Color limits, by default the range of the values
+    extent : tuple, optional
+        Longitude and latitude extent (left, right, bottom, top) of the array
+    width : int, optional
+        Width of the frame, in pixels, by default 800
+    height : int, optional
+        Height of the frame, in pixels, by default 600
+    label : str, optional
+        Label of the colorbar
+    dpi : int, optional
+        Resolution of the text and lines, by default 100
+
+    Returns
+    -------
+    bytes
+        RGB pixels of the frame, row by row (width * height * 3 bytes)
+    """
+    fig = Figure(figsize=(width / dpi, height / dpi), dpi=dpi)
+    canvas = FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    vmin, vmax = clim if clim is not None else (None, None)
+    image = ax.imshow(values, cmap=cmap, vmin=vmin, vmax=vmax, extent=extent, origin="upper", aspect="auto")
+    fig.colorbar(image, ax=ax, label=label)
+    ax.set_title(title)
+    canvas.draw()
+    return np.asarray(canvas.buffer_rgba())[:, :, :3].tobytes()
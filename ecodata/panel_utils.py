@@ -4,9 +4,10 @@ import functools
 import inspect
 import logging
 import os
+import re
 import shlex
-import shutil
 import subprocess
+import threading
 from contextlib import contextmanager
 from functools import wraps
 from pathlib import Path
@@ -146,10 +147,192 @@ def sanitize_filepath(filepath: str):
     return str(Path(filepath).absolute().resolve())
 
 
-def make_mp4_from_frames(frames_dir, output_file, frame_rate):
-    frames_pattern = "Frame%d.png"
-    temp_output_file = "output.mp4"
+# ffmpeg presets (encoding speed) and constant rate factors (quality, lower is better) offered in the apps
+ENCODER_PRESETS = {
+    "Fast (larger file)": dict(preset="veryfast", crf=28),
+    "Balanced": dict(preset="medium", crf=23),
+    "High quality (slower)": dict(preset="slow", crf=18),
+}
 
+
+class VideoEncodeJob:
+    """
+    ffmpeg video encoding running in the background, with progress reporting and cancellation.
+
+    The job doesn't block the caller (e.g. a Panel callback) or change the working directory. ffmpeg's ``-progress``
+    output is read in a background thread to follow the number of encoded frames. The input is either given in
+    ``input_args`` (e.g. an image sequence), or raw frames are written to ffmpeg's stdin from ``frames``, also in a
+    background thread.
+
+    Parameters
+    ----------
+    input_args : list[str]
+        ffmpeg arguments describing the input, e.g. ['-framerate', '10', '-i', '/frames/Frame%d.png']
+    output_file : str or pathlib.Path
+        Path of the video to write
+    n_frames : int, optional
+        Number of frames in the video, used to compute the progress
+    frames : iterable of bytes, optional
+        Raw frames to write to ffmpeg's stdin (with ``-i -`` in ``input_args``)
+    preset : str, optional
+        x264 preset (encoding speed), by default 'medium'
+    crf : int, optional
+        x264 constant rate factor (0-51, lower is better quality), by default 23
+    ffmpeg : str, optional
+        ffmpeg executable, by default 'ffmpeg'
+
+    Examples
+    --------
+    >>> job = start_mp4_from_frames("frames", "movie.mp4", frame_rate=10)
+    >>> job.progress
+    0.42
+    >>> job.wait()
+    PosixPath('frames/movie.mp4')
+    """
+
+    def __init__(self, input_args, output_file, n_frames=None, frames=None, preset="medium", crf=23, ffmpeg="ffmpeg"):
+        self.output_file = Path(output_file)
+        self.n_frames = n_frames
+        self.frames = frames
+        self.frame = 0
+        self.speed = None
+        self.status = "pending"
+        self.error = None
+        self.cmd = [
+            ffmpeg, "-y", "-nostats", "-loglevel", "error", "-progress", "pipe:1",
+            *input_args,
+            "-vf", "pad=width=ceil(iw/2)*2:height=ceil(ih/2)*2",
+            "-c:v", "libx264", "-preset", preset, "-crf", str(crf), "-pix_fmt", "yuv420p",
+            str(self.output_file),
+        ]  # fmt: skip
+        self._process = None
+        self._done = threading.Event()
+        self._cancelled = False
+
+    @property
+    def progress(self):
+        """
+        Fraction of the frames that were encoded (0 to 1), or None if the number of frames isn't known
+        """
+        if self.status == "done":
+            return 1.0
+        if not self.n_frames:
+            return None
+        return min(self.frame / self.n_frames, 1.0)
+
+    @property
+    def running(self):
+        return self.status in ("pending", "running")
+
+    def start(self):
+        """
+        Start encoding in the background, and return the job.
+        """
+        self._process = subprocess.Popen(
+            self.cmd,
+            stdin=subprocess.PIPE if self.frames is not None else subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+        self.status = "running"
+        if self.frames is not None:
+            threading.Thread(target=self._feed_frames, daemon=True, name="ecodata-encode-feed").start()
+        threading.Thread(target=self._follow_progress, daemon=True, name="ecodata-encode-progress").start()
+        return self
+
+    def cancel(self):
+        """
+        Stop encoding and remove the partially written video.
+        """
+        self._cancelled = True
+        if self._process is not None and self._process.poll() is None:
+            self._process.terminate()
+
+    def wait(self, timeout=None):
+        """
+        Wait for the encoding to finish.
+
+        Returns
+        -------
+        pathlib.Path
+            Path to the video
+
+        Raises
+        ------
+        RuntimeError
+            If encoding failed or was cancelled
+        """
+        if not self._done.wait(timeout):
+            raise TimeoutError(f"VideoEncodeJob: encoding of {self.output_file} didn't finish in {timeout} s")
+        if self.status != "done":
+            raise RuntimeError(f"VideoEncodeJob: encoding of {self.output_file} {self.status}: {self.error}")
+        return self.output_file
+
+    def _feed_frames(self):
+        try:
+            for frame in self.frames:
+                if self._cancelled:
+                    break
+                self._process.stdin.write(frame)
+        except BrokenPipeError:
+            # ffmpeg exited, the error is reported from its stderr
+            pass
+        except Exception as e:
+            self.error = repr(e)
+            self._process.kill()
+        finally:
+            if hasattr(self.frames, "close"):
+                # Stop a frames generator, e.g. shut down its rendering workers
+                self.frames.close()
+            try:
+                self._process.stdin.close()
+            except BrokenPipeError:
+                pass
+
+    def _follow_progress(self):
+        for line in self._process.stdout:
+            key, _, value = line.decode(errors="replace").strip().partition("=")
+            if key == "frame" and value.isdigit():
+                self.frame = int(value)
+            elif key == "speed":
+                self.speed = value
+        returncode = self._process.wait()
+        if self._cancelled:
+            self.status = "cancelled"
+            self.output_file.unlink(missing_ok=True)
+        elif returncode != 0 or self.error is not None:
+            self.status = "failed"
+            self.error = self.error or self._process.stderr.read().decode(errors="replace").strip()
+            logger.warning(f"ffmpeg failed: {self.error}")
+        else:
+            self.status = "done"
+        self._done.set()
+
+
+def start_mp4_from_frames(frames_dir, output_file, frame_rate, preset="medium", crf=23, frames_pattern="Frame%d.png"):
+    """
+    Start encoding an mp4 movie from a directory of numbered frames (Frame1.png, Frame2.png, ...) in the background.
+
+    Parameters
+    ----------
+    frames_dir : str or pathlib.Path
+        Directory of the frames
+    output_file : str or pathlib.Path
+        Path of the movie. Relative paths are relative to the frames directory.
+    frame_rate : int
+        Frames per second
+    preset : str, optional
+        x264 preset (encoding speed), by default 'medium'
+    crf : int, optional
+        x264 constant rate factor (0-51, lower is better quality), by default 23
+    frames_pattern : str, optional
+        ffmpeg pattern of the frame filenames, by default 'Frame%d.png'
+
+    Returns
+    -------
+    VideoEncodeJob
+        The running job
+    """
     frames_dir_sanitized = Path(frames_dir).absolute().resolve()
 
     if Path(output_file).root == "":
@@ -157,21 +340,23 @@ def make_mp4_from_frames(frames_dir, output_file, frame_rate):
     else:
         output_file = Path(sanitize_filepath(output_file))
 
-    with cd_and_cd_back():
-        print("Moving to frames directory...")
-        os.chdir(frames_dir_sanitized)
-        print(f"In directory: {os.getcwd()}")
-        cmd = f"""ffmpeg -framerate {frame_rate} -i {frames_pattern}
-        -vf pad='width=ceil(iw/2)*2:height=ceil(ih/2)*2'
-        -c:v libx264 -pix_fmt yuv420p -y {temp_output_file} """
+    frames_regex = re.compile(re.escape(frames_pattern).replace("%d", r"\d+") + "$")
+    n_frames = sum(1 for f in frames_dir_sanitized.iterdir() if frames_regex.match(f.name))
+    input_args = ["-framerate", str(frame_rate), "-i", str(frames_dir_sanitized / frames_pattern)]
+    return VideoEncodeJob(input_args, output_file, n_frames=n_frames, preset=preset, crf=crf).start()
 
-        subprocess.run(split_shell_command(cmd))
-        print("ffmpeg done!")
-        print(f"Target output file: {output_file}")
 
-        shutil.move(temp_output_file, output_file)
+def make_mp4_from_frames(frames_dir, output_file, frame_rate, preset="medium", crf=23):
+    """
+    Encode an mp4 movie from a directory of numbered frames (Frame1.png, Frame2.png, ...) and wait for it to finish.
+    See :func:`start_mp4_from_frames`.
 
-    return output_file
+    Returns
+    -------
+    pathlib.Path
+        Path to the movie
+    """
+    return start_mp4_from_frames(frames_dir, output_file, frame_rate, preset=preset, crf=crf).wait()
 
 
 def register_view(url=None, name=None, ext_kw=None, ext_args=(), **template_format_kw):
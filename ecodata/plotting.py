@@ -1,8 +1,22 @@
+import itertools
+import math
+import threading
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import dask
+import dask.array
+import holoviews as hv
 import hvplot.pandas  # noqa
 import hvplot.xarray  # noqa
+import numpy as np
 import param
+import xarray as xr
 import panel as pn
+from ecodata.chunking import is_dask_backed, rechunk_for
 from ecodata.panel_utils import param_widget
+import cartopy.crs as ccrs
 import geoviews as gv
 
 map_tile_options = list(gv.tile_sources.tile_sources.keys())
@@ -25,12 +39,21 @@ map_tile_options = list(gv.tile_sources.tile_sources.keys())
 
 
 def plot_tracks_with_tiles(
-    tracks, tiles="StamenTerrain", datashade=True, cmap="fire", c="r", marker="circle", alpha=0.3
+    tracks, tiles="StamenTerrain", datashade=True, cmap="fire", c="r", marker="circle", alpha=0.3, density=None
 ):
     """
     Hvplot map of tracks with background map tiles
+
+    If a density pyramid of the tracks is given (see :func:`ecodata.tile_utils.build_track_tiles`), the datashaded map
+    is drawn from the pyramid instead of aggregating the points again on every zoom and pan.
     """
 
+    if datashade and density is not None:
+        plot = plot_track_density(density, cmap=cmap)
+        if tiles:
+            plot = plot_map_tiles(tiles) * plot
+        return plot.opts(responsive=True)
+
     plot = tracks.hvplot.points(
         "location_long",
         "location_lat",
@@ -47,19 +70,208 @@ def plot_tracks_with_tiles(
     return plot
 
 
-def plot_gridded_data(ds, x="longitude", y="latitude", z="t2m", time="time", cmap="coolwarm", fix_clim=True):
+def plot_map_tiles(tiles="StamenTerrain"):
+    """
+    Background map tiles, to be overlaid with other map layers. Returns None if no tiles are selected.
+    """
+    if not tiles:
+        return None
+    return gv.tile_sources.tile_sources[tiles]().opts(responsive=True)
+
+
+def plot_track_density(density, cmap="fire"):
+    """
+    Map of the fix counts of a density pyramid (see :class:`ecodata.tile_utils.DensityPyramid`), in Web Mercator
+    coordinates. The counts are read from the pyramid level matching the current zoom and plot size.
+    """
+
+    def plot_view(x_range=None, y_range=None, width=None, height=None, scale=1.0):
+        counts, bounds = density.image(x_range, y_range, width=width or 800, height=height or 600)
+        return gv.Image(counts, bounds=bounds, crs=ccrs.GOOGLE_MERCATOR, vdims=["count"]).opts(
+            cmap=cmap, cnorm="eq_hist", alpha=0.8
+        )
+
+    return hv.DynamicMap(plot_view, streams=[hv.streams.RangeXY(), hv.streams.PlotSize()])
+
+
+def plot_gridded_data(ds, x="longitude", y="latitude", z="t2m", time="time", cmap="coolwarm", fix_clim=True,
+                      robust=False):
+    """
+    Hvplot map of gridded data with a time widget.
+
+    With ``fix_clim``, the color limits are the same for all timesteps. They are estimated from a sample of the data
+    (see :class:`ClimCache`), so the plot doesn't have to wait for a pass over the whole dataset. ``robust`` uses the
+    2nd and 98th percentiles instead of the minimum and maximum.
+    """
 
     if fix_clim:
-        clim = (ds[z].min(), ds[z].max())
+        clim = clim_cache.get(ds[z], robust=robust)
     else:
         clim = None
     return ds.hvplot(x=x, y=y, z=z, cmap=cmap, geo=True, clim=clim)
 
 
-def plot_avg_timeseries(ds, x="longitude", y="latitude", z="t2m", time="time", color="k"):
+def plot_avg_timeseries(ds, x="longitude", y="latitude", z="t2m", time="time", color="k", spatial_mean=None):
+    """
+    Line plot of the spatial mean of a variable over time.
+
+    If a :class:`SpatialMeanCache` is provided, the mean is taken from its cached aggregates (with the timesteps
+    missing from ``ds`` left empty) instead of being computed from ``ds``.
+    """
+    if spatial_mean is not None:
+        return spatial_mean.mean(times=ds[time].values).hvplot.line(time, color=color)
     return ds[z].mean([x, y]).hvplot.line(time, color=color)
 
 
+class SpatialMeanCache:
+    """
+    Cached spatial mean of a gridded variable for each timestep, under a changing spatial mask.
+
+    The sum and the number of valid cells of each timestep are computed once for the selected cells, and are updated
+    incrementally when the mask changes, by only reading the cells that were added to or removed from the selection.
+    Selecting timesteps doesn't need any computation.
+
+    Parameters
+    ----------
+    da : xarray.DataArray
+        Gridded variable, without any filters applied
+    x : str, optional
+        Label of the x (longitude) dimension, by default 'longitude'
+    y : str, optional
+        Label of the y (latitude) dimension, by default 'latitude'
+    time : str, optional
+        Label of the time dimension, by default 'time'
+    area_weighted : bool, optional
+        Whether to weight the cells by their area (cosine of the latitude), by default False
+    """
+
+    def __init__(self, da, x="longitude", y="latitude", time="time", area_weighted=False):
+        self.da = da.transpose(time, y, x)
+        self.x, self.y, self.time = x, y, time
+        self.version = data_version(da)
+        shape = (da.sizes[y], da.sizes[x])
+        if area_weighted:
+            self.weights = np.broadcast_to(np.cos(np.deg2rad(da[y].values))[:, np.newaxis], shape)
+        else:
+            self.weights = np.ones(shape)
+        self.mask = None
+        self.sum = None
+        self.count = None
+        self._lock = threading.Lock()
+
+    def update(self, mask=None):
+        """
+        Update the aggregates for a new spatial mask.
+
+        Parameters
+        ----------
+        mask : array-like, optional
+            Boolean mask over the (y, x) grid of the variable, True for the selected cells. By default all cells are
+            selected.
+
+        Returns
+        -------
+        SpatialMeanCache
+            The updated cache
+        """
+        return self.set_aggregates(self.aggregates(mask))
+
+    def aggregates(self, mask=None):
+        """
+        Aggregates for a new spatial mask, computed from the current ones, without updating the cache.
+
+        The aggregates can be computed in a background thread while the cache is in use, and set with
+        :meth:`set_aggregates` from the thread using it.
+
+        Parameters
+        ----------
+        mask : array-like, optional
+            Boolean mask over the (y, x) grid of the variable, True for the selected cells. By default all cells are
+            selected.
+
+        Returns
+        -------
+        tuple
+            The mask, and the weighted sum and weighted number of valid values per timestep
+        """
+        mask = np.ones(self.weights.shape, dtype=bool) if mask is None else np.asarray(mask, dtype=bool)
+        with self._lock:
+            current = (self.mask, self.sum, self.count)
+        old_mask, old_sum, old_count = current
+        if old_mask is not None and np.array_equal(mask, old_mask):
+            return current
+
+        if old_mask is not None:
+            added = mask & ~old_mask
+            removed = old_mask & ~mask
+            # Only read the changed cells if that's less data than the new selection
+            if _bbox_size(added) + _bbox_size(removed) < _bbox_size(mask):
+                added_sum, added_count = self._aggregate(added)
+                removed_sum, removed_count = self._aggregate(removed)
+                return mask, old_sum + added_sum - removed_sum, old_count + added_count - removed_count
+
+        return (mask, *self._aggregate(mask))
+
+    def set_aggregates(self, aggregates):
+        """
+        Set the aggregates computed by :meth:`aggregates`.
+
+        Returns
+        -------
+        SpatialMeanCache
+            The updated cache
+        """
+        with self._lock:
+            self.mask, self.sum, self.count = aggregates
+        return self
+
+    def mean(self, times=None):
+        """
+        Spatial mean for each timestep of the variable.
+
+        Parameters
+        ----------
+        times : array-like, optional
+            Timesteps to include. The mean of the other timesteps is NaN. By default all timesteps are included.
+
+        Returns
+        -------
+        xarray.DataArray
+            Spatial mean with the time dimension of the variable
+        """
+        if self.mask is None:
+            self.update()
+        with np.errstate(invalid="ignore", divide="ignore"):
+            # Sums of removed cells can leave rounding errors where no cells are left
+            mean = np.where(self.count > 1e-9, self.sum / self.count, np.nan)
+        result = xr.DataArray(mean, dims=self.time, coords={self.time: self.da[self.time]}, name=self.da.name)
+        if times is not None:
+            result = result.where(self.da.indexes[self.time].isin(times))
+        return result
+
+    def _aggregate(self, mask):
+        """Weighted sum and weighted number of valid values per timestep over the masked cells"""
+        rows = np.flatnonzero(mask.any(axis=1))
+        cols = np.flatnonzero(mask.any(axis=0))
+        if not len(rows):
+            return np.zeros(self.da.sizes[self.time]), np.zeros(self.da.sizes[self.time])
+
+        # Only read the bounding box of the masked cells
+        window = (slice(rows[0], rows[-1] + 1), slice(cols[0], cols[-1] + 1))
+        da = self.da.isel({self.y: window[0], self.x: window[1]})
+        weights = xr.DataArray(np.where(mask, self.weights, 0)[window], dims=(self.y, self.x))
+        total = (da.fillna(0) * weights).sum([self.y, self.x])
+        count = (da.notnull() * weights).sum([self.y, self.x])
+        total, count = dask.compute(total, count)
+        return total.values, count.values
+
+
+def _bbox_size(mask):
+    rows = np.flatnonzero(mask.any(axis=1))
+    cols = np.flatnonzero(mask.any(axis=0))
+    return (rows[-1] - rows[0] + 1) * (cols[-1] - cols[0] + 1) if len(rows) else 0
+
+
 def plot_gridded_time_slice(ds, timevar, zvar, time, lonvar='longitude',
                             latvar='latitude', clim=None, width=500):
     ds_slice = ds[zvar].sel({timevar: time})
@@ -68,12 +280,329 @@ def plot_gridded_time_slice(ds, timevar, zvar, time, lonvar='longitude',
     return fig
 
 
+def plot_pyramid_time_slice(pyramid, timevar, zvar, time, lonvar='longitude', latvar='latitude', clim=None,
+                            width=500, height=None):
+    """
+    Map of one timestep of a multiscale pyramid (see :func:`ecodata.pyramid_utils.build_pyramid`).
+
+    The map is redrawn from the coarsest level that has enough cells for the plot whenever the plot is zoomed or
+    panned, so only about one cell per pixel is read and sent to the browser.
+    """
+    height = height or width
+
+    def plot_view(x_range=None, y_range=None):
+        ds_view = pyramid.select(x_range=x_range, y_range=y_range, width=width, height=height)
+        return ds_view[zvar].sel({timevar: time}).hvplot.image(
+            cmap='Greens', x=lonvar, y=latvar, geo=True, clim=clim
+        ).opts(frame_width=width)
+
+    return hv.DynamicMap(plot_view, streams=[hv.streams.RangeXY()])
+
+
+class FrameCache:
+    """
+    Least recently used cache of rendered frames (e.g. the map of one timestep), with a memory budget.
+
+    Frames can be prefetched in a background thread, so they are ready before they're requested.
+
+    Parameters
+    ----------
+    max_bytes : int, optional
+        Memory budget for the data of the cached frames, by default 512 MiB. The least recently used frames are
+        evicted when the budget is exceeded.
+    prefetch_workers : int, optional
+        Number of background threads used to prefetch frames, by default 1
+    """
+
+    def __init__(self, max_bytes=512 * 2**20, prefetch_workers=1):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._frames = OrderedDict()
+        self._pending = {}
+        self._lock = threading.RLock()
+        self._executor = ThreadPoolExecutor(max_workers=prefetch_workers, thread_name_prefix="ecodata-prefetch")
+
+    def get(self, key, load):
+        """
+        Get a frame from the cache, loading it if it isn't cached.
+
+        Parameters
+        ----------
+        key : hashable
+            Key of the frame
+        load : callable
+            Function without arguments returning the frame and the size of its data in bytes
+
+        Returns
+        -------
+        object
+            The frame
+        """
+        with self._lock:
+            if key in self._frames:
+                self._frames.move_to_end(key)
+                return self._frames[key][0]
+            pending = self._pending.get(key)
+        if pending is not None:
+            # Being prefetched, wait for it instead of loading it twice
+            return pending.result()
+        return self._load(key, load)
+
+    def prefetch(self, key, load):
+        """
+        Load a frame in a background thread if it isn't cached or already being loaded.
+        """
+        with self._lock:
+            if key in self._frames or key in self._pending:
+                return
+            self._pending[key] = self._executor.submit(self._load, key, load)
+
+    def clear(self):
+        with self._lock:
+            self._frames.clear()
+            self.nbytes = 0
+
+    def __contains__(self, key):
+        return key in self._frames
+
+    def __len__(self):
+        return len(self._frames)
+
+    def _load(self, key, load):
+        try:
+            frame, nbytes = load()
+            with self._lock:
+                if key not in self._frames:
+                    self._frames[key] = (frame, nbytes)
+                    self.nbytes += nbytes
+                self._evict()
+            return frame
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+
+    def _evict(self):
+        # Keep at least the most recent frame, even if it's larger than the budget
+        while self.nbytes > self.max_bytes and len(self._frames) > 1:
+            _, (_, nbytes) = self._frames.popitem(last=False)
+            self.nbytes -= nbytes
+
+
+frame_cache = FrameCache()
+
+_data_versions = {}
+# Versions are never reused, even after the array they were given to is gone and its id is reused
+_version_counter = itertools.count()
+
+
+def _forget_version(ref, key):
+    entry = _data_versions.get(key)
+    if entry is not None and entry[0] is ref:
+        del _data_versions[key]
+
+
+def data_version(da):
+    """
+    Key identifying the data of a DataArray, for caching things computed from it.
+
+    Dask-backed arrays are identified by their graph name, which changes whenever the data changes. In-memory arrays
+    are identified by the array object, for as long as it exists.
+    """
+    if is_dask_backed(da):
+        return da.data.name
+    data = da.variable._data
+    key = id(data)
+    cached = _data_versions.get(key)
+    if cached is not None and cached[0]() is data:
+        return cached[1]
+    version = f"data-{next(_version_counter)}"
+    try:
+        ref = weakref.ref(data, lambda ref: _forget_version(ref, key))
+    except TypeError:
+        # Array-likes that can't be referenced aren't cached
+        return version
+    _data_versions[key] = (ref, version)
+    return version
+
+
+class ClimCache:
+    """
+    Cache of color limits for gridded variables.
+
+    The limits are first estimated from a strided sample of the data, which only reads a small part of a dask-backed
+    dataset. The exact limits are then computed in a background thread and replace the estimate in the cache. Limits
+    are cached per data version (see :func:`data_version`) and variable.
+
+    Parameters
+    ----------
+    max_samples : int, optional
+        Approximate number of values in the sample, by default 1,000,000
+    quantiles : tuple, optional
+        Quantiles used for robust limits, by default (0.02, 0.98)
+    """
+
+    def __init__(self, max_samples=1_000_000, quantiles=(0.02, 0.98)):
+        self.max_samples = max_samples
+        self.quantiles = quantiles
+        self._clims = {}
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ecodata-clim")
+
+    def get(self, da, robust=False, refine=True, on_refine=None):
+        """
+        Color limits for a variable.
+
+        Parameters
+        ----------
+        da : xarray.DataArray
+            Variable to plot
+        robust : bool, optional
+            Whether to use the quantiles of the data (by default the 2nd and 98th percentiles) instead of the minimum
+            and maximum, by default False
+        refine : bool, optional
+            Whether to compute the exact limits in the background if only an estimate is cached, by default True
+        on_refine : callable, optional
+            Function called with the exact limits once they are computed (from the background thread)
+
+        Returns
+        -------
+        tuple
+            Lower and upper color limits
+        """
+        key = (data_version(da), da.name, robust)
+        with self._lock:
+            cached = self._clims.get(key)
+        if cached is None:
+            cached = (sample_clim(da, self.quantiles if robust else None, self.max_samples), False)
+            with self._lock:
+                self._clims.setdefault(key, cached)
+
+        clim, exact = cached
+        if refine and not exact:
+            with self._lock:
+                if key not in self._pending:
+                    self._pending[key] = self._executor.submit(self._refine, key, da, robust, on_refine)
+        return clim
+
+    def is_exact(self, da, robust=False):
+        """
+        Whether the cached limits of a variable are exact, rather than estimated from a sample.
+        """
+        cached = self._clims.get((data_version(da), da.name, robust))
+        return cached is not None and cached[1]
+
+    def wait(self):
+        """
+        Wait for the limits that are being refined in the background.
+        """
+        for future in list(self._pending.values()):
+            future.result()
+
+    def clear(self):
+        with self._lock:
+            self._clims.clear()
+
+    def _refine(self, key, da, robust, on_refine):
+        try:
+            clim = exact_clim(da, self.quantiles if robust else None)
+            with self._lock:
+                self._clims[key] = (clim, True)
+            if on_refine is not None:
+                on_refine(clim)
+            return clim
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+
+
+def sample_clim(da, quantiles=None, max_samples=1_000_000):
+    """
+    Estimate color limits from a sample of a variable.
+
+    The sample is made of whole chunks of dask-backed variables, evenly spaced over their blocks, so only the chunks
+    in the sample are read. Other variables are sampled by whole slices along their first dimension (e.g. timesteps).
+
+    Parameters
+    ----------
+    da : xarray.DataArray
+        Variable to plot
+    quantiles : tuple, optional
+        Lower and upper quantiles to use as limits. By default the minimum and maximum of the sample are used.
+    max_samples : int, optional
+        Approximate number of values in the sample, by default 1,000,000. At least one chunk or slice is read.
+
+    Returns
+    -------
+    tuple
+        Lower and upper color limits
+    """
+    if da.ndim == 0:
+        sample = np.asarray(da.values, dtype=float)
+    elif is_dask_backed(da):
+        numblocks = da.data.numblocks
+        n_blocks = math.prod(numblocks)
+        n_sampled = min(max(math.ceil(max_samples * n_blocks / max(da.size, 1)), 1), n_blocks)
+        flat_indices = np.unique(np.linspace(0, n_blocks - 1, n_sampled).round().astype(int))
+        blocks = [da.data.blocks[index] for index in zip(*np.unravel_index(flat_indices, numblocks))]
+        sample = np.concatenate([np.ravel(block) for block in dask.compute(*blocks)]).astype(float)
+    else:
+        dim = da.dims[0]
+        n_sampled = min(max(math.ceil(max_samples * da.sizes[dim] / max(da.size, 1)), 1), da.sizes[dim])
+        indices = np.unique(np.linspace(0, da.sizes[dim] - 1, n_sampled).round().astype(int))
+        sample = np.asarray(da.isel({dim: indices}).values, dtype=float)
+    if quantiles is None:
+        return float(np.nanmin(sample)), float(np.nanmax(sample))
+    low, high = np.nanquantile(sample, quantiles)
+    return float(low), float(high)
+
+
+def exact_clim(da, quantiles=None, bins=4096):
+    """
+    Compute color limits from all values of a variable.
+
+    Quantiles are computed from a histogram of the data, so dask-backed variables are reduced chunk by chunk in two
+    passes (one for the range and one for the histogram). Their precision is 1/``bins`` of the range of the data.
+
+    Parameters
+    ----------
+    da : xarray.DataArray
+        Variable to plot
+    quantiles : tuple, optional
+        Lower and upper quantiles to use as limits. By default the minimum and maximum are used.
+    bins : int, optional
+        Number of histogram bins used for the quantiles, by default 4096
+
+    Returns
+    -------
+    tuple
+        Lower and upper color limits
+    """
+    vmin, vmax = dask.compute(da.min(), da.max())
+    vmin, vmax = float(vmin), float(vmax)
+    if quantiles is None or vmin == vmax:
+        return vmin, vmax
+
+    data = da.data
+    if is_dask_backed(da):
+        counts, edges = dask.array.histogram(data[~dask.array.isnan(data)], bins=bins, range=(vmin, vmax))
+        counts = counts.compute()
+    else:
+        counts, edges = np.histogram(data[~np.isnan(data)], bins=bins, range=(vmin, vmax))
+    cumulative = np.concatenate([[0], np.cumsum(counts)]) / counts.sum()
+    low, high = np.interp(quantiles, cumulative, edges)
+    return float(low), float(high)
+
+
+clim_cache = ClimCache()
+
+
 class GriddedPlotWithSlider(param.Parameterized):
     time_slider = param_widget(pn.widgets.DiscreteSlider(name="Datetime slider", align="center"))
     fig = param.ClassSelector(class_=pn.pane.HoloViews, default=pn.pane.HoloViews(sizing_mode="stretch_both"))
 
     def __init__(self, ds, timevar, zvar, lonvar='longitude', latvar='latitude',
-                 clim=None, width=500, **params):
+                 clim=None, width=500, cache=None, prefetch=1, pyramid=None, **params):
         super().__init__(**params)
 
         # Rename
@@ -83,26 +612,68 @@ class GriddedPlotWithSlider(param.Parameterized):
         vals = ds[timevar].values
         options = {str(label): val for (label, val) in zip(ds.indexes[timevar], vals)}
 
-        self.ds = ds
+        # Plots show one timestep at a time, so use chunks that are large in space
+        self.ds = rechunk_for(ds, "map", timevar=timevar)
         self.timevar = timevar
         self.zvar = zvar
         self.lonvar=lonvar
         self.latvar=latvar
         self.clim=clim
         self.width = width
+        self.pyramid = pyramid
+
+        # Rendered timesteps are cached, and the neighbours of the shown timestep are loaded in the background
+        self.cache = cache if cache is not None else frame_cache
+        self.prefetch = prefetch
+        self.times = vals
+        self._positions = {val: i for i, val in enumerate(vals)}
+        self._version = data_version(self.ds[zvar])
+        # Frames drawn from a pyramid also depend on its levels
+        self._pyramid_version = (
+            tuple(data_version(level[zvar]) for level in pyramid.levels) if pyramid is not None else None
+        )
 
         self.time_slider.options = options
         self.time_slider.width = width
-        self.fig.object = plot_gridded_time_slice(self.ds, self.timevar, self.zvar,
-                                                  vals[0], clim=clim, width=self.width,
-                                                  lonvar=self.lonvar, latvar=self.latvar)
+        self.fig.object = self.get_frame(vals[0])
         self.fig_with_widget = pn.Column(self.fig, self.time_slider)
 
 
     @param.depends("time_slider.value_throttled", watch=True)
     def plot_slice(self):
+        self.fig.object = self.get_frame(self.time_slider.value)
+
+    def get_frame(self, time):
+        """
+        Plot of one timestep, from the frame cache if it was already rendered. The neighbouring timesteps are
+        prefetched.
+        """
+        fig = self.cache.get(self._frame_key(time), lambda: self._render_frame(time))
+        position = self._positions.get(time)
+        if position is not None:
+            for offset in range(1, self.prefetch + 1):
+                for neighbour in (position + offset, position - offset):
+                    if 0 <= neighbour < len(self.times):
+                        neighbour_time = self.times[neighbour]
+                        self.cache.prefetch(
+                            self._frame_key(neighbour_time), lambda t=neighbour_time: self._render_frame(t)
+                        )
+        return fig
+
+    def _frame_key(self, time):
+        clim = tuple(float(c) for c in self.clim) if self.clim is not None else None
+        return (self._version, self._pyramid_version, self.zvar, time, clim, self.width)
+
+    def _render_frame(self, time):
+        if self.pyramid is not None:
+            # The level is read when the plot is drawn, for its current viewport
+            fig = plot_pyramid_time_slice(self.pyramid, self.timevar, self.zvar, time, lonvar=self.lonvar,
+                                          latvar=self.latvar, clim=self.clim, width=self.width)
+            # About one cell per pixel of the (square) plot is read for each view
+            return fig, self.width * self.width * self.ds[self.zvar].dtype.itemsize
 
-        fig = plot_gridded_time_slice(self.ds, self.timevar, self.zvar, self.time_slider.value,
-                                      lonvar=self.lonvar, latvar=self.latvar,
-                                      clim=self.clim, width=self.width)
-        self.fig.object = fig
+        # Load the timestep once, so rasterizing it doesn't read it again
+        ds_time = self.ds[[self.zvar]].sel({self.timevar: [time]}).load()
+        fig = plot_gridded_time_slice(ds_time, self.timevar, self.zvar, time, lonvar=self.lonvar,
+                                      latvar=self.latvar, clim=self.clim, width=self.width)
+        return fig, ds_time.nbytes
@@ -0,0 +1,207 @@
+"""
+Multiscale pyramids of gridded datasets, stored as Zarr groups of successively 2x coarsened levels, so maps can be
+drawn from the coarsest level that still has enough cells for the screen.
+"""
+from __future__ import annotations
+
+import logging
+from pathlib import Path
+
+import numpy as np
+import xarray as xr
+import zarr
+
+from ecodata.xr_tools import coarsen_dataset, write_dataset
+
+logger = logging.getLogger(__file__)
+
+MULTISCALES_VERSION = "0.4"
+
+
+def build_pyramid(ds, outfile, latvar="latitude", lonvar="longitude", min_size=256, how="mean", **kwargs):
+    """
+    Write a multiscale pyramid of a gridded dataset to a Zarr store.
+
+    Level 0 is the dataset at full resolution, and each following level is coarsened 2x along latitude and longitude
+    from the level before it, until the grid is no larger than ``min_size`` cells along both dimensions. Each level is
+    a group of the store ('0', '1', ...), described in the 'multiscales' attribute of the root group. Each level is
+    computed from the level written before it, so building the pyramid reads the source data only once.
+
+    Parameters
+    ----------
+    ds : xarray.Dataset
+        Gridded dataset
+    outfile : str or pathlib.Path
+        Path of the Zarr store (.zarr) to write
+    latvar : str, optional
+        Label of the latitude dimension, by default 'latitude'
+    lonvar : str, optional
+        Label of the longitude dimension, by default 'longitude'
+    min_size : int, optional
+        Size of the coarsest level, by default 256 cells
+    how : str, optional
+        Aggregation used to coarsen the levels (see :func:`ecodata.xr_tools.coarsen_dataset`), by default 'mean'
+    **kwargs :
+        Additional arguments to be passed to :func:`ecodata.xr_tools.write_dataset`
+
+    Returns
+    -------
+    Pyramid
+        The pyramid, opened lazily from the store
+
+    Examples
+    --------
+    >>> pyramid = build_pyramid(ds, "ndvi_pyramid.zarr")
+    >>> ds_view = pyramid.select(x_range=(-120, -100), y_range=(40, 50), width=800, height=400)
+    """
+    outfile = Path(outfile)
+    if outfile.suffix != ".zarr":
+        raise ValueError(f"build_pyramid: the pyramid must be written to a Zarr store (.zarr), not {outfile}")
+
+    level_ds = ds
+    datasets = []
+    for level in range(64):
+        logger.info(f"Writing pyramid level {level} ({dict(level_ds.sizes)})")
+        write_dataset(level_ds, outfile, group=str(level), **kwargs)
+        datasets.append(dict(path=str(level), coarsening=2**level))
+
+        # Coarsen the level that was just written, rather than the whole graph of the levels before it
+        level_ds = xr.open_zarr(outfile, group=str(level))
+        if max(level_ds.sizes[latvar], level_ds.sizes[lonvar]) <= min_size or min(
+            level_ds.sizes[latvar], level_ds.sizes[lonvar]
+        ) < 2:
+            break
+        level_ds = coarsen_dataset(level_ds, {latvar: 2, lonvar: 2}, boundary="trim", how=how)
+
+    root = zarr.open_group(str(outfile), mode="a")
+    root.attrs["multiscales"] = [
+        dict(version=MULTISCALES_VERSION, name=outfile.stem, type=how, datasets=datasets, latvar=latvar, lonvar=lonvar)
+    ]
+    zarr.consolidate_metadata(str(outfile))
+    return open_pyramid(outfile)
+
+
+def is_pyramid(path):
+    """
+    Check whether a path is a Zarr store written by :func:`build_pyramid`.
+    """
+    path = Path(path)
+    if path.suffix != ".zarr" or not path.is_dir():
+        return False
+    try:
+        return "multiscales" in zarr.open_group(str(path), mode="r").attrs
+    except (OSError, ValueError, KeyError, zarr.errors.GroupNotFoundError):
+        return False
+
+
+def open_pyramid(path, chunks=None):
+    """
+    Open a multiscale pyramid written by :func:`build_pyramid`.
+
+    Parameters
+    ----------
+    path : str or pathlib.Path
+        Path of the Zarr store
+    chunks : dict, optional
+        Chunks for the dask arrays, by default the chunks of the store
+
+    Returns
+    -------
+    Pyramid
+        The pyramid, with each level opened lazily
+    """
+    multiscales = zarr.open_group(str(path), mode="r").attrs["multiscales"][0]
+    levels = [xr.open_zarr(path, group=dataset["path"], chunks=chunks) for dataset in multiscales["datasets"]]
+    return Pyramid(levels, latvar=multiscales["latvar"], lonvar=multiscales["lonvar"])
+
+
+class Pyramid:
+    """
+    Levels of a multiscale pyramid, from the finest (level 0) to the coarsest.
+
+    Parameters
+    ----------
+    levels : list[xarray.Dataset]
+        Datasets of the levels, from the finest to the coarsest
+    latvar : str, optional
+        Label of the latitude dimension, by default 'latitude'
+    lonvar : str, optional
+        Label of the longitude dimension, by default 'longitude'
+    """
+
+    def __init__(self, levels, latvar="latitude", lonvar="longitude"):
+        self.levels = levels
+        self.latvar = latvar
+        self.lonvar = lonvar
+
+    def __len__(self):
+        return len(self.levels)
+
+    def __getitem__(self, level):
+        return self.levels[level]
+
+    def __repr__(self):
+        sizes = [f"{ds.sizes[self.latvar]}x{ds.sizes[self.lonvar]}" for ds in self.levels]
+        return f"Pyramid(levels={len(self)}, sizes={sizes})"
+
+    def select_level(self, x_range=None, y_range=None, width=800, height=600):
+        """
+        Coarsest level with at least one cell per screen pixel in the viewport.
+
+        Parameters
+        ----------
+        x_range : tuple, optional
+            Longitude range of the viewport, by default the whole dataset
+        y_range : tuple, optional
+            Latitude range of the viewport, by default the whole dataset
+        width : int, optional
+            Width of the plot, in pixels, by default 800
+        height : int, optional
+            Height of the plot, in pixels, by default 600
+
+        Returns
+        -------
+        int
+            Index of the level
+        """
+        for level in range(len(self.levels) - 1, 0, -1):
+            ds = self.levels[level]
+            n_x = _cells_in_range(ds.indexes[self.lonvar], x_range)
+            n_y = _cells_in_range(ds.indexes[self.latvar], y_range)
+            if n_x >= width and n_y >= height:
+                return level
+        return 0
+
+    def select(self, x_range=None, y_range=None, width=800, height=600):
+        """
+        Dataset of the coarsest level that can fill the viewport (see :meth:`select_level`), cropped to the viewport.
+
+        Returns
+        -------
+        xarray.Dataset
+            Cropped dataset of the selected level
+        """
+        ds = self.levels[self.select_level(x_range, y_range, width=width, height=height)]
+        return ds.isel(
+            {
+                self.lonvar: _range_slice(ds.indexes[self.lonvar], x_range),
+                self.latvar: _range_slice(ds.indexes[self.latvar], y_range),
+            }
+        )
+
+
+def _cells_in_range(index, value_range):
+    if value_range is None or None in value_range:
+        return len(index)
+    values = index.values
+    return int(np.count_nonzero((values >= min(value_range)) & (values <= max(value_range))))
+
+
+def _range_slice(index, value_range):
+    """Positional slice of a monotonic coordinate covering a value range, with one extra cell on each side"""
+    if value_range is None or None in value_range:
+        return slice(None)
+    inside = np.flatnonzero((index.values >= min(value_range)) & (index.values <= max(value_range)))
+    if not len(inside):
+        return slice(0, 0)
+    return slice(max(inside[0] - 1, 0), inside[-1] + 2)
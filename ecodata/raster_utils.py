@@ -3,45 +3,339 @@ Utilities for reading and converting raster data.
 """
 from __future__ import annotations
 
+import json
+import logging
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from pathlib import Path
 
+import cfgrib
+import dask
+import dask.array
+import numpy as np
 import pandas as pd
+import rasterio
 import rioxarray  # noqa
 import xarray as xr
+from affine import Affine
+from dask.base import tokenize
+from rasterio.windows import Window
 
+from ecodata.collection import DatasetCollection
+from ecodata.xr_tools import write_dataset
 
+logger = logging.getLogger(__file__)
 
-def grib2nc(filein, fileout):
+RASTER_INDEX_FILENAME = ".ecodata_raster_index.json"
+MANIFEST_FILENAME = ".ecodata_manifest.jsonl"
+
+
+GRIB_SPLITS = ("variables", "groups")
+GRIB_SUFFIXES = (".grib", ".grib2", ".grb", ".grb2")
+
+
+def grib2nc(filein, fileout, filter_by_keys=None, split="variables", chunks=None, index_dir=None, **kwargs):
     """
-    Converts .grib files from ECMWF to .nc format.
+    Converts .grib files from ECMWF to .nc (or .zarr) format.
+
+    The GRIB messages are decoded lazily and streamed to the output file one chunk at a time, so files that don't fit
+    in memory can be converted. cfgrib writes an index of the messages next to the GRIB file (or in ``index_dir``),
+    which is reused by later conversions of the same file.
+
+    GRIB files with several level types (e.g. ERA5 files with pressure level and single level variables) can't be
+    read as one hypercube. They are split into one hypercube per level type, and written either as separate variables
+    of one dataset or as separate groups of the output file (see ``split``).
 
     Parameters
     ----------
-    filein : str
+    filein : str or pathlib.Path
         .grib file to convert
-    fileout : str
-        Output filename where the .nc file will be written
+    fileout : str or pathlib.Path
+        Output filename where the .nc (or .zarr) file will be written
+    filter_by_keys : dict, optional
+        Only convert the messages matching these GRIB keys, e.g. {'typeOfLevel': 'isobaricInhPa', 'shortName': 't'}.
+        By default all messages are converted.
+    split : str, optional
+        How to write files with several level types. 'variables' (default) writes all of them as variables of one
+        dataset. Variables with the same name on different level types are suffixed with the level type
+        (e.g. 't_isobaricInhPa'). 'groups' writes one group per level type (e.g. 'isobaricInhPa', 'surface').
+    chunks : dict, optional
+        Chunks for the dask arrays, by default one chunk per GRIB message
+    index_dir : str or pathlib.Path, optional
+        Directory where the cfgrib index is stored, by default next to the GRIB file
+    **kwargs :
+        Additional arguments to be passed to :func:`ecodata.xr_tools.write_dataset` (e.g. compression options)
+
+    Returns
+    -------
+    pathlib.Path
+        Path to the output file
+    """
+    if split not in GRIB_SPLITS:
+        raise ValueError(f"grib2nc: split must be one of {GRIB_SPLITS}, not {split!r}")
+
+    backend_kwargs = dict(filter_by_keys=filter_by_keys or {})
+    if index_dir is not None:
+        Path(index_dir).mkdir(parents=True, exist_ok=True)
+        backend_kwargs["indexpath"] = str(Path(index_dir) / f"{Path(filein).name}.{{short_hash}}.idx")
+
+    # One lazily loaded dataset per hypercube of the GRIB file
+    hypercubes = cfgrib.open_datasets(str(filein), backend_kwargs=backend_kwargs, chunks=chunks or {})
+    if not hypercubes:
+        raise ValueError(f"grib2nc: no GRIB messages in {filein} match {filter_by_keys}")
+
+    groups = {}
+    for ds in hypercubes:
+        groups.setdefault(_level_type(ds), []).append(ds)
+
+    fileout = Path(fileout)
+    if split == "groups":
+        for i, (level_type, datasets) in enumerate(groups.items()):
+            # Zarr groups are written separately, netCDF groups are added to the file written for the first group
+            if i > 0 and fileout.suffix != ".zarr":
+                kwargs["mode"] = "a"
+            write_dataset(_merge_hypercubes(datasets), fileout, group=level_type, **kwargs)
+    else:
+        # Variables on more than one level type are suffixed with the level type of each of their hypercubes
+        group_vars = [{var for ds in datasets for var in ds.data_vars} for datasets in groups.values()]
+        duplicated = {var for names in group_vars for var in names if sum(var in other for other in group_vars) > 1}
+        for level_type, datasets in groups.items():
+            for i, ds in enumerate(datasets):
+                datasets[i] = ds.rename({var: f"{var}_{level_type}" for var in ds.data_vars if var in duplicated})
+        write_dataset(_merge_hypercubes([ds for datasets in groups.values() for ds in datasets]), fileout, **kwargs)
+
+    return fileout
+
+
+def grib2nc_batch(data_dir, out_dir, pattern="*.grib", suffix=".nc", max_workers=None, **kwargs):
+    """
+    Convert a directory of GRIB files with :func:`grib2nc`, converting several files at once in a process pool.
+
+    Parameters
+    ----------
+    data_dir : str or pathlib.Path
+        Directory containing the GRIB files
+    out_dir : str or pathlib.Path
+        Directory where the converted files will be written, with the same names as the GRIB files
+    pattern : str, optional
+        Glob pattern for the GRIB files in the directory, by default '*.grib'
+    suffix : str, optional
+        Suffix of the converted files, '.nc' (default) or '.zarr'
+    max_workers : int, optional
+        Number of processes, by default the number of CPUs
+    **kwargs :
+        Additional arguments to be passed to :func:`grib2nc`
+
+    Returns
+    -------
+    list[pathlib.Path]
+        Paths to the converted files
+    """
+    files = sorted(Path(data_dir).glob(pattern))
+    report = convert_batch(files, out_dir, suffix=suffix, max_workers=max_workers, resume=False, **kwargs)
+    if report["failed"]:
+        raise RuntimeError(f"grib2nc_batch: failed to convert {report['failed']}")
+    return report["outputs"]
+
+
+def convert_batch(inputs, out_dir, suffix=".nc", max_workers=None, manifest_file=None, resume=True, **kwargs):
+    """
+    Convert many GRIB files (with :func:`grib2nc`) and GeoTIFF directories (with :func:`geotif2nc`) in a process pool.
+
+    Each completed conversion is recorded in a manifest file in the output directory as soon as it finishes. When
+    ``resume`` is True, inputs that are recorded in the manifest (and haven't been modified since) are skipped, so an
+    interrupted batch can be restarted without redoing completed work. Inputs that fail to convert are reported and
+    don't stop the batch.
+
+    Parameters
+    ----------
+    inputs : list[str or pathlib.Path]
+        GRIB files, or directories of GeoTIFF files (one output per directory)
+    out_dir : str or pathlib.Path
+        Directory where the converted files will be written, named after the inputs
+    suffix : str, optional
+        Suffix of the converted files, '.nc' (default) or '.zarr'
+    max_workers : int, optional
+        Number of processes, by default the number of CPUs
+    manifest_file : str or pathlib.Path, optional
+        Path of the manifest, by default '.ecodata_manifest.jsonl' in the output directory
+    resume : bool, optional
+        Whether to skip inputs that were already converted according to the manifest, by default True
+    **kwargs :
+        Additional arguments to be passed to the converters (e.g. compression options)
+
+    Returns
+    -------
+    dict
+        Summary of the batch: 'outputs' (paths of the converted and skipped outputs, in the order of the inputs),
+        'converted' and 'skipped' (lists of inputs), 'failed' (dict of input and error message), 'seconds' (elapsed
+        time) and 'bytes' (size of the converted inputs)
     """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    manifest_file = Path(manifest_file) if manifest_file is not None else out_dir / MANIFEST_FILENAME
+    completed = read_manifest(manifest_file) if resume else {}
 
-    # Read the .grib file using xarray and the cfgrib engine
-    ds = xr.load_dataset(filein, engine="cfgrib")
+    report = dict(outputs=[], converted=[], skipped=[], failed={}, seconds=0.0, bytes=0)
+    jobs = {}
+    for filein in map(Path, inputs):
+        converter = _converter_for(filein)
+        fileout = out_dir / f"{filein.name if filein.is_dir() else filein.stem}{suffix}"
+        report["outputs"].append(fileout)
+        record = completed.get(str(filein.resolve()))
+        mtime = _path_mtime(filein, kwargs.get("pattern", "*.tif"))
+        if record is not None and record["mtime"] == mtime and Path(record["output"]).exists():
+            report["skipped"].append(filein)
+        else:
+            jobs[filein] = (converter, fileout)
 
-    # Write the dataset to a netcdf file
-    ds.to_netcdf(fileout)
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=max_workers) as executor, open(manifest_file, "a") as manifest:
+        futures = {
+            executor.submit(_convert_worker, converter, filein, fileout, **kwargs): filein
+            for filein, (converter, fileout) in jobs.items()
+        }
+        for future in as_completed(futures):
+            filein = futures[future]
+            try:
+                record = future.result()
+            except Exception as e:
+                logger.warning(f"Failed to convert {filein}: {e}")
+                report["failed"][filein] = str(e)
+                continue
+            manifest.write(json.dumps(record) + "\n")
+            manifest.flush()
+            report["converted"].append(filein)
+            report["bytes"] += record["size"]
+    report["seconds"] = time.perf_counter() - start
+    return report
 
 
-def geotif2nc(data_dir, fileout):
+def read_manifest(manifest_file):
+    """
+    Read the records of completed conversions from a :func:`convert_batch` manifest.
+
+    Parameters
+    ----------
+    manifest_file : str or pathlib.Path
+        Path of the manifest
+
+    Returns
+    -------
+    dict
+        Latest record for each input path
+    """
+    records = {}
+    if not Path(manifest_file).exists():
+        return records
+    with open(manifest_file) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # Last line of a manifest written during a crash
+                continue
+            records[record["input"]] = record
+    return records
+
+
+def _converter_for(path):
+    if path.is_dir():
+        return "geotif2nc"
+    if path.suffix in GRIB_SUFFIXES:
+        return "grib2nc"
+    raise ValueError(f"convert_batch: don't know how to convert {path}, expected a GRIB file or a GeoTIFF directory")
+
+
+def _source_files(path, pattern="*.tif"):
+    """Files converted from an input: the input file, or the files of a directory matching the GeoTIFF pattern"""
+    if not path.is_dir():
+        return [path]
+    # Files written next to the sources (e.g. the RasterStack index) don't change the sources
+    return [
+        f for f in path.glob(pattern) if f.is_file() and f.name not in (RASTER_INDEX_FILENAME, MANIFEST_FILENAME)
+    ]
+
+
+def _path_mtime(path, pattern="*.tif"):
+    """Modification time of a file, or of the most recently modified source file in a directory"""
+    return max([f.stat().st_mtime for f in _source_files(path, pattern)] or [path.stat().st_mtime])
+
+
+def _path_size(path, pattern="*.tif"):
+    return sum(f.stat().st_size for f in _source_files(path, pattern))
+
+
+def _convert_worker(converter, filein, fileout, **kwargs):
+    # Each process already converts a file, so dask doesn't start more threads
+    with dask.config.set(scheduler="synchronous"):
+        if converter == "grib2nc":
+            grib2nc(filein, fileout, **kwargs)
+        else:
+            geotif2nc(filein, fileout, **kwargs)
+    return dict(
+        input=str(Path(filein).resolve()),
+        output=str(fileout),
+        converter=converter,
+        mtime=_path_mtime(filein, kwargs.get("pattern", "*.tif")),
+        size=_path_size(filein, kwargs.get("pattern", "*.tif")),
+    )
+
+
+def _level_type(ds):
+    """GRIB level type (e.g. 'isobaricInhPa') of a hypercube opened with cfgrib"""
+    level_types = {var.attrs.get("GRIB_typeOfLevel") for var in ds.data_vars.values()}
+    return level_types.pop() if len(level_types) == 1 and None not in level_types else "unknown"
+
+
+def _merge_hypercubes(datasets):
+    """
+    Merge cfgrib hypercubes, moving the scalar level coordinates (e.g. 2 m and 10 m heights) to variable attributes
+    """
+    merged = []
+    for ds in datasets:
+        level_type = _level_type(ds)
+        if level_type in ds.coords and ds[level_type].ndim == 0:
+            level = ds[level_type].item()
+            ds = ds.drop_vars(level_type).copy()
+            for var in ds.data_vars.values():
+                var.attrs[f"GRIB_{level_type}"] = level
+        merged.append(ds)
+    try:
+        return xr.merge(merged, compat="no_conflicts", join="outer", combine_attrs="drop_conflicts")
+    except xr.MergeError as e:
+        raise ValueError(
+            "grib2nc: the GRIB hypercubes have conflicting coordinates and can't be written as one dataset. "
+            "Use split='groups' or filter_by_keys to convert them separately."
+        ) from e
+
+
+def geotif2nc(data_dir, fileout, time_parser=None, pattern="*.tif", chunks=True, max_workers=None, **kwargs):
     """
     Convert a stack of geotif files to an xarray object and saves to a netcdf file. Returns the xarray Dataset.
-    Note: Currently only set up to handle MODIS geotif files.
+
+    The files are opened lazily in parallel (one thread per file header), ordered by time, and written to the output
+    file chunk by chunk, so the stack doesn't need to fit in memory.
 
     Parameters
     ----------
     data_dir : str or pathlib.Path
         Directory containing the tif files
     fileout : str or pathlib.Path
-        Output filename where the netcdf will be written
-
+        Output filename where the netcdf (or .zarr) will be written
+    time_parser : callable, optional
+        Function returning the timestamp of a file from its filename (see :func:`make_time_parser`). By default, the
+        day of year in MODIS filenames is used (see :func:`time_index_from_filenames`).
+    pattern : str, optional
+        Glob pattern for the tif files in the directory, by default '*.tif'
+    chunks : dict, int, or bool, optional
+        Chunks for the dask array of each file, passed to rioxarray.open_rasterio. By default True, which uses the
+        internal tiling of the files.
+    max_workers : int, optional
+        Number of threads used to open the files, by default the ThreadPoolExecutor default
+    **kwargs :
+        Additional arguments to be passed to :func:`ecodata.xr_tools.write_dataset` (e.g. compression options)
 
     Returns
     -------
@@ -49,39 +343,259 @@ def geotif2nc(data_dir, fileout):
         DataArray of the converted geotif data
     """
 
-    # Get a list of the tif files in the data directory
-    filenames = [str(f) for f in Path(data_dir).glob("*.tif")]
+    # Get a list of the tif files in the data directory, sorted by time
+    filenames = [str(f) for f in Path(data_dir).glob(pattern)]
+    times = time_index_from_filenames(filenames, time_parser=time_parser)
+    order = np.argsort(times.values, kind="stable")
+    filenames = [filenames[i] for i in order]
+    time = xr.Variable("time", times[order])
+
+    # Open the files lazily, reading the headers in parallel
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        rasters = list(executor.map(lambda f: rioxarray.open_rasterio(f, chunks=chunks), filenames))
+
+    # Concatenate to one lazy dataset, already sorted by time
+    da = xr.concat(rasters, dim=time, coords="minimal", compat="override", join="override")
+    da.name = "band_data"
 
-    # Create the time index from the filenames
-    time = xr.Variable("time", time_index_from_filenames(filenames))
+    # Save dataset to netcdf, one chunk at a time
+    write_dataset(da.to_dataset(), fileout, **kwargs)
 
-    # Concatenate to one dataset, and make sure it's sorted by time
-    ds = xr.concat([rioxarray.open_rasterio(f) for f in filenames], dim=time)
-    ds = ds.sortby("time")
+    return da
+
+
+def make_time_parser(pattern=r"doy(\d{7})", time_format="%Y%j"):
+    """
+    Create a function that parses timestamps from filenames.
 
-    # Save dataset to netcdf
-    ds.to_netcdf(fileout)
+    The regular expression is compiled once, so the parser can be applied to many filenames quickly.
 
-    return ds
+    Parameters
+    ----------
+    pattern : str, optional
+        Regular expression matching the time in the filename. The first group (or the whole match, if there are no
+        groups) is parsed with ``time_format``. By default r'doy(\\d{7})', which matches MODIS filenames such as
+        MOD13A1.006__500m_16_days_NDVI_doy2021017_aid0001.tif.
+    time_format : str, optional
+        strftime format of the matched time, by default '%Y%j' (year and day of year)
 
+    Returns
+    -------
+    callable
+        Function taking a filename and returning a pandas.Timestamp
 
-def time_index_from_filenames(filenames):
+    Examples
+    --------
+    >>> parser = make_time_parser(r"_(\\d{8})\\.tif$", "%Y%m%d")
+    >>> parser("ndvi_20210117.tif")
+    Timestamp('2021-01-17 00:00:00')
     """
-    Helper function to create a pandas DatetimeIndex from MODIS filenames
-    Note: this is a specific test example that currently only works for MODIS filenames in the format:
-    MOD13A1.006__500m_16_days_NDVI_doy2021017_aid0001.tif.
+    regex = re.compile(pattern)
+
+    def time_parser(filename):
+        match = regex.search(Path(filename).name)
+        if match is None:
+            raise ValueError(f"time_parser: couldn't find a time matching {pattern!r} in {filename}")
+        return pd.to_datetime(match.group(1) if regex.groups else match.group(0), format=time_format)
+
+    return time_parser
+
 
-    .. todo::
-    - Needs to be generalized to take other filename formats.
+modis_time_parser = make_time_parser()
+
+
+def time_index_from_filenames(filenames, time_parser=None):
+    """
+    Helper function to create a pandas DatetimeIndex from filenames.
 
     Parameters
     ----------
     filenames : list[str]
         List of .tif files to create the time index from
+    time_parser : callable, optional
+        Function returning the timestamp of a file from its filename (see :func:`make_time_parser`). By default,
+        MODIS filenames in the format MOD13A1.006__500m_16_days_NDVI_doy2021017_aid0001.tif are parsed.
 
     Returns
     -------
     pandas.DatetimeIndex
         Time index parsed from the filenames
     """
-    return pd.DatetimeIndex([pd.to_datetime(f[-19:-12], format="%Y%j") for f in filenames])
\ No newline at end of file
+    time_parser = time_parser or modis_time_parser
+    return pd.DatetimeIndex([time_parser(f) for f in filenames])
+
+
+class RasterStack(DatasetCollection):
+    """
+    A directory of co-registered rasters (e.g. one GeoTIFF per MODIS composite) exposed as one lazy dataset with a
+    time dimension, similar to a time-stacked VRT.
+
+    The header of each raster (time, shape, dtype, transform, CRS and nodata value) is recorded in an index file in
+    the directory, so reopening a large stack doesn't need to open every file. Later scans only read files that were
+    added or modified since the index was written. Data is only read when it's computed, one window of one file
+    per dask chunk.
+
+    Parameters
+    ----------
+    directory : str or pathlib.Path
+        Directory containing the raster files
+    pattern : str, optional
+        Glob pattern for the raster files in the directory, by default '*.tif'
+    time_parser : callable, optional
+        Function returning the timestamp of a file from its filename (see :func:`make_time_parser`). By default,
+        MODIS filenames are parsed. The parsed times are stored in the index, so delete the index file if the
+        parser changes.
+    index_file : str or pathlib.Path, optional
+        Path of the index file, by default '.ecodata_raster_index.json' in the directory
+    max_workers : int, optional
+        Number of threads used to read the file headers, by default the ThreadPoolExecutor default
+
+    Examples
+    --------
+    >>> stack = RasterStack("modis_ndvi")
+    >>> ds = stack.open(start_time="2021-06-01", end_time="2021-08-31")
+    """
+
+    def __init__(self, directory, pattern="*.tif", time_parser=None, index_file=None, max_workers=None):
+        self.time_parser = time_parser or modis_time_parser
+        directory = Path(directory)
+        index_file = index_file if index_file is not None else directory / RASTER_INDEX_FILENAME
+        super().__init__(directory, pattern=pattern, timevar="time", index_file=index_file, max_workers=max_workers)
+
+    def open(self, start_time=None, end_time=None, variables=None, chunks=None, **kwargs):
+        """
+        Open the rasters in a time range as one lazy dataset, with one timestep per file.
+
+        Parameters
+        ----------
+        start_time : str or datetime-like, optional
+            Start of the time range. If not provided, the range starts at the beginning of the stack.
+        end_time : str or datetime-like, optional
+            End of the time range. If not provided, the range ends at the end of the stack.
+        variables : list, optional
+            Not used, the rasters only have one variable (band_data). Accepted for compatibility with
+            DatasetCollection.open.
+        chunks : dict, optional
+            Chunk sizes along the band, y and x dimensions, by default the whole raster. Each timestep is always in
+            its own chunk.
+        **kwargs :
+            Not used
+
+        Returns
+        -------
+        xarray.Dataset
+            Dataset with a 'band_data' variable with dimensions (time, band, y, x)
+        """
+        files = self.files(start_time, end_time)
+        if not files:
+            raise ValueError(f"RasterStack: no files in {self.directory} overlap the time range.")
+        entries = [self.entries[f.relative_to(self.directory).as_posix()] for f in files]
+
+        first = entries[0]
+        for entry in entries[1:]:
+            if (entry["grid"], entry["transform"], entry["crs"]) != (first["grid"], first["transform"], first["crs"]):
+                raise ValueError(f"RasterStack: {entry['path']} isn't on the same grid as {first['path']}.")
+
+        shape = tuple(first["grid"][dim] for dim in ("band", "y", "x"))
+        block_chunks = tuple((chunks or {}).get(dim, size) for dim, size in zip(("band", "y", "x"), shape))
+        dtype = np.dtype(first["dtype"])
+        data = dask.array.stack(
+            [
+                dask.array.from_array(
+                    _WindowedRasterArray(path, shape, dtype),
+                    chunks=block_chunks,
+                    # The same file read with other chunks is a different array for dask
+                    name=f"raster-{tokenize(entry['path'], entry['mtime'], block_chunks)}",
+                    meta=np.empty((0, 0, 0), dtype=dtype),
+                )
+                for path, entry in zip(files, entries)
+            ]
+        )
+
+        transform = Affine(*first["transform"])
+        x = transform.c + transform.a * (np.arange(shape[2]) + 0.5)
+        y = transform.f + transform.e * (np.arange(shape[1]) + 0.5)
+        band_data = xr.DataArray(
+            data,
+            dims=("time", "band", "y", "x"),
+            coords={
+                "time": pd.DatetimeIndex([entry["start"] for entry in entries]),
+                "band": np.arange(1, shape[0] + 1),
+                "y": y,
+                "x": x,
+            },
+        )
+        if first["nodata"] is not None:
+            band_data = band_data.rio.write_nodata(first["nodata"])
+        if first["crs"]:
+            band_data = band_data.rio.write_crs(first["crs"]).rio.write_transform(transform)
+        return band_data.to_dataset(name="band_data")
+
+    def _read_header(self, path):
+        with rasterio.open(path) as src:
+            time = self.time_parser(path)
+            stat = path.stat()
+            return dict(
+                path=path.relative_to(self.directory).as_posix(),
+                mtime=stat.st_mtime,
+                size=stat.st_size,
+                timevar="time",
+                start=str(time),
+                end=str(time),
+                ntime=1,
+                variables=["band_data"],
+                grid={"band": src.count, "y": src.height, "x": src.width},
+                dtype=src.dtypes[0],
+                transform=list(src.transform)[:6],
+                crs=src.crs.to_wkt() if src.crs else None,
+                nodata=src.nodata,
+            )
+
+
+class _WindowedRasterArray:
+    """Array-like wrapper around a raster file that only reads the requested window"""
+
+    def __init__(self, path, shape, dtype):
+        self.path = str(path)
+        self.shape = shape
+        self.dtype = dtype
+        self.ndim = len(shape)
+
+    def __getitem__(self, key):
+        # dask only requests contiguous blocks
+        bands, rows, cols = (range(size)[k] for k, size in zip(key, self.shape))
+        if not (len(bands) and len(rows) and len(cols)):
+            return np.empty((len(bands), len(rows), len(cols)), dtype=self.dtype)
+        window = Window(cols.start, rows.start, len(cols), len(rows))
+        with rasterio.open(self.path) as src:
+            return src.read([band + 1 for band in bands], window=window)
+
+
+def open_raster_stack(directory, pattern="*.tif", time_parser=None, start_time=None, end_time=None, **kwargs):
+    """
+    Open a directory of co-registered rasters as one lazy dataset with a time dimension, without converting them.
+    See :class:`RasterStack`.
+
+    Parameters
+    ----------
+    directory : str or pathlib.Path
+        Directory containing the raster files
+    pattern : str, optional
+        Glob pattern for the raster files in the directory, by default '*.tif'
+    time_parser : callable, optional
+        Function returning the timestamp of a file from its filename (see :func:`make_time_parser`). By default,
+        MODIS filenames are parsed.
+    start_time : str or datetime-like, optional
+        Start of the time range to open
+    end_time : str or datetime-like, optional
+        End of the time range to open
+    **kwargs :
+        Additional arguments to be passed to RasterStack.open
+
+    Returns
+    -------
+    xarray.Dataset
+        Dataset with a 'band_data' variable with dimensions (time, band, y, x)
+    """
+    stack = RasterStack(directory, pattern=pattern, time_parser=time_parser)
+    return stack.open(start_time=start_time, end_time=end_time, **kwargs)
@@ -0,0 +1,298 @@
+"""
+Regridding of gridded datasets on regular (rectilinear) latitude/longitude grids, using sparse weight matrices that
+are cached on disk.
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+from pathlib import Path
+
+import numpy as np
+import xarray as xr
+from scipy import sparse
+
+from ecodata.chunking import rechunk_for
+from ecodata.xr_tools import overlap_weights
+
+logger = logging.getLogger(__file__)
+
+REGRID_METHODS = ("bilinear", "conservative", "nearest")
+
+DEFAULT_CACHE_DIR = Path.home() / ".cache" / "ecodata" / "regrid_weights"
+
+# Weight matrices already loaded or computed in this process
+_weights_cache = {}
+
+
+def regrid(
+    ds,
+    target_grid,
+    method="bilinear",
+    latvar="latitude",
+    lonvar="longitude",
+    target_latvar=None,
+    target_lonvar=None,
+    cache_dir=DEFAULT_CACHE_DIR,
+):
+    """
+    Regrid a dataset to a new latitude/longitude grid.
+
+    The regridding weights are computed once for each pair of source and target grids, as a sparse matrix that maps
+    the source grid cells to the target grid cells. The matrix is cached on disk (keyed on the coordinates of both grids
+    and the method), so regridding other datasets on the same grids reuses it. The matrix is applied to each chunk of
+    the dataset, so dask-backed datasets stay lazy, and regridding a long time series is mostly reading and writing
+    data.
+
+    Missing values in the source data are excluded, and the weights of the remaining source cells are renormalized.
+    Target cells that aren't covered by any valid source cell are missing. Variables without latitude and longitude
+    dimensions are unchanged, and variables with only one of them raise a ValueError.
+
+    Parameters
+    ----------
+    ds : xarray.Dataset or xarray.DataArray
+        Dataset to regrid, with 1D latitude and longitude coordinates
+    target_grid : xarray.Dataset, xarray.DataArray, or dict
+        Dataset with the target latitude and longitude coordinates, or a dictionary with the target latitude and
+        longitude values
+    method : str, optional
+        Regridding method, by default 'bilinear':
+            - **bilinear**: Bilinear interpolation between the four nearest source grid points.
+            - **conservative**: Area-weighted mean of the source cells overlapping each target cell. Best for
+              regridding to a coarser grid.
+            - **nearest**: Value of the nearest source grid point.
+    latvar : str, optional
+        Label of the latitude coordinate in the dataset, by default 'latitude'
+    lonvar : str, optional
+        Label of the longitude coordinate in the dataset, by default 'longitude'
+    target_latvar : str, optional
+        Label of the latitude coordinate in the target grid, by default the same as latvar
+    target_lonvar : str, optional
+        Label of the longitude coordinate in the target grid, by default the same as lonvar
+    cache_dir : str or pathlib.Path, optional
+        Directory where the weight matrices are cached, by default ~/.cache/ecodata/regrid_weights. If None, the
+        weights are only cached in memory.
+
+    Returns
+    -------
+    xarray.Dataset or xarray.DataArray
+        Regridded dataset, with the latitude and longitude coordinates of the target grid (labeled latvar and lonvar)
+    """
+    if method not in REGRID_METHODS:
+        raise ValueError(f"regrid: method must be one of {REGRID_METHODS}, not {method!r}")
+
+    target_latvar = target_latvar or latvar
+    target_lonvar = target_lonvar or lonvar
+    source_lat = np.asarray(ds[latvar].values, dtype=float)
+    source_lon = np.asarray(ds[lonvar].values, dtype=float)
+    target_lat = np.asarray(target_grid[target_latvar], dtype=float)
+    target_lon = np.asarray(target_grid[target_lonvar], dtype=float)
+
+    weights = get_regrid_weights(source_lat, source_lon, target_lat, target_lon, method=method, cache_dir=cache_dir)
+
+    if isinstance(ds, xr.DataArray):
+        return _regrid_dataarray(ds, weights, latvar, lonvar, target_lat, target_lon)
+
+    # The new latitude or longitude coordinate doesn't fit variables along only one of them
+    partial = [name for name, da in ds.data_vars.items() if (latvar in da.dims) != (lonvar in da.dims)]
+    if partial:
+        raise ValueError(
+            f"regrid: variables {partial} only have one of the {latvar!r} and {lonvar!r} dimensions. Drop them, or "
+            f"broadcast them to the grid."
+        )
+
+    # Regridding needs whole grids in each chunk
+    ds = rechunk_for(ds, "map")
+    regridded = {}
+    for name, da in ds.data_vars.items():
+        if latvar in da.dims:
+            regridded[name] = _regrid_dataarray(da, weights, latvar, lonvar, target_lat, target_lon)
+        else:
+            regridded[name] = da
+    ds_regridded = xr.Dataset(regridded, attrs=ds.attrs)
+    return ds_regridded.assign_coords({latvar: target_lat, lonvar: target_lon})
+
+
+def get_regrid_weights(source_lat, source_lon, target_lat, target_lon, method="bilinear", cache_dir=DEFAULT_CACHE_DIR):
+    """
+    Get the sparse regridding weights between two latitude/longitude grids, from the cache if available.
+
+    Parameters
+    ----------
+    source_lat, source_lon : numpy.ndarray
+        Latitude and longitude values of the source grid
+    target_lat, target_lon : numpy.ndarray
+        Latitude and longitude values of the target grid
+    method : str, optional
+        Regridding method ('bilinear', 'conservative', or 'nearest'), by default 'bilinear'
+    cache_dir : str or pathlib.Path, optional
+        Directory where the weight matrices are cached, by default ~/.cache/ecodata/regrid_weights. If None, the
+        weights are only cached in memory.
+
+    Returns
+    -------
+    scipy.sparse.csr_matrix
+        Weights of shape (n_target_lat * n_target_lon, n_source_lat * n_source_lon)
+    """
+    key = grid_signature(source_lat, source_lon, target_lat, target_lon, method)
+    if key in _weights_cache:
+        return _weights_cache[key]
+
+    cache_file = Path(cache_dir) / f"{method}_{key}.npz" if cache_dir is not None else None
+    if cache_file is not None and cache_file.exists():
+        weights = sparse.load_npz(cache_file).tocsr()
+    else:
+        weights = compute_regrid_weights(source_lat, source_lon, target_lat, target_lon, method=method)
+        if cache_file is not None:
+            try:
+                cache_file.parent.mkdir(parents=True, exist_ok=True)
+                sparse.save_npz(cache_file, weights)
+            except OSError:
+                logger.warning(f"Couldn't cache regridding weights to {cache_file}")
+
+    _weights_cache[key] = weights
+    return weights
+
+
+def compute_regrid_weights(source_lat, source_lon, target_lat, target_lon, method="bilinear"):
+    """
+    Compute the sparse regridding weights between two latitude/longitude grids.
+
+    The weights are computed separately along latitude and longitude, and combined with a Kronecker product. Grid
+    cells are flattened in (latitude, longitude) order. Longitudes aren't wrapped around.
+
+    Parameters
+    ----------
+    source_lat, source_lon : numpy.ndarray
+        Latitude and longitude values of the source grid
+    target_lat, target_lon : numpy.ndarray
+        Latitude and longitude values of the target grid
+    method : str, optional
+        Regridding method ('bilinear', 'conservative', or 'nearest'), by default 'bilinear'
+
+    Returns
+    -------
+    scipy.sparse.csr_matrix
+        Weights of shape (n_target_lat * n_target_lon, n_source_lat * n_source_lon)
+    """
+    if method == "conservative":
+        lat_weights = _conservative_weights_1d(source_lat, target_lat, latitude=True)
+        lon_weights = _conservative_weights_1d(source_lon, target_lon)
+    elif method == "bilinear":
+        lat_weights = _linear_weights_1d(source_lat, target_lat)
+        lon_weights = _linear_weights_1d(source_lon, target_lon)
+    elif method == "nearest":
+        lat_weights = _nearest_weights_1d(source_lat, target_lat)
+        lon_weights = _nearest_weights_1d(source_lon, target_lon)
+    else:
+        raise ValueError(f"compute_regrid_weights: method must be one of {REGRID_METHODS}, not {method!r}")
+    return sparse.kron(lat_weights, lon_weights, format="csr")
+
+
+def grid_signature(source_lat, source_lon, target_lat, target_lon, method):
+    """
+    Hash identifying a pair of source and target grids and a regridding method.
+    """
+    sha = hashlib.sha1(method.encode())
+    for coord in (source_lat, source_lon, target_lat, target_lon):
+        coord = np.ascontiguousarray(coord, dtype=np.float64)
+        sha.update(str(coord.shape).encode())
+        sha.update(coord.tobytes())
+    return sha.hexdigest()
+
+
+def _regrid_dataarray(da, weights, latvar, lonvar, target_lat, target_lon):
+    n_target = (len(target_lat), len(target_lon))
+    dtype = np.result_type(da.dtype, np.float32)
+
+    # Sum of the weights of each target cell when all the source cells are valid
+    row_sums = np.asarray(weights.sum(axis=1))
+
+    def _apply_weights(data):
+        n_source = data.shape[-2] * data.shape[-1]
+        flat = data.reshape(-1, n_source).T
+        valid = ~np.isnan(flat)
+        if valid.all():
+            total = weights @ flat
+            weight_sum = row_sums
+        else:
+            total = weights @ np.where(valid, flat, 0)
+            weight_sum = weights @ valid.astype(weights.dtype)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            result = np.where(weight_sum > 0, total / weight_sum, np.nan)
+        return result.T.reshape(data.shape[:-2] + n_target).astype(dtype)
+
+    if da.chunks is not None:
+        da = da.chunk({latvar: -1, lonvar: -1})
+    regridded = xr.apply_ufunc(
+        _apply_weights,
+        da.astype(dtype),
+        input_core_dims=[[latvar, lonvar]],
+        output_core_dims=[[latvar, lonvar]],
+        exclude_dims={latvar, lonvar},
+        dask="parallelized",
+        output_dtypes=[dtype],
+        dask_gufunc_kwargs={"output_sizes": {latvar: n_target[0], lonvar: n_target[1]}},
+        keep_attrs=True,
+    )
+    regridded = regridded.transpose(*da.dims)
+    return regridded.assign_coords({latvar: target_lat, lonvar: target_lon})
+
+
+def _sorted(values):
+    """Order that sorts values in increasing order, and its inverse"""
+    order = np.argsort(values, kind="stable")
+    return order, values[order]
+
+
+def _linear_weights_1d(source, target):
+    order, source_sorted = _sorted(source)
+    n_source = len(source)
+    if n_source == 1:
+        return _nearest_weights_1d(source, target)
+
+    inside = (target >= source_sorted[0]) & (target <= source_sorted[-1])
+    upper = np.clip(np.searchsorted(source_sorted, target, side="right"), 1, n_source - 1)
+    lower = upper - 1
+    fraction = (target - source_sorted[lower]) / (source_sorted[upper] - source_sorted[lower])
+
+    rows = np.concatenate([np.flatnonzero(inside)] * 2)
+    cols = np.concatenate([order[lower[inside]], order[upper[inside]]])
+    values = np.concatenate([1 - fraction[inside], fraction[inside]])
+    return sparse.csr_matrix((values, (rows, cols)), shape=(len(target), n_source))
+
+
+def _nearest_weights_1d(source, target):
+    order, source_sorted = _sorted(source)
+    edges = _cell_edges(source_sorted)
+    inside = (target >= edges[0]) & (target <= edges[-1])
+    index = np.clip(np.searchsorted(edges, target, side="right") - 1, 0, len(source) - 1)
+    rows = np.flatnonzero(inside)
+    return sparse.csr_matrix(
+        (np.ones(len(rows)), (rows, order[index[inside]])), shape=(len(target), len(source))
+    )
+
+
+def _conservative_weights_1d(source, target, latitude=False):
+    source_order, source_sorted = _sorted(source)
+    target_order, target_sorted = _sorted(target)
+    source_edges = _cell_edges(source_sorted)
+    target_edges = _cell_edges(target_sorted)
+    if latitude:
+        # Cell area is proportional to the difference of the sine of the latitude of the cell edges
+        source_edges = np.sin(np.deg2rad(np.clip(source_edges, -90, 90)))
+        target_edges = np.sin(np.deg2rad(np.clip(target_edges, -90, 90)))
+
+    weights = overlap_weights(source_edges, target_edges).tocoo()
+    # Map the sorted cells back to the original order of the coordinates
+    return sparse.csr_matrix(
+        (weights.data, (target_order[weights.row], source_order[weights.col])), shape=(len(target), len(source))
+    )
+
+
+def _cell_edges(centers):
+    """Edges of grid cells from their (increasing) center values"""
+    if len(centers) == 1:
+        return np.array([centers[0] - 0.5, centers[0] + 0.5])
+    midpoints = (centers[1:] + centers[:-1]) / 2
+    return np.concatenate([[2 * centers[0] - midpoints[0]], midpoints, [2 * centers[-1] - midpoints[-1]]])
@@ -1,6 +1,7 @@
 import shutil
 import time
 
+import numpy as np
 import panel as pn
 import pytest
 
@@ -76,3 +77,56 @@ def gridded_data_explorer():
 @pytest.fixture
 def subsetter():
     return Subsetter()
+
+
+@pytest.fixture
+def era5_grib(tmp_path):
+    """GRIB file with pressure level, surface and height above ground messages, like an ERA5 download"""
+    messages = [
+        ("isobaricInhPa", 850, "t"),
+        ("isobaricInhPa", 500, "t"),
+        ("surface", 0, "sp"),
+        ("heightAboveGround", 2, "2t"),
+    ]
+    return write_grib(tmp_path / "era5.grib", messages)
+
+
+@pytest.fixture
+def grib_shared_names(tmp_path):
+    """GRIB file with the same variable on pressure levels and at the surface"""
+    messages = [
+        ("isobaricInhPa", 850, "t"),
+        ("isobaricInhPa", 500, "t"),
+        ("surface", 0, "t"),
+    ]
+    return write_grib(tmp_path / "shared.grib", messages)
+
+
+def write_grib(filein, messages):
+    """Write GRIB messages (level type, level, shortName) at 00:00 and 06:00 on a 3x4 grid"""
+    eccodes = pytest.importorskip("eccodes")
+    with open(filein, "wb") as f:
+        for level_type, level, short_name in messages:
+            for hour in (0, 6):
+                gid = eccodes.codes_grib_new_from_samples("regular_ll_sfc_grib2")
+                keys = dict(
+                    typeOfLevel=level_type,
+                    level=level,
+                    shortName=short_name,
+                    dataDate=20200101,
+                    dataTime=hour * 100,
+                    Ni=4,
+                    Nj=3,
+                    latitudeOfFirstGridPointInDegrees=10.0,
+                    latitudeOfLastGridPointInDegrees=0.0,
+                    longitudeOfFirstGridPointInDegrees=0.0,
+                    longitudeOfLastGridPointInDegrees=15.0,
+                    iDirectionIncrementInDegrees=5.0,
+                    jDirectionIncrementInDegrees=5.0,
+                )
+                for key, value in keys.items():
+                    eccodes.codes_set(gid, key, value)
+                eccodes.codes_set_values(gid, np.arange(12.0) + level + hour)
+                eccodes.codes_write(gid, f)
+                eccodes.codes_release(gid)
+    return filein
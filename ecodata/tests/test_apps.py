@@ -24,6 +24,8 @@ def test_server_has_every_app(serve_apps, port, apps):
 def test_track_explorer_load_data(install_test_data, track_explorer):
     track_explorer.tracksfile.value = str(test_data_dir / "public_caribou_tracks.csv")
     track_explorer.load_data()
+    # The tracks are loaded by a background job, applied when it's polled
+    track_explorer.jobs.wait()
 
     assert track_explorer.tracks is not None
     assert isinstance(track_explorer.tracks, gpd.GeoDataFrame)
@@ -32,6 +34,42 @@ def test_track_explorer_load_data(install_test_data, track_explorer):
     assert track_explorer.plot_pane.object is not None
 
 
+def test_track_explorer_extent_buttons(track_explorer, tmp_path, monkeypatch):
+    from ecodata.app.apps import tracks_explorer_app
+    from ecodata.tile_utils import build_track_tiles
+
+    # Small local track file, with its density tiles cached under the test directory
+    monkeypatch.setattr(
+        tracks_explorer_app,
+        "build_track_tiles",
+        lambda tracks, **kwargs: build_track_tiles(tracks, cache_dir=tmp_path / "tiles", **kwargs),
+    )
+    tracksfile = tmp_path / "tracks.csv"
+    tracksfile.write_text(
+        "timestamp,location-long,location-lat,individual-local-identifier\n"
+        "2020-01-01 00:00:00,-120.0,45.0,a\n"
+        "2020-01-02 00:00:00,-119.5,45.5,a\n"
+        "2020-01-03 00:00:00,-119.0,45.2,b\n"
+    )
+    track_explorer.tracksfile.value = str(tracksfile)
+    track_explorer.load_data()
+    track_explorer.jobs.wait()
+    extent = track_explorer.tracks_extent
+
+    track_explorer.tracks_buffer.value = 1.0
+    track_explorer.boundary_update.param.trigger("value")
+    track_explorer.jobs.wait()
+    assert track_explorer.tracks_extent is not extent
+    assert track_explorer.tracks_extent.total_bounds[0] < extent.total_bounds[0]
+    assert track_explorer.status_text == "Tracks boundary updated"
+
+    outfile = tmp_path / "tracks_extent.geojson"
+    track_explorer.output_fname.value = str(outfile)
+    track_explorer.save_tracks_extent_button.param.trigger("value")
+    assert outfile.exists()
+    assert track_explorer.alert.object == track_explorer.status_text == f"File saved to: {outfile.resolve()}"
+
+
 def test_gridded_data_explorer_load_data(install_test_data, gridded_data_explorer):
     gridded_data_explorer.filein.value = str(test_data_dir / "NASA_public_caribou.nc")
     gridded_data_explorer.load_data()
@@ -0,0 +1,107 @@
+import os
+import threading
+import time
+
+import dask.array as da
+import numpy as np
+import pytest
+import xarray as xr
+
+from ecodata.app.cache import DatasetCache, memory_size
+
+
+def write_array(path, n):
+    np.save(path, np.zeros(n, dtype="uint8"))
+    return path
+
+
+def test_cache_loads_each_file_once(tmp_path):
+    path = write_array(tmp_path / "a.npy", 10)
+    cache = DatasetCache(max_bytes=100)
+    first = cache.get(path, np.load)
+    second = cache.get(path, np.load)
+
+    assert first.value is second.value
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert cache.entries[first.key].refcount == 2
+
+
+def test_cache_evicts_least_recently_used_released_entries(tmp_path):
+    paths = [write_array(tmp_path / f"{i}.npy", 40) for i in range(3)]
+    cache = DatasetCache(max_bytes=100)
+    in_use = cache.get(paths[0], np.load)
+    cache.get(paths[1], np.load).release()
+    cache.get(paths[2], np.load).release()
+
+    # The first entry is the least recently used, but it's still in use
+    assert [key[1] for key in cache.entries] == [str(paths[0].resolve()), str(paths[2].resolve())]
+
+    in_use.release()
+    cache.get(paths[1], np.load).release()
+    assert str(paths[0].resolve()) not in [key[1] for key in cache.entries]
+
+
+def test_cache_reloads_modified_files(tmp_path):
+    path = write_array(tmp_path / "a.npy", 10)
+    cache = DatasetCache()
+    cache.get(path, np.load).release()
+
+    write_array(path, 20)
+    os.utime(path, ns=(time.time_ns(), time.time_ns() + 10**9))
+    handle = cache.get(path, np.load)
+
+    assert len(handle.value) == 20
+    assert len(cache.entries) == 1
+
+
+def test_cache_concurrent_requests_load_once(tmp_path):
+    path = write_array(tmp_path / "a.npy", 10)
+    cache = DatasetCache()
+    calls = []
+
+    def slow_load(p):
+        calls.append(p)
+        time.sleep(0.1)
+        return np.load(p)
+
+    threads = [threading.Thread(target=cache.get, args=(path, slow_load)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert cache.entries[next(iter(cache.entries))].refcount == 4
+
+
+def test_cache_loader_errors_release_the_loading_lock(tmp_path):
+    path = write_array(tmp_path / "a.npy", 10)
+    cache = DatasetCache()
+
+    def fail(p):
+        raise OSError("unreadable")
+
+    with pytest.raises(OSError):
+        cache.get(path, fail)
+    assert not cache._loading and not cache.entries
+    assert len(cache.get(path, np.load).value) == 10
+
+
+def test_memory_size_skips_dask_variables():
+    ds = xr.Dataset({"a": ("x", da.zeros(100, chunks=10)), "b": ("x", np.zeros(100))})
+    assert memory_size(ds) == 800
+
+
+def test_cache_keeps_lazy_datasets_over_budget(tmp_path):
+    path = write_array(tmp_path / "a.npy", 10)
+    cache = DatasetCache(max_bytes=100)
+    cache.get(path, lambda p: xr.Dataset({"a": ("x", da.zeros(1000, chunks=100))})).release()
+    assert len(cache.entries) == 1
+
+
+def test_cache_forgets_load_locks(tmp_path):
+    path = write_array(tmp_path / "a.npy", 10)
+    cache = DatasetCache(max_bytes=100)
+    for _ in range(3):
+        cache.get(path, np.load).release()
+    assert cache._loading == {}
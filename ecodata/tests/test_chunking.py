@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+from ecodata.chunking import plan_chunks, plan_rechunk, rechunk, rechunk_for
+
+
+@pytest.fixture
+def gridded_ds():
+    time = pd.date_range("2000-01-01", periods=365)
+    lat = np.linspace(60, 50, 100)
+    lon = np.linspace(-120, -100, 200)
+    data = np.zeros((len(time), len(lat), len(lon)), dtype="float32")
+    return xr.Dataset(
+        {"t2m": (("time", "latitude", "longitude"), data)},
+        coords={"time": time, "latitude": lat, "longitude": lon},
+    )
+
+
+def test_plan_chunks_timeseries_keeps_time_together(gridded_ds):
+    chunks = plan_chunks(gridded_ds, "timeseries", chunk_memory=4 * 365 * 1000)
+    assert chunks["time"] == 365
+    assert chunks["latitude"] * chunks["longitude"] <= 1000
+
+
+def test_plan_chunks_map_keeps_space_together(gridded_ds):
+    chunks = plan_chunks(gridded_ds, "map", chunk_memory=4 * 100 * 200 * 10)
+    assert chunks == {"time": 10, "latitude": 100, "longitude": 200}
+
+
+def test_plan_chunks_invalid_operation(gridded_ds):
+    with pytest.raises(ValueError):
+        plan_chunks(gridded_ds, "fast")
+
+
+def test_rechunk_for_leaves_numpy_datasets(gridded_ds):
+    assert rechunk_for(gridded_ds, "map") is gridded_ds
+
+
+def test_conflicting_rechunk_uses_intermediate_stage(gridded_ds):
+    small_ds = gridded_ds.isel(time=slice(0, 40), latitude=slice(0, 20), longitude=slice(0, 20))
+    ds = small_ds.chunk({"time": 1, "latitude": 20, "longitude": 20})
+    target = {"time": 40, "latitude": 5, "longitude": 5}
+
+    # Memory for two source chunks at once
+    chunk_memory = 4 * 2 * 20 * 20
+    stages = plan_rechunk(ds, target, chunk_memory=chunk_memory)
+    assert stages == [{"time": 2, "latitude": 5, "longitude": 5}, target]
+
+    result = rechunk(ds, target, chunk_memory=chunk_memory)
+    assert result.chunksizes["time"][0] == 40
+    assert result.chunksizes["latitude"][0] == 5
+    xr.testing.assert_identical(result.compute(), small_ds)
+
+
+def test_plan_rechunk_already_chunked(gridded_ds):
+    ds = gridded_ds.chunk({"time": 10, "latitude": 100, "longitude": 200})
+    assert plan_rechunk(ds, {"time": 10, "latitude": 100, "longitude": 200}) == []
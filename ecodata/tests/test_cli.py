@@ -0,0 +1,30 @@
+from click.testing import CliRunner
+
+from ecodata.cli import main
+
+
+def test_convert_command(era5_grib, tmp_path):
+    out_dir = tmp_path / "converted"
+    runner = CliRunner()
+
+    result = runner.invoke(main, ["convert", str(era5_grib.parent), "--out-dir", str(out_dir), "-j", "1"])
+    assert result.exit_code == 0, result.output
+    assert (out_dir / "era5.nc").exists()
+    assert "files/s" in result.output and "MiB/s" in result.output
+
+    result = runner.invoke(main, ["convert", str(era5_grib), "--out-dir", str(out_dir)])
+    assert result.exit_code == 0, result.output
+    assert "Skipped 1 inputs" in result.output
+
+
+def test_convert_command_complevel_of_compression(tmp_path):
+    runner = CliRunner()
+    args = ["convert", str(tmp_path), "--out-dir", str(tmp_path / "converted")]
+
+    result = runner.invoke(main, args + ["--compression", "zlib", "--complevel", "15"])
+    assert result.exit_code == 2
+    assert "--complevel" in result.output and "1 to 9" in result.output
+
+    # zstd accepts higher levels (the empty input directory then fails to convert)
+    result = runner.invoke(main, args + ["--compression", "zstd", "--complevel", "15"])
+    assert result.exit_code != 2 and "Converting 1 inputs" in result.output
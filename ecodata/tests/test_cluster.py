@@ -0,0 +1,30 @@
+import dask.array as da
+import pytest
+
+from ecodata.app import config
+from ecodata.app.cluster import cluster_settings, session_client, shutdown_cluster, start_cluster
+
+
+def test_cluster_settings_from_config(monkeypatch):
+    monkeypatch.setattr(config, "DASK_MEMORY_LIMIT", "2GiB")
+    monkeypatch.setattr(config, "DASK_SPILL_DIRECTORY", "/tmp/spill")
+    settings = cluster_settings(n_workers=3, threads_per_worker=None)
+
+    assert settings["n_workers"] == 3
+    assert settings["memory_limit"] == "2GiB"
+    assert settings["local_directory"] == "/tmp/spill"
+    assert "threads_per_worker" not in settings
+
+
+def test_session_client_uses_the_server_cluster():
+    pytest.importorskip("distributed")
+    cluster = start_cluster(n_workers=1, threads_per_worker=2, processes=False, dashboard_address=":0")
+    try:
+        assert start_cluster() is cluster
+        client = session_client()
+        with client.as_current():
+            assert da.ones(10, chunks=5).sum().compute() == 10
+        assert client.scheduler.address == cluster.scheduler_address
+        client.close()
+    finally:
+        shutdown_cluster()
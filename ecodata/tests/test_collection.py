@@ -0,0 +1,97 @@
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+import ecodata as eco
+from ecodata.collection import INDEX_FILENAME
+
+
+def make_daily_ds(day):
+    time = pd.date_range(day, periods=4, freq="6h")
+    lat = np.linspace(60, 50, 3)
+    lon = np.linspace(-120, -110, 4)
+    data = np.full((len(time), len(lat), len(lon)), pd.Timestamp(day).dayofyear, dtype="float32")
+    return xr.Dataset(
+        {"t2m": (("time", "latitude", "longitude"), data)},
+        coords={"time": time, "latitude": lat, "longitude": lon},
+    )
+
+
+@pytest.fixture
+def daily_files(tmp_path):
+    for day in pd.date_range("2020-06-01", periods=5):
+        make_daily_ds(day).to_netcdf(tmp_path / f"era5_{day:%Y%m%d}.nc")
+    return tmp_path
+
+
+def test_collection_index(daily_files):
+    collection = eco.DatasetCollection(daily_files)
+
+    assert len(collection) == 5
+    assert (daily_files / INDEX_FILENAME).exists()
+    assert collection.timevar == "time"
+    assert collection.variables == ["t2m"]
+    assert collection.time_coverage == (pd.Timestamp("2020-06-01"), pd.Timestamp("2020-06-05 18:00"))
+    assert [f.name for f in collection.files("2020-06-02 12:00", "2020-06-03")] == [
+        "era5_20200602.nc",
+        "era5_20200603.nc",
+    ]
+
+
+def test_collection_rescan_reads_only_changed_files(daily_files, monkeypatch):
+    eco.DatasetCollection(daily_files)
+    make_daily_ds("2020-06-06").to_netcdf(daily_files / "era5_20200606.nc")
+
+    read = []
+    original_read_header = eco.DatasetCollection._read_header
+
+    def read_header(self, path):
+        read.append(path.name)
+        return original_read_header(self, path)
+
+    monkeypatch.setattr(eco.DatasetCollection, "_read_header", read_header)
+    collection = eco.DatasetCollection(daily_files)
+
+    assert read == ["era5_20200606.nc"]
+    assert len(collection) == 6
+
+
+def test_collection_open_time_range(daily_files):
+    ds = eco.open_collection(daily_files, start_time="2020-06-02", end_time="2020-06-03 23:00")
+
+    assert ds.t2m.chunks is not None
+    assert ds.sizes["time"] == 8
+    np.testing.assert_array_equal(np.unique(ds.t2m.values), [154, 155])
+
+
+def test_write_dataset_zarr_append(tmp_path):
+    store = tmp_path / "t2m.zarr"
+    eco.write_dataset(make_daily_ds("2020-06-01").chunk(), store, append_dim="time")
+    eco.write_dataset(make_daily_ds("2020-06-02").chunk(), store, append_dim="time")
+
+    ds = eco.open_gridded_dataset(store)
+    assert ds.sizes["time"] == 8
+    np.testing.assert_array_equal(np.unique(ds.t2m.values), [153, 154])
+
+
+def test_write_dataset_zarr_append_packed_range(tmp_path):
+    store = tmp_path / "t2m.zarr"
+    ds = make_daily_ds("2020-06-01")
+    ds["t2m"] = ds.t2m * np.linspace(0, 1, ds.t2m.size, dtype="float32").reshape(ds.t2m.shape)
+    eco.write_dataset(ds, store, append_dim="time", pack=True)
+
+    # Values within the packed range of the store are appended, and larger ones would wrap
+    eco.write_dataset(ds.assign_coords(time=ds.time + pd.Timedelta("1D")), store, append_dim="time", pack=True)
+    too_large = (ds + 1).assign_coords(time=ds.time + pd.Timedelta("2D"))
+    with pytest.raises(ValueError, match="packed"):
+        eco.write_dataset(too_large, store, append_dim="time", pack=True)
+
+    with xr.open_zarr(store) as stored:
+        assert stored.sizes["time"] == 8
+        np.testing.assert_allclose(stored.t2m.values, np.concatenate([ds.t2m.values] * 2), atol=153 / 2**15)
+
+
+def test_write_dataset_netcdf_append_not_supported(tmp_path):
+    with pytest.raises(ValueError):
+        eco.write_dataset(make_daily_ds("2020-06-01"), tmp_path / "t2m.nc", append_dim="time")
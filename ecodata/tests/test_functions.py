@@ -0,0 +1,66 @@
+import geopandas as gpd
+import numpy as np
+import pytest
+from shapely.geometry import LineString, MultiLineString, Point
+
+from ecodata.functions import (
+    _geometry_coordinates,
+    _rasterize_layer,
+    bbox2poly,
+    plot_subset,
+    plot_subset_interactive,
+)
+
+
+@pytest.fixture
+def road_subset():
+    lines = [LineString([(x, 45), (x + 0.5, 45.5)]) for x in np.linspace(-119, -101, 100)]
+    lines.append(MultiLineString([[(-110, 41), (-109, 42)], [(-108, 43), (-107, 44)]]))
+    return gpd.GeoDataFrame(geometry=lines, crs="EPSG:4326")
+
+
+def test_geometry_coordinates_break_between_parts():
+    geoms = gpd.GeoSeries([MultiLineString([[(0, 0), (1, 1)], [(2, 2), (3, 3)]]), LineString([(5, 5), (6, 6)])])
+    x, y = _geometry_coordinates(geoms)
+    np.testing.assert_array_equal(x, [0, 1, np.nan, 2, 3, np.nan, 5, 6])
+    np.testing.assert_array_equal(y, x)
+
+
+def test_geometry_coordinates_of_points():
+    x, y = _geometry_coordinates(gpd.GeoSeries([Point(0, 1), Point(2, 3)]))
+    np.testing.assert_array_equal(x, [0, 2])
+    np.testing.assert_array_equal(y, [1, 3])
+
+
+def test_plot_subset_draws_lines_as_one_path(road_subset):
+    fig = plot_subset(road_subset, bbox2poly([-120, 40, -100, 50]), method="vector")
+    ax = fig.axes[0]
+    assert len(ax.lines) == 1
+    assert np.isnan(ax.lines[0].get_xdata()).sum() == len(road_subset)
+
+
+def test_plot_subset_raster(road_subset):
+    pytest.importorskip("datashader")
+    fig = plot_subset(road_subset, bbox2poly([-120, 40, -100, 50]), method="raster")
+    ax = fig.axes[0]
+    assert len(ax.images) == 1 and not ax.lines
+    assert ax.images[0].get_array().count() > 0
+
+
+def test_plot_subset_invalid_method(road_subset):
+    with pytest.raises(ValueError):
+        plot_subset(road_subset, bbox2poly([-120, 40, -100, 50]), method="svg")
+
+
+def test_plot_subset_interactive_points():
+    pytest.importorskip("hvplot")
+    points = gpd.GeoDataFrame(geometry=[Point(-110, 45), Point(-105, 46)], crs="EPSG:4326")
+    plot = plot_subset_interactive(points, bbox2poly([-120, 40, -100, 50]))
+    assert len(plot) == 2
+
+
+def test_rasterize_layer_thresholds(road_subset):
+    assert not _rasterize_layer(None, road_subset, max_features=1000, max_vertices=1000)
+    assert _rasterize_layer(None, road_subset, max_features=100, max_vertices=1000)
+    assert _rasterize_layer(None, road_subset, max_features=1000, max_vertices=200)
+    assert not _rasterize_layer(False, road_subset, max_features=10, max_vertices=10)
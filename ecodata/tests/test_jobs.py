@@ -0,0 +1,83 @@
+import threading
+import time
+
+import dask.array as da
+import pytest
+
+from ecodata.app.jobs import JobExecutor, load
+
+
+def test_jobs_run_in_order_and_call_back_on_poll():
+    executor = JobExecutor()
+    results = []
+    executor.submit("first", lambda: results.append("first") or 1, on_done=results.append)
+    executor.submit("second", lambda x: x + 1, 1, on_done=results.append)
+    executor.wait()
+
+    assert results == ["first", 1, 2]
+    assert [job.status for job in executor.jobs] == ["done", "done"]
+    assert not executor.poll()
+
+
+def test_failed_job_calls_on_error():
+    executor = JobExecutor()
+    errors = []
+    job = executor.submit("fail", lambda: 1 / 0, on_error=errors.append)
+    executor.wait()
+
+    assert job.status == "failed"
+    assert isinstance(errors[0], ZeroDivisionError)
+
+
+def test_cancel_running_and_queued_jobs():
+    executor = JobExecutor()
+    started = threading.Event()
+
+    def slow(block):
+        started.set()
+        time.sleep(0.02)
+        return block
+
+    array = da.ones(200, chunks=1).map_blocks(slow)
+    running = executor.submit("slow", lambda: array.sum().compute(scheduler="threads"))
+    queued = executor.submit("queued", lambda: 1)
+    started.wait(5)
+    assert running.status == "running"
+
+    executor.cancel_all()
+    executor.wait()
+    assert running.status == "cancelled"
+    assert queued.status == "cancelled"
+    assert 0 <= running.progress < 1
+
+
+def test_jobs_load_their_results():
+    executor = JobExecutor()
+    job = executor.submit("load", lambda: load(da.ones(10, chunks=2) * 2))
+    executor.wait()
+
+    assert job.status == "done" and job.progress == 1.0
+    # The chunks were computed by the job
+    assert len(job.result.dask) == 5
+    assert job.result.sum().compute() == 20
+
+
+def test_jobs_with_a_client_run_on_the_cluster():
+    distributed = pytest.importorskip("distributed")
+    cluster = distributed.LocalCluster(n_workers=1, threads_per_worker=2, processes=False, dashboard_address=":0")
+    with cluster, distributed.Client(cluster, set_as_default=False) as client:
+        executor = JobExecutor(client=client)
+        done = executor.submit("load", lambda: load(da.ones(10, chunks=2) * 2))
+        executor.wait()
+        assert done.status == "done" and done.progress == 1.0
+        # The result was gathered, so it doesn't need the client
+        assert done.result.sum() == 20
+
+        array = da.ones(200, chunks=1).map_blocks(lambda block: time.sleep(0.05) or block)
+        running = executor.submit("slow", lambda: load(array))
+        while not running.progress:
+            time.sleep(0.01)
+        executor.cancel_all()
+        executor.wait()
+        assert running.status == "cancelled"
+        assert 0 < running.progress < 1
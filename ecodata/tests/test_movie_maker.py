@@ -1,8 +1,13 @@
+import shutil
 from pathlib import Path
 
+import numpy as np
+import pandas as pd
 import pytest
+import xarray as xr
 
-from ecodata.panel_utils import make_mp4_from_frames
+from ecodata.movie_utils import make_mp4_from_dataset, render_frame, start_mp4_from_dataset
+from ecodata.panel_utils import VideoEncodeJob, make_mp4_from_frames
 from ecodata.tests.conftest import (
     test_frames_dir,
     test_frames_dir_weird,
@@ -33,3 +38,44 @@ def test_that_movie_maker_runs(install_test_data, make_test_frame_dirs, frames_d
 
     # Check that the output file exists
     assert output_mp4.exists()
+
+
+@pytest.fixture
+def gridded_da():
+    time = pd.date_range("2000-01-01", periods=4)
+    lat = np.linspace(50, 60, 6)
+    lon = np.linspace(-120, -110, 8)
+    data = np.arange(len(time) * len(lat) * len(lon), dtype="float64").reshape(len(time), len(lat), len(lon))
+    return xr.DataArray(
+        data,
+        dims=("time", "latitude", "longitude"),
+        coords={"time": time, "latitude": lat, "longitude": lon},
+        name="t2m",
+    )
+
+
+def test_render_frame_size():
+    frame = render_frame(np.random.rand(6, 8), title="2000-01-01", clim=(0, 1), width=320, height=240)
+    assert len(frame) == 320 * 240 * 3
+
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg isn't installed")
+def test_make_mp4_from_dataset(gridded_da, tmp_path):
+    output_mp4 = make_mp4_from_dataset(gridded_da, tmp_path / "t2m.mp4", width=320, height=240, max_workers=2)
+    assert output_mp4.exists() and output_mp4.stat().st_size > 0
+
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg isn't installed")
+def test_encode_job_progress(gridded_da, tmp_path):
+    job = start_mp4_from_dataset(gridded_da, tmp_path / "t2m.mp4", width=320, height=240, preset="veryfast", crf=28)
+    assert job.wait() == tmp_path / "t2m.mp4"
+    assert job.status == "done" and job.progress == 1.0
+    assert job.frame == gridded_da.sizes["time"]
+
+
+@pytest.mark.skipif(shutil.which("false") is None, reason="no false command")
+def test_encode_job_failure(tmp_path):
+    job = VideoEncodeJob(["-i", "missing.png"], tmp_path / "out.mp4", n_frames=3, ffmpeg="false").start()
+    with pytest.raises(RuntimeError, match="failed"):
+        job.wait(timeout=10)
+    assert job.status == "failed" and not job.running
@@ -0,0 +1,88 @@
+import dask.array as da
+import numpy as np
+import pytest
+import xarray as xr
+
+from ecodata.app.pipeline import Pipeline
+
+calls = []
+
+
+@pytest.fixture(autouse=True)
+def clear_calls():
+    calls.clear()
+
+
+def add(ds, value):
+    calls.append(value)
+    return ds + value
+
+
+def test_changing_a_step_recomputes_only_the_steps_after_it():
+    pipeline = Pipeline(xr.Dataset({"a": ("x", np.zeros(3))}))
+    pipeline.set_step("first", add, value=1)
+    pipeline.add_step("second", add, value=10)
+    assert float(pipeline.compute()["a"][0]) == 11
+    assert calls == [1, 10]
+
+    pipeline.set_step("second", add, value=100)
+    assert float(pipeline.compute()["a"][0]) == 101
+    assert calls == [1, 10, 100]
+
+
+def test_undo_redo_and_reset_reuse_cached_results():
+    pipeline = Pipeline(xr.Dataset({"a": ("x", np.zeros(3))}))
+    pipeline.set_step("first", add, value=1)
+    first = pipeline.compute()
+    pipeline.add_step("second", add, value=10)
+    second = pipeline.compute()
+
+    assert pipeline.undo()
+    assert pipeline.is_cached() and pipeline.compute() is first
+    assert pipeline.redo()
+    assert pipeline.compute() is second
+
+    pipeline.reset()
+    assert pipeline.compute() is pipeline.source
+    assert pipeline.undo() and pipeline.compute() is second
+    assert calls == [1, 10]
+
+
+def test_repeated_steps_and_snapshots():
+    pipeline = Pipeline(xr.Dataset({"a": ("x", np.zeros(3))}))
+    pipeline.add_step("add", add, value=1)
+    snapshot = pipeline.steps
+    pipeline.add_step("add", add, value=1)
+
+    assert [step.name for step in pipeline.steps] == ["add", "add#1"]
+    assert not pipeline.is_current(snapshot)
+    assert float(pipeline.compute(snapshot)["a"][0]) == 1
+    assert float(pipeline.compute()["a"][0]) == 2
+
+
+def test_loaded_results_are_reused_without_reading_the_source():
+    reads = []
+
+    def read(block):
+        reads.append(block.size)
+        return block
+
+    source = xr.Dataset({"a": ("x", da.zeros(4, chunks=2).map_blocks(read, meta=np.array((), dtype=float)))})
+    pipeline = Pipeline(source)
+    pipeline.set_step("first", add, value=1)
+    pipeline.add_step("second", add, value=10)
+    assert float(pipeline.compute()["a"][0]) == 11
+    assert len(reads) == 2
+
+    pipeline.set_step("second", add, value=100)
+    assert float(pipeline.compute()["a"][0]) == 101
+    assert pipeline.undo() and float(pipeline.compute()["a"][0]) == 11
+    assert len(reads) == 2
+
+    # Results over the memory budget are cached lazily, so their computations read the source again
+    pipeline = Pipeline(source, max_bytes=0)
+    pipeline.set_step("first", add, value=1)
+    pipeline.compute().compute()
+    pipeline.add_step("second", add, value=10)
+    pipeline.compute().compute()
+    assert len(reads) == 6 and pipeline.nbytes == 0
@@ -0,0 +1,179 @@
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+from ecodata.plotting import (
+    ClimCache,
+    FrameCache,
+    GriddedPlotWithSlider,
+    SpatialMeanCache,
+    data_version,
+    exact_clim,
+    sample_clim,
+)
+from ecodata.pyramid_utils import Pyramid
+
+
+@pytest.fixture
+def gridded_ds():
+    time = pd.date_range("2000-01-01", periods=5)
+    lat = np.linspace(60, 50, 6)
+    lon = np.linspace(-120, -110, 8)
+    data = np.arange(len(time) * len(lat) * len(lon), dtype="float64").reshape(len(time), len(lat), len(lon))
+    return xr.Dataset(
+        {"t2m": (("time", "latitude", "longitude"), data)},
+        coords={"time": time, "latitude": lat, "longitude": lon},
+    )
+
+
+def test_frame_cache_evicts_least_recently_used():
+    cache = FrameCache(max_bytes=20)
+    for key in ["a", "b"]:
+        cache.get(key, lambda key=key: (key, 10))
+    cache.get("a", lambda: pytest.fail("'a' should be cached"))
+    cache.get("c", lambda: ("c", 10))
+
+    assert "a" in cache and "c" in cache and "b" not in cache
+    assert cache.nbytes == 20
+
+
+def test_frame_cache_prefetch():
+    cache = FrameCache()
+    cache.prefetch("a", lambda: ("a", 1))
+    assert cache.get("a", lambda: pytest.fail("'a' should be prefetched")) == "a"
+
+
+def test_data_version(gridded_ds):
+    assert data_version(gridded_ds.t2m) == data_version(gridded_ds[["t2m"]].t2m)
+    assert data_version(gridded_ds.t2m) != data_version(gridded_ds.t2m + 1)
+    chunked = gridded_ds.chunk({"time": 1})
+    assert data_version(chunked.t2m) == chunked.t2m.data.name
+
+
+
+def test_data_version_not_reused():
+    # Arrays created after others are freed can get their id, but never their version
+    versions = set()
+    for _ in range(50):
+        version = data_version(xr.DataArray(np.zeros(4)))
+        assert version not in versions
+        versions.add(version)
+
+
+def test_gridded_plot_with_slider_caches_frames(gridded_ds):
+    # Rasterizing the frames needs datashader, which needs dask.dataframe
+    pytest.importorskip("datashader")
+    pytest.importorskip("dask.dataframe")
+    cache = FrameCache()
+    plot = GriddedPlotWithSlider(gridded_ds.chunk({"time": 1}), timevar="time", zvar="t2m", cache=cache)
+
+    # The first and the prefetched second timesteps
+    first_frame = plot.fig.object
+    cache._executor.shutdown(wait=True)
+    assert len(cache) == 2
+
+    plot.time_slider.value = plot.times[1]
+    plot.plot_slice()
+    plot.time_slider.value = plot.times[0]
+    plot.plot_slice()
+    assert plot.fig.object is first_frame
+
+
+
+def test_gridded_plot_with_slider_pyramid_frames(gridded_ds):
+    cache = FrameCache(prefetch_workers=1)
+    coarse = Pyramid([gridded_ds, gridded_ds.coarsen(latitude=2, longitude=2).mean()])
+    fine = Pyramid([gridded_ds])
+    plots = [
+        GriddedPlotWithSlider(gridded_ds, timevar="time", zvar="t2m", cache=cache, prefetch=0, pyramid=pyramid)
+        for pyramid in (coarse, fine)
+    ]
+    time = plots[0].times[0]
+
+    # Frames of different pyramids of the same data aren't shared, and count towards the memory budget
+    assert plots[0]._frame_key(time) != plots[1]._frame_key(time)
+    assert plots[0].fig.object is not plots[1].fig.object
+    assert len(cache) == 2
+    assert cache.nbytes == 2 * 500 * 500 * 8
+
+def test_sample_clim_reads_whole_chunks(gridded_ds):
+    ds = gridded_ds.chunk({"time": 1})
+    timestep_size = ds.t2m[0].size
+    assert sample_clim(ds.t2m, max_samples=1000) == (0, ds.t2m.size - 1)
+    # The first, middle and last timesteps
+    assert sample_clim(ds.t2m, max_samples=3 * timestep_size) == (0, ds.t2m.size - 1)
+    assert sample_clim(ds.t2m, max_samples=10) == (0, timestep_size - 1)
+
+    tiled = gridded_ds.chunk({"time": 5, "latitude": 3, "longitude": 4})
+    assert sample_clim(tiled.t2m, max_samples=1) == (0, float(tiled.t2m[:, :3, :4].max()))
+
+
+def test_sample_clim_reads_whole_timesteps(gridded_ds):
+    timestep_size = gridded_ds.t2m[0].size
+    assert sample_clim(gridded_ds.t2m, max_samples=10) == (0, timestep_size - 1)
+    low, high = sample_clim(gridded_ds.t2m, quantiles=(0, 1), max_samples=2 * timestep_size)
+    assert (low, high) == (0, gridded_ds.t2m.size - 1)
+
+
+def test_exact_clim_quantiles():
+    da = xr.DataArray(np.arange(1001.0), dims="x")
+    np.testing.assert_allclose(exact_clim(da, (0.02, 0.98)), (20, 980), atol=1)
+    np.testing.assert_allclose(exact_clim(da.chunk(100), (0.02, 0.98)), (20, 980), atol=1)
+
+
+def test_clim_cache_refines_in_background(gridded_ds):
+    da = gridded_ds.t2m.chunk({"time": 1})
+    cache = ClimCache(max_samples=da.size // 8)
+    refined = []
+
+    estimate = cache.get(da, on_refine=refined.append)
+    cache.wait()
+
+    assert estimate[1] < da.size - 1
+    assert refined == [(0.0, da.size - 1.0)]
+    assert cache.is_exact(da)
+    assert cache.get(da) == (0.0, da.size - 1.0)
+
+
+def test_spatial_mean_cache_updates_incrementally(gridded_ds, monkeypatch):
+    ds = gridded_ds.copy()
+    ds["t2m"][1, 0, 0] = np.nan
+    spatial_mean = SpatialMeanCache(ds.t2m.chunk({"time": 1}))
+    xr.testing.assert_allclose(spatial_mean.mean(), ds.t2m.mean(["latitude", "longitude"]))
+
+    mask = np.ones((6, 8), dtype=bool)
+    mask[:2, :3] = False
+    aggregated = []
+    aggregate = spatial_mean._aggregate
+    monkeypatch.setattr(spatial_mean, "_aggregate", lambda m: aggregated.append(m.sum()) or aggregate(m))
+    spatial_mean.update(mask)
+
+    # Only the 6 deselected cells were read
+    assert aggregated == [0, 6]
+    expected = ds.t2m.where(xr.DataArray(mask, dims=("latitude", "longitude"))).mean(["latitude", "longitude"])
+    xr.testing.assert_allclose(spatial_mean.mean(), expected)
+
+    # Timesteps that aren't selected are empty, as in the unfiltered plot
+    result = spatial_mean.mean(times=ds.time.values[2:])
+    assert result.isnull().values[:2].all()
+    xr.testing.assert_allclose(result[2:], expected[2:])
+
+
+
+def test_spatial_mean_cache_aggregates_without_updating(gridded_ds):
+    spatial_mean = SpatialMeanCache(gridded_ds.t2m).update()
+    expected = spatial_mean.mean()
+    mask = np.zeros((6, 8), dtype=bool)
+    mask[2:, 4:] = True
+
+    # Computed from the current aggregates (e.g. in a job), and only set afterwards
+    aggregates = spatial_mean.aggregates(mask)
+    xr.testing.assert_allclose(spatial_mean.mean(), expected)
+    spatial_mean.set_aggregates(aggregates)
+    xr.testing.assert_allclose(spatial_mean.mean(), gridded_ds.t2m[:, 2:, 4:].mean(["latitude", "longitude"]))
+
+def test_spatial_mean_cache_area_weighted(gridded_ds):
+    spatial_mean = SpatialMeanCache(gridded_ds.t2m, area_weighted=True)
+    weights = np.cos(np.deg2rad(gridded_ds.latitude))
+    xr.testing.assert_allclose(spatial_mean.mean(), gridded_ds.t2m.weighted(weights).mean(["latitude", "longitude"]))
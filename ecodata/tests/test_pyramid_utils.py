@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+import ecodata as eco
+from ecodata.pyramid_utils import is_pyramid, open_pyramid
+
+
+@pytest.fixture
+def gridded_ds():
+    time = pd.date_range("2000-01-01", periods=3)
+    lat = np.linspace(59.95, 50.05, 100)
+    lon = np.linspace(-119.95, -100.05, 200)
+    data = np.arange(len(time) * len(lat) * len(lon), dtype="float32").reshape(len(time), len(lat), len(lon))
+    return xr.Dataset(
+        {"t2m": (("time", "latitude", "longitude"), data)},
+        coords={"time": time, "latitude": lat, "longitude": lon},
+    )
+
+
+def test_build_pyramid(gridded_ds, tmp_path):
+    store = tmp_path / "pyramid.zarr"
+    pyramid = eco.build_pyramid(gridded_ds, store, min_size=50)
+
+    assert is_pyramid(store)
+    assert not is_pyramid(tmp_path)
+    assert [ds.sizes["longitude"] for ds in pyramid] == [200, 100, 50]
+    xr.testing.assert_allclose(pyramid[1].compute(), gridded_ds.coarsen(latitude=2, longitude=2).mean())
+    assert len(open_pyramid(store)) == 3
+
+
+def test_pyramid_select_level(gridded_ds, tmp_path):
+    pyramid = eco.build_pyramid(gridded_ds, tmp_path / "pyramid.zarr", min_size=50)
+
+    # The whole dataset fits in a small plot from the coarsest level
+    assert pyramid.select_level(width=40, height=20) == 2
+    assert pyramid.select_level(width=80, height=40) == 1
+    # Zoomed in to a quarter of the longitude range, only the full resolution has enough cells
+    assert pyramid.select_level(x_range=(-120, -115), width=40, height=20) == 0
+
+    ds_view = pyramid.select(x_range=(-110, -105), y_range=(52, 55), width=10, height=5)
+    assert ds_view.longitude.min() < -110 and ds_view.longitude.max() > -105
+    assert ds_view.sizes["longitude"] < 30
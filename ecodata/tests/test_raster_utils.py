@@ -0,0 +1,143 @@
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+import ecodata as eco
+from ecodata.raster_utils import RASTER_INDEX_FILENAME, RasterStack, make_time_parser, time_index_from_filenames
+
+
+@pytest.fixture
+def modis_tif_dir(tmp_path):
+    tif_dir = tmp_path / "tifs"
+    tif_dir.mkdir()
+    # Write the files out of time order
+    for day in [33, 1, 17]:
+        data = np.full((1, 4, 5), day, dtype="int16")
+        da = xr.DataArray(
+            data,
+            dims=("band", "y", "x"),
+            coords={"band": [1], "y": np.linspace(60, 57, 4), "x": np.linspace(-120, -116, 5)},
+        ).rio.write_crs("EPSG:4326")
+        da.rio.to_raster(tif_dir / f"MOD13A1.006__500m_16_days_NDVI_doy2021{day:03d}_aid0001.tif")
+    return tif_dir
+
+
+def test_time_index_from_modis_filenames():
+    filenames = ["MOD13A1.006__500m_16_days_NDVI_doy2021017_aid0001.tif"]
+    assert time_index_from_filenames(filenames)[0] == pd.Timestamp("2021-01-17")
+
+
+def test_custom_time_parser():
+    parser = make_time_parser(r"_(\d{8})\.tif$", "%Y%m%d")
+    assert parser("/data/ndvi_20210117.tif") == pd.Timestamp("2021-01-17")
+    with pytest.raises(ValueError):
+        parser("ndvi.tif")
+
+
+def test_geotif2nc(modis_tif_dir, tmp_path):
+    outfile = tmp_path / "ndvi.nc"
+    da = eco.geotif2nc(modis_tif_dir, outfile)
+
+    assert da.chunks is not None
+    with xr.open_dataset(outfile) as ds_out:
+        da_out = ds_out["band_data"]
+        np.testing.assert_array_equal(da_out.time, pd.to_datetime(["2021-01-01", "2021-01-17", "2021-02-02"]))
+        np.testing.assert_array_equal(da_out.isel(band=0, x=0, y=0), [1, 17, 33])
+
+
+def test_open_raster_stack(modis_tif_dir):
+    ds = eco.open_raster_stack(modis_tif_dir, chunks={"y": 2})
+
+    assert (modis_tif_dir / RASTER_INDEX_FILENAME).exists()
+    assert ds.band_data.dims == ("time", "band", "y", "x")
+    assert ds.band_data.data.numblocks == (3, 1, 2, 1)
+    np.testing.assert_array_equal(ds.time, pd.to_datetime(["2021-01-01", "2021-01-17", "2021-02-02"]))
+    np.testing.assert_allclose(ds.y, np.linspace(60, 57, 4))
+    np.testing.assert_array_equal(ds.band_data.isel(band=0, y=3, x=4).values, [1, 17, 33])
+    assert ds.rio.crs.to_epsg() == 4326
+
+    subset = eco.open_raster_stack(modis_tif_dir, start_time="2021-01-10")
+    np.testing.assert_array_equal(subset.band_data.isel(band=0, y=0, x=0).values, [17, 33])
+
+
+def test_raster_stack_chunks_are_part_of_the_name(modis_tif_dir):
+    stack = RasterStack(modis_tif_dir)
+    whole = stack.open().band_data
+    split = stack.open(chunks={"y": 2}).band_data
+
+    assert whole.data.name != split.data.name
+    assert whole.data.name == stack.open().band_data.data.name
+    xr.testing.assert_equal((whole - split).compute(), xr.zeros_like(whole))
+
+
+def test_raster_stack_reuses_index(modis_tif_dir, monkeypatch):
+    RasterStack(modis_tif_dir)
+
+    def fail(self, path):
+        raise AssertionError(f"{path} was read again")
+
+    monkeypatch.setattr(RasterStack, "_read_header", fail)
+    stack = RasterStack(modis_tif_dir)
+    assert len(stack) == 3
+
+
+def test_grib2nc_variables(era5_grib, tmp_path):
+    outfile = eco.grib2nc(era5_grib, tmp_path / "era5.nc", index_dir=tmp_path / "index")
+
+    assert list((tmp_path / "index").glob("era5.grib.*.idx"))
+    with xr.open_dataset(outfile) as ds:
+        assert set(ds.data_vars) == {"t", "sp", "t2m"}
+        assert ds.t.dims == ("time", "isobaricInhPa", "latitude", "longitude")
+        assert ds.t2m.attrs["GRIB_heightAboveGround"] == 2
+        np.testing.assert_array_equal(ds.t.sel(isobaricInhPa=500).isel(time=1).values.ravel(), np.arange(12) + 506)
+
+
+def test_grib2nc_variables_on_several_level_types(grib_shared_names, tmp_path):
+    outfile = eco.grib2nc(grib_shared_names, tmp_path / "shared.nc")
+
+    with xr.open_dataset(outfile) as ds:
+        assert set(ds.data_vars) == {"t_isobaricInhPa", "t_surface"}
+        assert ds.t_isobaricInhPa.dims == ("time", "isobaricInhPa", "latitude", "longitude")
+        np.testing.assert_array_equal(ds.t_surface.isel(time=1).values.ravel(), np.arange(12) + 6)
+
+
+def test_grib2nc_filter_and_groups(era5_grib, tmp_path):
+    filtered = eco.grib2nc(era5_grib, tmp_path / "t.nc", filter_by_keys={"shortName": "t"})
+    with xr.open_dataset(filtered) as ds:
+        assert list(ds.data_vars) == ["t"]
+
+    grouped = eco.grib2nc(era5_grib, tmp_path / "groups.nc", split="groups")
+    with xr.open_dataset(grouped, group="surface") as ds:
+        assert list(ds.data_vars) == ["sp"]
+    with xr.open_dataset(grouped, group="isobaricInhPa") as ds:
+        assert list(ds.data_vars) == ["t"]
+
+
+def test_convert_batch_resumes(era5_grib, modis_tif_dir, tmp_path):
+    out_dir = tmp_path / "converted"
+    report = eco.convert_batch([era5_grib, modis_tif_dir], out_dir, max_workers=2)
+
+    assert report["outputs"] == [out_dir / "era5.nc", out_dir / "tifs.nc"]
+    assert set(report["converted"]) == {era5_grib, modis_tif_dir}
+    assert report["bytes"] > 0
+    assert all(path.exists() for path in report["outputs"])
+
+    # Indexing the GeoTIFFs writes a file in their directory, which doesn't change the sources
+    RasterStack(modis_tif_dir)
+    report = eco.convert_batch([era5_grib, modis_tif_dir], out_dir, max_workers=2)
+    assert report["skipped"] == [era5_grib, modis_tif_dir]
+
+    # Completed inputs are skipped, unless they were modified
+    (out_dir / "tifs.nc").unlink()
+    report = eco.convert_batch([era5_grib, modis_tif_dir], out_dir, max_workers=2)
+    assert report["skipped"] == [era5_grib]
+    assert report["converted"] == [modis_tif_dir]
+
+
+def test_convert_batch_reports_failures(tmp_path):
+    bad_grib = tmp_path / "bad.grib"
+    bad_grib.write_bytes(b"not a grib file")
+    report = eco.convert_batch([bad_grib], tmp_path / "converted", max_workers=1)
+    assert list(report["failed"]) == [bad_grib]
+    assert report["converted"] == []
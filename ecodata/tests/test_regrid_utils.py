@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+import ecodata as eco
+from ecodata import regrid_utils
+
+
+@pytest.fixture
+def linear_ds():
+    time = pd.date_range("2000-01-01", periods=3)
+    lat = np.arange(60, 49, -1.0)
+    lon = np.arange(-120, -99, 1.0)
+    data = (2 * lat[:, None] + 3 * lon[None, :])[None, :, :] * np.arange(1, 4)[:, None, None]
+    return xr.Dataset(
+        {"t2m": (("time", "latitude", "longitude"), data)},
+        coords={"time": time, "latitude": lat, "longitude": lon},
+    )
+
+
+@pytest.fixture
+def target_grid():
+    return {"latitude": np.arange(51.25, 59, 2.5), "longitude": np.arange(-118.5, -101, 1.5)}
+
+
+def test_bilinear_is_exact_for_linear_field(linear_ds, target_grid, tmp_path):
+    result = eco.regrid(linear_ds.chunk({"time": 1}), target_grid, method="bilinear", cache_dir=tmp_path)
+
+    lat, lon = np.meshgrid(target_grid["latitude"], target_grid["longitude"], indexing="ij")
+    expected = (2 * lat + 3 * lon)[None, :, :] * np.arange(1, 4)[:, None, None]
+    assert result.t2m.chunks is not None
+    np.testing.assert_allclose(result.t2m.values, expected)
+    np.testing.assert_array_equal(result.latitude, target_grid["latitude"])
+
+
+def test_nearest(linear_ds, tmp_path):
+    target = {"latitude": [55.2, 70.0], "longitude": [-110.4]}
+    result = eco.regrid(linear_ds, target, method="nearest", cache_dir=tmp_path)
+    np.testing.assert_allclose(result.t2m.isel(time=0).values, [[2 * 55 + 3 * -110], [np.nan]])
+
+
+def test_conservative_averages_overlapping_cells(linear_ds, tmp_path):
+    ds = linear_ds.copy()
+    # Values only vary along longitude, so the area weighting along latitude doesn't change the means
+    ds["t2m"] = ds.t2m.isel(latitude=0, drop=True).broadcast_like(ds.t2m).copy()
+    ds["t2m"][:, 0, 0] = np.nan
+    target = {"latitude": [55.0], "longitude": [-119.5, -117.5]}
+    result = eco.regrid(ds, target, method="conservative", cache_dir=tmp_path)
+
+    row = linear_ds.t2m.isel(time=0, latitude=0).values
+    np.testing.assert_allclose(result.t2m.isel(time=0).values, [[row[0:2].mean(), row[2:4].mean()]])
+
+
+def test_weights_are_cached_on_disk(linear_ds, target_grid, tmp_path, monkeypatch):
+    monkeypatch.setattr(regrid_utils, "_weights_cache", {})
+    eco.regrid(linear_ds, target_grid, method="bilinear", cache_dir=tmp_path)
+    assert len(list(tmp_path.glob("bilinear_*.npz"))) == 1
+
+    monkeypatch.setattr(regrid_utils, "_weights_cache", {})
+    monkeypatch.setattr(regrid_utils, "compute_regrid_weights", None)
+    result = eco.regrid(linear_ds, target_grid, method="bilinear", cache_dir=tmp_path)
+    assert result.t2m.notnull().all()
+
+
+def test_invalid_method(linear_ds, target_grid):
+    with pytest.raises(ValueError):
+        eco.regrid(linear_ds, target_grid, method="cubic")
+
+
+def test_variables_without_the_grid(linear_ds, target_grid, tmp_path):
+    ds = linear_ds.assign(station=("time", [1.0, 2.0, 3.0]))
+    result = eco.regrid(ds, target_grid, cache_dir=tmp_path)
+    xr.testing.assert_identical(result.station, ds.station)
+
+    with pytest.raises(ValueError, match="lat_weights"):
+        eco.regrid(ds.assign(lat_weights=np.cos(np.deg2rad(ds.latitude))), target_grid, cache_dir=tmp_path)
@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from ecodata import tile_utils
+from ecodata.tile_utils import MERCATOR_EXTENT, DensityPyramid, build_track_tiles, lonlat_to_mercator
+
+
+@pytest.fixture
+def tracks():
+    rng = np.random.default_rng(0)
+    return pd.DataFrame(
+        {"location_long": rng.uniform(-120, -100, 10000), "location_lat": rng.uniform(40, 50, 10000)}
+    )
+
+
+def test_lonlat_to_mercator():
+    x, y = lonlat_to_mercator([-180, 0, 180], [0, 0, 85.0511287798])
+    np.testing.assert_allclose(x, [-MERCATOR_EXTENT, 0, MERCATOR_EXTENT])
+    np.testing.assert_allclose(y, [0, 0, MERCATOR_EXTENT], atol=1e-3)
+
+
+def test_density_pyramid_levels(tracks, tmp_path):
+    pyramid = build_track_tiles(tracks, cache_dir=tmp_path, max_zoom=6)
+
+    for zoom in [0, 3, 6]:
+        assert pyramid.level(zoom)[2].sum() == len(tracks)
+    image, bounds = pyramid.image(width=256, height=256)
+    assert pyramid.select_zoom(width=256) == 0
+    assert image.shape == (256, 256)
+    assert np.nansum(image) == len(tracks)
+    assert bounds == (-MERCATOR_EXTENT, -MERCATOR_EXTENT, MERCATOR_EXTENT, MERCATOR_EXTENT)
+
+    # The points are in the northern hemisphere, so at the top of the image
+    assert np.nansum(image[:128]) == len(tracks)
+
+
+def test_density_pyramid_viewport(tracks, tmp_path):
+    pyramid = build_track_tiles(tracks, cache_dir=tmp_path, max_zoom=8)
+    x_range, y_range = lonlat_to_mercator([-115, -105], [42, 48])
+    inside = tracks.location_long.between(-115, -105) & tracks.location_lat.between(42, 48)
+
+    image, bounds = pyramid.image(x_range, y_range, width=100, height=100)
+    assert pyramid.select_zoom(x_range, width=100) == 4
+    assert bounds[0] <= x_range[0] and bounds[2] >= x_range[1]
+    # The image covers whole pixels around the viewport, so it can include a few more points
+    assert inside.sum() <= np.nansum(image) < inside.sum() * 1.1
+
+    # Deeper than the pyramid, the raw points are aggregated
+    image, bounds = pyramid.image(x_range, y_range, width=4000, height=2000)
+    assert image.shape == (2000, 4000)
+    assert np.nansum(image) == inside.sum()
+
+
+def test_build_track_tiles_reuses_cache(tracks, tmp_path, monkeypatch):
+    build_track_tiles(tracks, cache_dir=tmp_path, max_zoom=4)
+    monkeypatch.setattr(DensityPyramid, "build", lambda *args, **kwargs: pytest.fail("rebuilt the pyramid"))
+    monkeypatch.setattr(tile_utils, "lonlat_to_mercator", lambda *args: pytest.fail("projected the points again"))
+    pyramid = build_track_tiles(tracks, cache_dir=tmp_path, max_zoom=4)
+    assert pyramid.meta["n_points"] == len(tracks)
+
+    # The projected points are memory mapped from the cache for deep zooms
+    assert isinstance(pyramid.points[0], np.memmap)
+    image, _ = pyramid.image((-1.4e7, -1.1e7), (4e6, 7e6), width=8000, height=10)
+    assert np.nansum(image) == len(tracks)
@@ -0,0 +1,190 @@
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+import ecodata as eco
+from ecodata import xr_tools
+from ecodata.xr_tools import TimeIndex, get_time_index
+
+
+@pytest.fixture
+def hourly_ds():
+    time = pd.date_range("2000-01-01", "2002-12-31 18:00", freq="6h")
+    lat = np.linspace(60, 50, 6)
+    lon = np.linspace(-120, -110, 8)
+    rng = np.random.default_rng(0)
+    data = rng.normal(size=(len(time), len(lat), len(lon)))
+    return xr.Dataset(
+        {"t2m": (("time", "latitude", "longitude"), data)},
+        coords={"time": time, "latitude": lat, "longitude": lon},
+    )
+
+
+def select_time_cond_reference(ds, **kwargs):
+    """Reference implementation of select_time_cond using the .dt accessor directly"""
+    filters = []
+    for var_str, (values, value_range) in kwargs.items():
+        selection = np.union1d(values or [], np.arange(value_range[0], value_range[1] + 1) if value_range else [])
+        filters.append(getattr(ds["time"].dt, var_str).isin(selection).values)
+    return ds.sel(time=np.all(filters, axis=0))
+
+
+@pytest.mark.parametrize(
+    "kwargs,reference_kwargs",
+    [
+        (dict(years=[2001]), dict(year=([2001], None))),
+        (dict(month_range=[4, 6]), dict(month=(None, [4, 6]))),
+        (dict(months=[1], month_range=[6, 8], hours=[0, 12]), dict(month=([1], [6, 8]), hour=([0, 12], None))),
+        (
+            dict(year_range=[2000, 2001], dayofyear_range=[100, 120]),
+            dict(year=(None, [2000, 2001]), dayofyear=(None, [100, 120])),
+        ),
+    ],
+)
+def test_select_time_cond_matches_reference(hourly_ds, kwargs, reference_kwargs):
+    result = eco.select_time_cond(hourly_ds, **kwargs)
+    expected = select_time_cond_reference(hourly_ds, **reference_kwargs)
+    xr.testing.assert_identical(result, expected)
+
+
+def test_select_time_cond_without_selections_returns_dataset(hourly_ds):
+    assert eco.select_time_cond(hourly_ds) is hourly_ds
+
+
+def test_select_time_cond_uses_slices_for_dask(hourly_ds):
+    ds = hourly_ds.chunk({"time": 100})
+    result = eco.select_time_cond(ds, month_range=[4, 6])
+    expected = select_time_cond_reference(hourly_ds, month=(None, [4, 6]))
+    xr.testing.assert_identical(result.compute(), expected)
+
+    # One selected run per year, so the graph shouldn't grow with the number of selected timesteps
+    assert result.t2m.data.npartitions < result.sizes["time"] / 10
+
+
+def test_time_index_is_cached(hourly_ds):
+    time_index = get_time_index(hourly_ds)
+    assert get_time_index(hourly_ds[["t2m"]]) is time_index
+    assert get_time_index(hourly_ds.isel(time=slice(0, 10))) is not time_index
+    np.testing.assert_array_equal(time_index.unique("year"), [2000, 2001, 2002])
+
+
+def test_time_index_runs():
+    mask = np.array([True, True, False, True, False, False, True])
+    assert TimeIndex.runs(mask) == [slice(0, 2), slice(3, 4), slice(6, 7)]
+    assert TimeIndex.runs(np.zeros(3, dtype=bool)) == []
+
+
+def test_resample_time_weighted_matches_mean_for_multiples(hourly_ds):
+    result = eco.resample_time_weighted(hourly_ds, freq="2D")
+    expected = hourly_ds.resample(time="2D").mean()
+    xr.testing.assert_allclose(result, expected)
+
+
+def test_resample_time_weighted_overlap():
+    time = pd.date_range("2000-01-01", periods=4, freq="16D")
+    ds = xr.Dataset({"ndvi": ("time", [1.0, 2.0, np.nan, 4.0])}, coords={"time": time}).chunk({"time": 2})
+
+    result = eco.resample_time_weighted(ds, freq="7D")
+
+    assert result.ndvi.chunks is not None
+    np.testing.assert_array_equal(result.time, pd.date_range("2000-01-01", periods=7, freq="7D"))
+    # Week 3 (days 14-21) overlaps the first composite for 2 days and the second for 5 days
+    np.testing.assert_allclose(result.ndvi.values[2], (2 * 1.0 + 5 * 2.0) / 7)
+    # Week 5 (days 28-35) overlaps the second composite for 4 days and the missing third composite for 3 days
+    np.testing.assert_allclose(result.ndvi.values[4], 2.0)
+    assert np.isnan(result.ndvi.values[5])
+
+
+def test_resample_time_weighted_keeps_time_chunks(hourly_ds, monkeypatch):
+    # Keep the chunks of the test, which the rechunking plan would merge as the dataset is small
+    monkeypatch.setattr(xr_tools, "rechunk_for", lambda ds, *args, **kwargs: ds)
+    ds = hourly_ds.assign(elevation=hourly_ds.t2m.isel(time=0, drop=True))
+    ds["t2m"] = ds.t2m.where(ds.t2m > -2)
+    chunked = ds.chunk({"time": 100})
+
+    result = eco.resample_time_weighted(chunked, freq="10h")
+
+    # Parts of about 100 input timesteps, instead of one chunk with all the timesteps
+    assert max(result.t2m.chunksizes["time"]) <= 100 * 6 / 10 + 1
+    xr.testing.assert_allclose(result.compute(), eco.resample_time_weighted(ds, freq="10h"))
+    xr.testing.assert_identical(result.elevation, chunked.elevation)
+
+
+def test_resample_time_irregular_uses_overlap_weights(hourly_ds):
+    result = eco.resample_time(hourly_ds, time_quantity=10, time_unit="hour", interp_irreg=True)
+    xr.testing.assert_identical(result, eco.resample_time_weighted(hourly_ds, freq="10h"))
+
+
+def test_write_dataset_compression_and_packing(hourly_ds, tmp_path):
+    ds = hourly_ds.isel(time=slice(0, 100))
+    outfile = eco.write_dataset(ds, tmp_path / "packed.nc", pack=True, access="timeseries")
+
+    with xr.open_dataset(outfile) as ds_packed:
+        encoding = ds_packed.t2m.encoding
+        assert encoding["dtype"] == np.int16
+        assert encoding["zlib"]
+        assert encoding["chunksizes"][0] == 100
+        t2m_range = float(ds.t2m.max() - ds.t2m.min())
+        np.testing.assert_allclose(ds_packed.t2m.values, ds.t2m.values, atol=t2m_range / 2**16)
+
+
+def test_encoding_policy_without_compression(hourly_ds):
+    encoding = eco.encoding_policy(hourly_ds, compression=None, access=None)
+    assert encoding == {"t2m": {}}
+
+    with pytest.raises(ValueError):
+        eco.encoding_policy(hourly_ds, compression="lzma")
+
+
+def test_encoding_policy_compression_levels(hourly_ds):
+    assert eco.encoding_policy(hourly_ds, compression="zstd", complevel=19)["t2m"]["complevel"] == 19
+    with pytest.raises(ValueError, match="between 1 and 9"):
+        eco.encoding_policy(hourly_ds, compression="zlib", complevel=19)
+
+
+def test_coarsen_dataset_mean_matches_xarray(hourly_ds):
+    n_window = {"latitude": 2, "longitude": 3}
+    result = eco.coarsen_dataset(hourly_ds, n_window)
+    xr.testing.assert_allclose(result, hourly_ds.coarsen(n_window, boundary="trim").mean())
+
+
+def test_coarsen_dataset_multiple_aggregations(hourly_ds):
+    ds = hourly_ds.copy()
+    ds["t2m"][0, 0, 0] = np.nan
+    n_window = {"latitude": 2, "longitude": 2}
+    result = eco.coarsen_dataset(ds.chunk({"time": 100}), n_window, how=["mean", "min", "max", "std", "count"])
+
+    assert set(result.data_vars) == {"t2m_mean", "t2m_min", "t2m_max", "t2m_std", "t2m_count"}
+    assert result.t2m_mean.chunks is not None
+    coarsen = ds.coarsen(n_window)
+    for stat in ["mean", "min", "max", "std", "count"]:
+        xr.testing.assert_allclose(result[f"t2m_{stat}"].compute(), getattr(coarsen, stat)().t2m)
+    assert result.t2m_count.values[0, 0, 0] == 3
+
+
+def test_coarsen_dataset_area_weighted():
+    lat = np.array([0.0, 60.0])
+    ds = xr.Dataset(
+        {"v": (("latitude", "longitude"), [[1.0, 1.0], [4.0, np.nan]])},
+        coords={"latitude": lat, "longitude": [0.0, 1.0]},
+    )
+    result = eco.coarsen_dataset(ds, {"latitude": 2, "longitude": 2}, area_weighted=True)
+
+    # cos(60) = 0.5, so the cell at 60 degrees has half the weight of the cells at the equator
+    np.testing.assert_allclose(result.v.values, [[(1 + 1 + 4 * 0.5) / 2.5]])
+    np.testing.assert_allclose(result.latitude.values, [30.0])
+
+
+@pytest.mark.parametrize("invert", [False, True])
+def test_spatial_mask_matches_select_spatial(hourly_ds, invert):
+    gpd = pytest.importorskip("geopandas")
+    from shapely.geometry import box
+
+    ds = hourly_ds.isel(time=slice(0, 1))
+    boundary = gpd.GeoDataFrame(geometry=[box(-118, 52, -113, 57)], crs="EPSG:4326")
+    mask = eco.spatial_mask(ds, boundary, invert=invert)
+
+    selected = eco.select_spatial(ds, boundary, invert=invert).t2m.isel(time=0).reindex_like(ds).notnull()
+    np.testing.assert_array_equal(mask.values, selected.values)
+    assert 0 < mask.sum() < mask.size
@@ -0,0 +1,273 @@
+"""
+Precomputed density tile pyramids for large track datasets, so maps of millions of fixes can be drawn at any zoom
+level without aggregating all the points again.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import math
+import os
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__file__)
+
+DEFAULT_CACHE_DIR = Path.home() / ".cache" / "ecodata" / "track_tiles"
+
+TILE_SIZE = 256
+
+# Half of the extent of the Web Mercator projection, in meters
+MERCATOR_EXTENT = 20037508.342789244
+
+# Latitude limit of the Web Mercator projection
+MAX_LATITUDE = 85.0511287798
+
+
+def lonlat_to_mercator(lon, lat):
+    """
+    Project longitudes and latitudes (in degrees) to Web Mercator coordinates (in meters, EPSG:3857), as used by
+    the map tiles.
+    """
+    lon = np.asarray(lon, dtype=float)
+    lat = np.clip(np.asarray(lat, dtype=float), -MAX_LATITUDE, MAX_LATITUDE)
+    x = lon * MERCATOR_EXTENT / 180
+    y = np.log(np.tan((90 + lat) * np.pi / 360)) * MERCATOR_EXTENT / np.pi
+    return x, y
+
+
+class DensityPyramid:
+    """
+    Counts of track fixes per map pixel at each zoom level, from 0 (the whole world in one 256x256 tile) to
+    ``max_zoom``, stored on disk.
+
+    Each level is stored as the sorted pixel coordinates and counts of the pixels that contain fixes, and is memory
+    mapped when it's read. Views deeper than ``max_zoom`` are aggregated from the projected points, which are stored
+    next to the levels sorted by x, and memory mapped too. Use :func:`build_track_tiles` to build (or reuse) the
+    pyramid of a track dataset.
+
+    Parameters
+    ----------
+    directory : str or pathlib.Path
+        Directory of the pyramid
+    """
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.meta = json.loads((self.directory / "meta.json").read_text())
+        self.max_zoom = self.meta["max_zoom"]
+        self._levels = {}
+        self._points = None
+
+    @classmethod
+    def build(cls, x, y, directory, max_zoom=12):
+        """
+        Build the pyramid of a set of points and write it to a directory.
+
+        Parameters
+        ----------
+        x : array-like
+            Web Mercator x coordinates of the points
+        y : array-like
+            Web Mercator y coordinates of the points
+        directory : str or pathlib.Path
+            Directory to write the pyramid to. It's replaced if it already exists.
+        max_zoom : int, optional
+            Deepest zoom level of the pyramid, by default 12 (pixels of about 40 m at the equator)
+
+        Returns
+        -------
+        DensityPyramid
+            The pyramid
+        """
+        directory = Path(directory)
+        tmp_dir = directory.with_name(directory.name + ".tmp")
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        tmp_dir.mkdir(parents=True)
+
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        valid = np.isfinite(x) & np.isfinite(y)
+        order = np.argsort(x[valid], kind="stable")
+        np.save(tmp_dir / "points_x.npy", x[valid][order])
+        np.save(tmp_dir / "points_y.npy", y[valid][order])
+
+        px = _to_pixels(x[valid], max_zoom)
+        py = _to_pixels(y[valid], max_zoom)
+        counts = np.ones(len(px), dtype=np.uint32)
+
+        # Aggregate the deepest level from the points, then each level from the level below it
+        for zoom in range(max_zoom, -1, -1):
+            n_pixels = TILE_SIZE * 2**zoom
+            keys, inverse = np.unique(px.astype(np.int64) * n_pixels + py, return_inverse=True)
+            counts = np.bincount(inverse.ravel(), weights=counts, minlength=len(keys)).astype(np.uint32)
+            px, py = (keys // n_pixels).astype(np.uint32), (keys % n_pixels).astype(np.uint32)
+            for name, values in dict(x=px, y=py, count=counts).items():
+                np.save(tmp_dir / f"{zoom}_{name}.npy", values)
+            logger.info(f"Density pyramid level {zoom}: {len(keys)} pixels")
+            px, py = px // 2, py // 2
+
+        meta = dict(max_zoom=max_zoom, tile_size=TILE_SIZE, n_points=int(valid.sum()))
+        (tmp_dir / "meta.json").write_text(json.dumps(meta))
+        shutil.rmtree(directory, ignore_errors=True)
+        os.replace(tmp_dir, directory)
+        return cls(directory)
+
+    @property
+    def points(self):
+        """
+        Web Mercator x and y coordinates of the points, sorted by x, or None if the pyramid doesn't have them
+        """
+        if self._points is None and (self.directory / "points_x.npy").exists():
+            self._points = tuple(
+                np.load(self.directory / f"points_{name}.npy", mmap_mode="r") for name in ("x", "y")
+            )
+        return self._points
+
+    def level(self, zoom):
+        """
+        Pixel x and y coordinates (counted from the west and south edges of the projection) and fix counts of a level
+        """
+        if zoom not in self._levels:
+            self._levels[zoom] = tuple(
+                np.load(self.directory / f"{zoom}_{name}.npy", mmap_mode="r") for name in ("x", "y", "count")
+            )
+        return self._levels[zoom]
+
+    def select_zoom(self, x_range=None, width=800):
+        """
+        Zoom level with at least one pixel per screen pixel across a viewport.
+
+        Parameters
+        ----------
+        x_range : tuple, optional
+            Web Mercator x range of the viewport, by default the whole world
+        width : int, optional
+            Width of the plot, in pixels, by default 800
+
+        Returns
+        -------
+        int
+            Zoom level. Can be deeper than the pyramid.
+        """
+        extent = (x_range[1] - x_range[0]) if x_range is not None else 2 * MERCATOR_EXTENT
+        if extent <= 0:
+            return self.max_zoom
+        return max(math.ceil(math.log2(width * 2 * MERCATOR_EXTENT / (TILE_SIZE * extent))), 0)
+
+    def image(self, x_range=None, y_range=None, width=800, height=600):
+        """
+        Fix counts per pixel over a viewport.
+
+        Parameters
+        ----------
+        x_range : tuple, optional
+            Web Mercator x range of the viewport, by default the whole world
+        y_range : tuple, optional
+            Web Mercator y range of the viewport, by default the whole world
+        width : int, optional
+            Width of the plot, in pixels, by default 800
+        height : int, optional
+            Height of the plot, in pixels, by default 600
+
+        Returns
+        -------
+        counts : numpy.ndarray
+            Fix counts, with the first row at the north edge. Pixels without fixes are NaN.
+        bounds : tuple
+            Web Mercator bounds (left, bottom, right, top) of the image
+        """
+        x_range = tuple(x_range) if x_range is not None else (-MERCATOR_EXTENT, MERCATOR_EXTENT)
+        y_range = tuple(y_range) if y_range is not None else (-MERCATOR_EXTENT, MERCATOR_EXTENT)
+        zoom = self.select_zoom(x_range, width)
+        if zoom > self.max_zoom and self.points is not None:
+            return self._raw_image(x_range, y_range, width, height)
+        zoom = min(zoom, self.max_zoom)
+
+        # Pixel window of the viewport at this zoom level
+        n_pixels = TILE_SIZE * 2**zoom
+        x0, x1 = (int(np.clip(p, 0, n_pixels)) for p in _to_pixel_edges(x_range, zoom))
+        y0, y1 = (int(np.clip(p, 0, n_pixels)) for p in _to_pixel_edges(y_range, zoom))
+        image = np.full((max(y1 - y0, 1), max(x1 - x0, 1)), np.nan)
+
+        px, py, counts = self.level(zoom)
+        start, stop = np.searchsorted(px, [x0, x1])
+        px, py, counts = px[start:stop], py[start:stop], counts[start:stop]
+        inside = (py >= y0) & (py < y1)
+        image[py[inside] - y0, px[inside] - x0] = counts[inside]
+
+        pixel_size = 2 * MERCATOR_EXTENT / n_pixels
+        bounds = (
+            x0 * pixel_size - MERCATOR_EXTENT,
+            y0 * pixel_size - MERCATOR_EXTENT,
+            max(x1, x0 + 1) * pixel_size - MERCATOR_EXTENT,
+            max(y1, y0 + 1) * pixel_size - MERCATOR_EXTENT,
+        )
+        return image[::-1], bounds
+
+    def _raw_image(self, x_range, y_range, width, height):
+        """Aggregate the raw points in the viewport, for views deeper than the pyramid"""
+        x, y = self.points
+        start, stop = np.searchsorted(x, x_range[0], side="left"), np.searchsorted(x, x_range[1], side="right")
+        x, y = x[start:stop], y[start:stop]
+        inside = (y >= y_range[0]) & (y <= y_range[1])
+        counts, _, _ = np.histogram2d(y[inside], x[inside], bins=(height, width), range=(y_range, x_range))
+        counts[counts == 0] = np.nan
+        return counts[::-1], (x_range[0], y_range[0], x_range[1], y_range[1])
+
+
+def build_track_tiles(tracks, cache_dir=DEFAULT_CACHE_DIR, max_zoom=12, key=None, lon="location_long",
+                      lat="location_lat"):
+    """
+    Get the density pyramid of a track dataset, building it if it isn't in the cache yet.
+
+    Parameters
+    ----------
+    tracks : pandas.DataFrame or geopandas.GeoDataFrame
+        Track points
+    cache_dir : str or pathlib.Path, optional
+        Directory where the pyramids are stored, by default ~/.cache/ecodata/track_tiles
+    max_zoom : int, optional
+        Deepest zoom level of the pyramid, by default 12
+    key : str, optional
+        Key identifying the dataset (e.g. from its file path and modification time). By default, a hash of the
+        coordinates of the points.
+    lon : str, optional
+        Label of the longitude column, by default 'location_long'
+    lat : str, optional
+        Label of the latitude column, by default 'location_lat'
+
+    Returns
+    -------
+    DensityPyramid
+        The pyramid of the tracks, with the projected points for views deeper than ``max_zoom``
+    """
+    if key is None:
+        key = str(pd.util.hash_pandas_object(tracks[[lon, lat]], index=False).sum())
+    name = hashlib.sha1(f"{key}-{max_zoom}".encode()).hexdigest()
+    directory = Path(cache_dir) / name
+
+    # Pyramids built before the points were stored with the levels are built again
+    if (directory / "meta.json").exists() and (directory / "points_x.npy").exists():
+        return DensityPyramid(directory)
+
+    logger.info(f"Building density pyramid of {len(tracks)} points in {directory}")
+    x, y = lonlat_to_mercator(tracks[lon].values, tracks[lat].values)
+    return DensityPyramid.build(x, y, directory, max_zoom=max_zoom)
+
+
+def _to_pixels(values, zoom):
+    n_pixels = TILE_SIZE * 2**zoom
+    pixels = np.floor((values + MERCATOR_EXTENT) / (2 * MERCATOR_EXTENT) * n_pixels)
+    return np.clip(pixels, 0, n_pixels - 1).astype(np.uint32)
+
+
+def _to_pixel_edges(value_range, zoom):
+    n_pixels = TILE_SIZE * 2**zoom
+    start = math.floor((value_range[0] + MERCATOR_EXTENT) / (2 * MERCATOR_EXTENT) * n_pixels)
+    stop = math.ceil((value_range[1] + MERCATOR_EXTENT) / (2 * MERCATOR_EXTENT) * n_pixels)
+    return start, stop
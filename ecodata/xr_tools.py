@@ -2,14 +2,20 @@
 Operations and functions for xarray datasets (gridded environmental datasets)
 """
 
+import weakref
 from pathlib import Path
 
+import dask
 import numpy as np
 import pandas as pd
 import rioxarray  # noqa
 import xarray as xr
 from geocube.api.core import make_geocube
 from pyproj.crs import CRS
+from rasterio.features import geometry_mask
+from scipy import sparse
+
+from ecodata.chunking import plan_chunks, rechunk_for
 
 
 def detect_varnames(ds):
@@ -50,7 +56,7 @@ def get_time_res(ds, timevar="time"):
     pandas.Timedelta
         Time resolution of the dataset
     """
-    return pd.Timedelta(ds[timevar].diff(dim="time").mean().values)
+    return pd.Timedelta(ds[timevar].diff(dim=timevar).mean().values)
 
 
 def thin_dataset(dataset, n_thin, outfile=None):
@@ -68,8 +74,8 @@ def thin_dataset(dataset, n_thin, outfile=None):
         An integer value for thinning across all dimensions, or a dictionary with keys matching the dimensions of the
         dataset and the values specifying the thinning value for that dimension.
     outfile : str, optional
-        Path to write the thinned .nc file, if specified. If no path is specified, the thinned dataset won't be written
-        out to a file.
+        Path to write the thinned .nc (or .zarr) file, if specified. If no path is specified, the thinned dataset won't
+        be written out to a file.
 
     Returns
     -------
@@ -87,15 +93,23 @@ def thin_dataset(dataset, n_thin, outfile=None):
 
     # Write thinned dataset to file if output path was specified
     if outfile is not None:
-        ds_thinned.to_netcdf(outfile)
+        write_dataset(ds_thinned, outfile)
 
     return ds_thinned
 
 
-def coarsen_dataset(dataset, n_window, boundary="trim", outfile=None, **kwargs):
+COARSEN_STATS = ("mean", "min", "max", "std", "sum", "count")
+
+
+def coarsen_dataset(
+    dataset, n_window, boundary="trim", outfile=None, how="mean", area_weighted=False, latvar="latitude", **kwargs
+):
     """
     Coarsen a dataset by performing block aggregation. Supports aggregation along
-    multiple dimensions.
+    multiple dimensions, and several aggregations at once.
+
+    All aggregations are computed from the same windowed view of the dataset, so producing several statistics only
+    needs one read of the source data when the result is computed or written.
 
     Note: this function is a thin wrapper around xarray.Dataset.coarsen
 
@@ -111,8 +125,18 @@ def coarsen_dataset(dataset, n_window, boundary="trim", outfile=None, **kwargs):
         If "trim", the excess is dropped. If "pad", the dataset will be padded with NaN.
         If "exact", an error will be raised.
     outfile : str, optional
-        Path to write the .nc file for the new dataset, if specified. If no path is specified,
+        Path to write the .nc (or .zarr) file for the new dataset, if specified. If no path is specified,
         the new dataset won't be written out to a file.
+    how : str or list, optional
+        Aggregation, or list of aggregations, to apply to each window: 'mean', 'min', 'max', 'std', 'sum', or
+        'count' (number of valid values). If a single aggregation is given, the variables keep their names. If a list
+        is given, the aggregated variables are named ``<variable>_<aggregation>`` (e.g. ``t2m_max``).
+        By default 'mean'.
+    area_weighted : bool, optional
+        Whether to weight grid cells by their area (proportional to the cosine of the latitude) when calculating
+        the mean and std, for datasets on a regular latitude/longitude grid. By default False.
+    latvar : str, optional
+        Label of the latitude coordinate in the dataset, used for area weighting. By default 'latitude'.
     **kwargs :
         Additional arguments to be passed to xarray.Dataset.coarsen
 
@@ -128,11 +152,68 @@ def coarsen_dataset(dataset, n_window, boundary="trim", outfile=None, **kwargs):
     elif isinstance(dataset, xr.Dataset):
         ds = dataset.copy()
 
-    ds_coarsen = ds.coarsen(n_window, boundary=boundary, **kwargs).mean()
+    stats = [how] if isinstance(how, str) else list(how)
+    invalid_stats = set(stats) - set(COARSEN_STATS)
+    if invalid_stats:
+        raise ValueError(f"coarsen_dataset: invalid aggregations {invalid_stats}, valid options are {COARSEN_STATS}")
+    if area_weighted and latvar not in ds.coords:
+        raise ValueError(f"coarsen_dataset: latitude coordinate '{latvar}' is needed for area weighting")
+
+    # View of the dataset with each window along new dimensions
+    coarsen = ds.coarsen(n_window, boundary=boundary, **kwargs)
+    window_dims = {dim: f"{dim}_window" for dim in n_window}
+    windows = coarsen.construct({dim: (dim, window_dim) for dim, window_dim in window_dims.items()}, keep_attrs=True)
+    coarse_coords = ds.drop_vars(list(ds.data_vars)).coarsen(n_window, boundary=boundary, **kwargs).mean().coords
+
+    if area_weighted:
+        weights = np.cos(np.deg2rad(windows[latvar])).drop_vars(list(windows[latvar].coords))
+
+    aggregated = {}
+    for name, da in windows.data_vars.items():
+        dims = [window_dims[dim] for dim in n_window if dim in ds[name].dims]
+        if not dims:
+            for stat in stats:
+                aggregated[name if isinstance(how, str) else f"{name}_{stat}"] = ds[name]
+            continue
+
+        valid = da.notnull()
+        weighted = area_weighted and latvar in ds[name].dims
+        if weighted:
+            cell_weights = weights.where(valid, 0)
+            weight_sum = cell_weights.sum(dims)
+            filled = da.fillna(0)
+
+        results = {}
+        for stat in stats:
+            if stat == "count":
+                results[stat] = valid.sum(dims)
+            elif stat == "min":
+                results[stat] = da.min(dims)
+            elif stat == "max":
+                results[stat] = da.max(dims)
+            elif stat == "sum":
+                results[stat] = da.sum(dims)
+            elif stat == "mean" or stat == "std":
+                if "mean" not in results:
+                    results["mean"] = (filled * cell_weights).sum(dims) / weight_sum if weighted else da.mean(dims)
+                if stat == "std" and weighted:
+                    squared_diff = ((filled - results["mean"]) ** 2) * cell_weights
+                    results[stat] = np.sqrt(squared_diff.sum(dims) / weight_sum)
+                elif stat == "std":
+                    results[stat] = da.std(dims)
+
+        for stat in stats:
+            result = results[stat].assign_attrs(ds[name].attrs)
+            aggregated[name if isinstance(how, str) else f"{name}_{stat}"] = result
+
+    ds_coarsen = xr.Dataset(aggregated, attrs=ds.attrs)
+    ds_coarsen = ds_coarsen.drop_vars([c for c in ds_coarsen.coords if c in coarse_coords]).assign_coords(
+        coarse_coords
+    )
 
     # Write thinned dataset to file if output path was specified
     if outfile is not None:
-        ds_coarsen.to_netcdf(outfile)
+        write_dataset(ds_coarsen, outfile)
 
     return ds_coarsen
 
@@ -170,25 +251,64 @@ def select_spatial(ds, boundary, invert=False, crs=None, **kwargs):
         Test from_disk options for datasets that can't fit in memory
     """
 
-    ds_subset = ds.copy()
+    ds_subset, boundary_clip = _match_boundary_crs(ds.copy(), boundary, crs)
+
+    # Clip the dataset
+    ds_subset = ds_subset.rio.clip(boundary_clip, invert=invert, **kwargs)
+
+    return ds_subset
+
+
+def spatial_mask(ds, boundary, invert=False, crs=None, all_touched=False):
+    """
+    Mask of the grid cells of a gridded dataset that are selected by :func:`select_spatial`, without reading the
+    data.
+
+    Parameters
+    ----------
+    ds : xarray.Dataset or xarray.DataArray
+        Gridded dataset
+    boundary : geopandas.GeoDataFrame
+        Bounding geometry
+    invert : bool
+        If True, the cells within the bounding geometry are masked rather than selected. By default False.
+    crs : Any, optional
+        CRS of the input gridded dataset. If CRS are not already included in the data file or otherwise specified here,
+        EPSG:4326 will be used.
+    all_touched : bool, optional
+        If True, all cells touched by the geometry are selected, rather than the cells whose center is within it. By
+        default False, like select_spatial.
+
+    Returns
+    -------
+    xarray.DataArray
+        Boolean mask over the spatial dimensions of the dataset, True for the selected cells
+    """
+    ds, boundary_clip = _match_boundary_crs(ds, boundary, crs)
+    mask = geometry_mask(
+        boundary_clip,
+        out_shape=(ds.rio.height, ds.rio.width),
+        transform=ds.rio.transform(recalc=True),
+        invert=not invert,
+        all_touched=all_touched,
+    )
+    y_dim, x_dim = ds.rio.y_dim, ds.rio.x_dim
+    return xr.DataArray(mask, dims=(y_dim, x_dim), coords={y_dim: ds[y_dim], x_dim: ds[x_dim]})
+
 
+def _match_boundary_crs(ds, boundary, crs=None):
+    """Set the CRS of a dataset (EPSG:4326 if it isn't known) and transform the boundary geometry to it"""
     # Set crs to EPSG:4326 if crs aren't provided
     if crs is None and (ds.rio.crs is None or not ds.rio.crs.is_epsg_code):
-        ds_subset = ds_subset.rio.write_crs("EPSG:4326")
+        ds = ds.rio.write_crs("EPSG:4326")
     elif crs is not None:
-        ds_subset = ds_subset.rio.write_crs(crs)
+        ds = ds.rio.write_crs(crs)
 
     # Transform the boundary to the raster dataset's coordinates if needed
-    ds_crs = CRS.from_user_input(ds_subset.rio.crs)
+    ds_crs = CRS.from_user_input(ds.rio.crs)
     if boundary.crs != ds_crs:
-        boundary_clip = boundary.to_crs(ds_crs).geometry
-    else:
-        boundary_clip = boundary.geometry
-
-    # Clip the dataset
-    ds_subset = ds_subset.rio.clip(boundary_clip, invert=invert, **kwargs)
-
-    return ds_subset
+        return ds, boundary.to_crs(ds_crs).geometry
+    return ds, boundary.geometry
 
 
 def select_time_range(ds, time_var="time", start_time=None, end_time=None):
@@ -265,32 +385,182 @@ def select_time_cond(
         Subset of the input dataset containing only data matching the specified time criteria.
     """
 
-    # List to store boolean arrays for each filter criteria
-    filters = []
-
-    # Helper to combine selection list (e.g. years) with range list (e.g. year_range)
-    def combine_selection(selection_list, range_list):
-        selection_list = selection_list or []
-        range_array = np.arange(range_list[0], range_list[1] + 1) if range_list else []
-        return np.union1d(selection_list, range_array)
-
-    # Create filters for each variable (year, month, dayofyear, hour)
+    # Selected values and ranges for each time component (year, month, dayofyear, hour)
     variables = [(years, year_range), (months, month_range), (daysofyear, dayofyear_range), (hours, hour_range)]
     var_strs = ["year", "month", "dayofyear", "hour"]
+    selections = {}
     for (var0, var1), var_str in zip(variables, var_strs):
         if var0 or var1:
-            selection = combine_selection(var0, var1)
-            filters.append(getattr(ds[time_var].dt, var_str).isin(selection).values)
+            selections[var_str] = var0
+            selections[f"{var_str}_range"] = var1
+
+    if not selections:
+        return ds
 
-    # Combine all time filters to one boolean array
-    time_selection = np.all(filters, axis=0)
+    time_index = get_time_index(ds, time_var)
+    time_selection = time_index.mask(**selections)
 
     # Apply time filter
-    ds_subset = ds.sel({time_var: time_selection})
+    ds_subset = isel_runs(ds, time_var, time_index.runs(time_selection))
 
     return ds_subset
 
 
+class TimeIndex:
+    """
+    Decomposed time components (year, month, day of year, hour) of a time coordinate.
+
+    The components are computed once when the index is created, so repeated time selections on the same dataset
+    only need vectorized lookups. Use :func:`get_time_index` to get a cached instance for a dataset.
+
+    Parameters
+    ----------
+    times : array-like
+        Datetime values of the time coordinate
+    """
+
+    components = ("year", "month", "dayofyear", "hour")
+
+    def __init__(self, times):
+        times = pd.DatetimeIndex(times)
+        self.size = len(times)
+        self._components = {component: np.asarray(getattr(times, component)) for component in self.components}
+        self._unique = {}
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, component):
+        return self._components[component]
+
+    def unique(self, component):
+        """
+        Sorted unique values of a time component (e.g. the years contained in the dataset)
+        """
+        if component not in self._unique:
+            self._unique[component] = np.unique(self._components[component])
+        return self._unique[component]
+
+    def mask(self, **selections):
+        """
+        Boolean mask of the timesteps matching all of the given selections.
+
+        Within one time component, the selected values and the selected range are combined (e.g. ``month=[1]`` and
+        ``month_range=[6, 8]`` selects January and June through August). Selections for different components must
+        all match.
+
+        Parameters
+        ----------
+        **selections :
+            Keys are time components ('year', 'month', 'dayofyear', 'hour') with a list of values to select, or a
+            time component followed by '_range' (e.g. 'year_range') with a list containing the start and the end of
+            the range to select. Both endpoints of a range are included in the selection.
+
+        Returns
+        -------
+        numpy.ndarray
+            Boolean array with one value per timestep
+        """
+        mask = np.ones(self.size, dtype=bool)
+        for component in self.components:
+            values = selections.get(component)
+            value_range = selections.get(f"{component}_range")
+            if values is None and value_range is None:
+                continue
+            component_values = self._components[component]
+            component_mask = np.isin(component_values, np.asarray(values if values is not None else []))
+            if value_range is not None and len(value_range):
+                component_mask |= (component_values >= value_range[0]) & (component_values <= value_range[1])
+            mask &= component_mask
+        return mask
+
+    @staticmethod
+    def runs(mask):
+        """
+        Convert a boolean mask to a list of slices covering the contiguous runs of True values.
+        """
+        mask = np.asarray(mask, dtype=bool)
+        edges = np.diff(np.concatenate([[0], mask.view(np.int8), [0]]))
+        starts = np.flatnonzero(edges == 1)
+        stops = np.flatnonzero(edges == -1)
+        return [slice(start, stop) for start, stop in zip(starts, stops)]
+
+
+_time_index_cache = {}
+
+
+def get_time_index(ds, time_var="time"):
+    """
+    Get the :class:`TimeIndex` for the time coordinate of a dataset.
+
+    The index is cached for as long as the dataset's time index object exists, so datasets derived from each other
+    without changing the time coordinate (e.g. through variable selection or ``copy``) share one index.
+
+    Parameters
+    ----------
+    ds : xarray.Dataset
+        Dataset with a time coordinate
+    time_var : str, optional
+        Name of the time coordinate in the dataset. Defaults to 'time' if not specified.
+
+    Returns
+    -------
+    TimeIndex
+        Time index for the dataset
+    """
+    index = ds.indexes[time_var]
+    key = id(index)
+    cached = _time_index_cache.get(key)
+    if cached is not None and cached[0]() is index:
+        return cached[1]
+
+    if not isinstance(index, pd.DatetimeIndex):
+        time_index = TimeIndex(index.to_datetimeindex())
+    else:
+        time_index = TimeIndex(index)
+    _time_index_cache[key] = (weakref.ref(index, lambda ref, key=key: _time_index_cache.pop(key, None)), time_index)
+    return time_index
+
+
+def isel_runs(ds, dim, runs, max_runs=64):
+    """
+    Select along a dimension using a list of contiguous slices.
+
+    Slicing keeps dask chunks intact, so a selection made of a few long runs results in a few large tasks rather than
+    one task per selected index. If the selection is fragmented into more than ``max_runs`` runs, integer indexing is
+    used instead.
+
+    Parameters
+    ----------
+    ds : xarray.Dataset
+        Dataset to select from
+    dim : str
+        Dimension to select along
+    runs : list[slice]
+        Contiguous runs of indices to select, in increasing order
+    max_runs : int, optional
+        Maximum number of runs to select by slicing, by default 64
+
+    Returns
+    -------
+    xarray.Dataset
+        Selected dataset
+    """
+    if len(runs) == 1:
+        return ds.isel({dim: runs[0]})
+    if 1 < len(runs) <= max_runs:
+        return xr.concat(
+            [ds.isel({dim: run}) for run in runs],
+            dim=dim,
+            data_vars="minimal",
+            coords="minimal",
+            compat="override",
+            join="override",
+        )
+    indices = np.concatenate([np.arange(run.start, run.stop) for run in runs]) if runs else np.array([], dtype=int)
+    return ds.isel({dim: indices})
+
+
 def resample_time(ds, timevar="time", time_quantity=1, time_unit="day", interp_irreg=False):
     """
     Convert a dataset to a new time resolution. Uses interpolation for upsampling and mean for downsampling.
@@ -307,8 +577,9 @@ def resample_time(ds, timevar="time", time_quantity=1, time_unit="day", interp_i
         Unit of time for the new time resolution, by default 'day'
     interp_irreg : bool, optional
         Determines how downsampling should happen in cases where the new time resolution is not an even multiple
-        of the time resolution of the input dataset. If true, the dataset will be interpolated to the greatest common
-        timedelta before downsampling is performed. By default False.
+        of the time resolution of the input dataset. If true, each new timestep will be calculated as the mean of the
+        input timesteps weighted by how much they overlap the new timestep (see :func:`resample_time_weighted`).
+        By default False.
 
     Returns
     -------
@@ -317,7 +588,10 @@ def resample_time(ds, timevar="time", time_quantity=1, time_unit="day", interp_i
     """
 
     resample_freq = pd.Timedelta(time_quantity, time_unit)
-    ds_freq = get_time_res(ds)
+    ds_freq = get_time_res(ds, timevar=timevar)
+
+    # Resampling works along time, so use chunks that are long in time
+    ds = rechunk_for(ds, "timeseries", timevar=timevar)
 
     if resample_freq == ds_freq:
         ds_resampled = ds
@@ -329,15 +603,181 @@ def resample_time(ds, timevar="time", time_quantity=1, time_unit="day", interp_i
     # Use mean for downsampling
     elif resample_freq > ds_freq:
         if interp_irreg and ((resample_freq % ds_freq) != pd.Timedelta(0)):
-            # Find greatest common divisor of the two time frequencies
-            gcd = np.gcd(resample_freq, ds_freq)
-            ds_resampled = ds.resample({timevar: gcd}).interpolate().resample({timevar: resample_freq}).mean()
+            ds_resampled = resample_time_weighted(ds, timevar=timevar, freq=resample_freq)
         else:
             ds_resampled = ds.resample({timevar: resample_freq}).mean()
 
     return ds_resampled
 
 
+def resample_time_weighted(ds, timevar="time", freq="1D"):
+    """
+    Resample a dataset to a new time resolution using an overlap-weighted mean.
+
+    Each input timestep is treated as an interval lasting until the next timestep, and each output timestep is the
+    mean of the input intervals overlapping it, weighted by the length of the overlap. Missing values are excluded
+    from the mean. This handles resolutions that aren't even multiples of each other (e.g. 16-day MODIS composites to
+    weekly timesteps) without interpolating to an intermediate, finer time resolution.
+
+    The weights are stored as a sparse matrix (output timesteps x input timesteps). The dataset is split along time
+    into parts covering whole output bins, with about as many input timesteps as its chunks, and the weights are
+    applied to each part, so dask-backed datasets stay lazy and aren't merged into a single chunk along time. Output
+    timesteps are labeled by the start of their interval, using the same bins as ``xarray.Dataset.resample``, and
+    variables without a time dimension are unchanged.
+
+    Parameters
+    ----------
+    ds : xarray.Dataset
+        Dataset to resample
+    timevar : str, optional
+        Label of time variable in the dataset, by default 'time'
+    freq : str or pandas.Timedelta, optional
+        Time resolution of the resampled dataset, by default '1D'
+
+    Returns
+    -------
+    xarray.Dataset
+        Resampled dataset
+    """
+    freq = pd.Timedelta(freq)
+    times = pd.DatetimeIndex(ds.indexes[timevar])
+
+    freq_ns = np.timedelta64(freq).astype("timedelta64[ns]").astype(np.int64)
+
+    # Input intervals: each timestep lasts until the next one, and the last one lasts as long as the previous one
+    source_edges = times.values.astype("datetime64[ns]").astype(np.int64)
+    last_step = source_edges[-1] - source_edges[-2] if len(source_edges) > 1 else freq_ns
+    source_edges = np.append(source_edges, source_edges[-1] + last_step)
+
+    # Output intervals: bins of length freq starting at midnight of the first day, covering all input timesteps
+    origin = times[0].floor("D")
+    n_bins = (times[-1] - origin) // freq + 1
+    target_times = pd.date_range(origin, periods=n_bins, freq=freq)
+    target_edges = target_times.values.astype("datetime64[ns]").astype(np.int64)
+    target_edges = np.append(target_edges, target_edges[-1] + freq_ns)
+
+    weights = overlap_weights(source_edges, target_edges)
+
+    ds = rechunk_for(ds, "timeseries", timevar=timevar)
+    resampled = {}
+    for name, da in ds.data_vars.items():
+        if timevar not in da.dims:
+            # Same as Dataset.resample, variables without time are unchanged
+            resampled[name] = da
+            continue
+        if not np.issubdtype(da.dtype, np.number):
+            continue
+        dtype = np.result_type(da.dtype, np.float32)
+        # Each part covers whole output bins, with about as many input timesteps as a chunk of the dataset
+        chunk_size = max(da.chunksizes[timevar]) if da.chunks is not None else len(times)
+        parts = []
+        for rows, cols in _overlap_groups(weights, chunk_size):
+            part = da.isel({timevar: cols}).astype(dtype)
+            if part.chunks is not None:
+                part = part.chunk({timevar: -1})
+            parts.append(
+                xr.apply_ufunc(
+                    _weighted_mean,
+                    part,
+                    kwargs={"weights": weights[rows, cols]},
+                    input_core_dims=[[timevar]],
+                    output_core_dims=[[timevar]],
+                    exclude_dims={timevar},
+                    dask="parallelized",
+                    output_dtypes=[dtype],
+                    dask_gufunc_kwargs={"output_sizes": {timevar: rows.stop - rows.start}},
+                    keep_attrs=True,
+                )
+            )
+        resampled[name] = xr.concat(parts, dim=timevar).transpose(*da.dims)
+
+    ds_resampled = xr.Dataset(resampled, attrs=ds.attrs)
+    ds_resampled = ds_resampled.assign_coords({timevar: target_times})
+    ds_resampled = ds_resampled.assign_coords(
+        {name: coord for name, coord in ds.coords.items() if timevar not in coord.dims}
+    )
+    return ds_resampled
+
+
+def _weighted_mean(data, weights):
+    """Mean of data along its last axis weighted by a sparse matrix (output x input), ignoring missing values"""
+    n_source = data.shape[-1]
+    flat = data.reshape(-1, n_source).T
+    valid = ~np.isnan(flat)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        if valid.all():
+            # The sum of the weights is the same for all the cells
+            result = (weights @ flat) / np.asarray(weights.sum(axis=1))
+        else:
+            result = (weights @ np.where(valid, flat, 0)) / (weights @ valid.astype(weights.dtype))
+    return result.T.reshape(data.shape[:-1] + (weights.shape[0],))
+
+
+def _overlap_groups(weights, chunk_size):
+    """
+    Split a matrix of overlap weights (output x input) into consecutive output rows, with the range of input columns
+    they overlap. Each group has about ``chunk_size`` columns, and at least one row and one column.
+    """
+    n_target, n_source = weights.shape
+    # Range of input columns of each output row, an empty row uses the column after the previous row
+    first = np.zeros(n_target, dtype=int)
+    stop = np.zeros(n_target, dtype=int)
+    previous = 0
+    for row in range(n_target):
+        columns = weights.indices[weights.indptr[row] : weights.indptr[row + 1]]
+        if len(columns):
+            first[row], stop[row] = columns.min(), columns.max() + 1
+        else:
+            first[row] = min(previous, n_source - 1)
+            stop[row] = first[row] + 1
+        previous = stop[row]
+
+    groups = []
+    start = 0
+    for row in range(1, n_target + 1):
+        if row == n_target or stop[row] - first[start] > chunk_size:
+            groups.append((slice(start, row), slice(first[start], stop[start:row].max())))
+            start = row
+    return groups
+
+
+def overlap_weights(source_edges, target_edges):
+    """
+    Sparse matrix of the overlap between two sets of consecutive intervals.
+
+    Parameters
+    ----------
+    source_edges : numpy.ndarray
+        Increasing edges of the source intervals (n_source + 1 values)
+    target_edges : numpy.ndarray
+        Increasing edges of the target intervals (n_target + 1 values)
+
+    Returns
+    -------
+    scipy.sparse.csr_matrix
+        Matrix of shape (n_target, n_source) with the length of the overlap of each target and source interval
+    """
+    source_edges = np.asarray(source_edges)
+    target_edges = np.asarray(target_edges)
+    n_source = len(source_edges) - 1
+    n_target = len(target_edges) - 1
+
+    # Range of target intervals overlapping each source interval
+    first = np.clip(np.searchsorted(target_edges, source_edges[:-1], side="right") - 1, 0, n_target)
+    last = np.clip(np.searchsorted(target_edges, source_edges[1:], side="left"), 0, n_target)
+    counts = np.maximum(last - first, 0)
+
+    rows = np.repeat(first, counts) + (np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts))
+    cols = np.repeat(np.arange(n_source), counts)
+    overlap = np.minimum(source_edges[1:][cols], target_edges[rows + 1]) - np.maximum(
+        source_edges[:-1][cols], target_edges[rows]
+    )
+    keep = overlap > 0
+    return sparse.csr_matrix(
+        (overlap[keep].astype(np.float64), (rows[keep], cols[keep])), shape=(n_target, n_source)
+    )
+
+
 def groupby_multi_time(ds, var, time="time", groupby_vars=None):
     """
     Groupby stats for multiple time groupings.
@@ -362,7 +802,7 @@ def groupby_multi_time(ds, var, time="time", groupby_vars=None):
         Dataset including summary statistics for the variable of interest.
     """
 
-    da = ds[var]
+    da = rechunk_for(ds[var], "timeseries", timevar=time)
 
     if groupby_vars:
         grouped_index = pd.MultiIndex.from_arrays(
@@ -447,6 +887,256 @@ def groupby_poly_time(
     return result
 
 
+# Encoding keys that only apply to netCDF files, and can't be used when writing to Zarr
+_netcdf_encoding_keys = (
+    "zlib",
+    "complevel",
+    "shuffle",
+    "fletcher32",
+    "contiguous",
+    "chunksizes",
+    "source",
+    "original_shape",
+    "compression",
+    "szip_coding",
+    "szip_pixels_per_block",
+    "endian",
+    "quantize_mode",
+    "significant_digits",
+    "blosc_shuffle",
+    "chunks",
+    "preferred_chunks",
+)
+
+
+def write_dataset(
+    ds,
+    outfile,
+    append_dim=None,
+    compression="zlib",
+    complevel=4,
+    shuffle=True,
+    pack=False,
+    access="map",
+    timevar="time",
+    encoding=None,
+    **kwargs,
+):
+    """
+    Write a dataset to a netCDF file, or to a Zarr store if the path ends with '.zarr'.
+
+    The data variables are written using the encoding from :func:`encoding_policy` (compression, chunking, and
+    optionally packing to 16-bit integers). Encodings passed with ``encoding`` take precedence over the policy. All
+    the files written by ecodata go through this function, so they are compressed with zlib (level 4) unless
+    ``compression=None`` is passed.
+
+    Zarr stores are written with consolidated metadata (so they open quickly), and dask-backed datasets are written
+    in parallel, one task per chunk. Zarr stores can also be appended to along a dimension, so new timesteps can be
+    added to an existing store without rewriting it. Zarr stores use Zarr's default compressor and the dask chunks of
+    the dataset, so only the packing part of the policy applies to them.
+
+    Parameters
+    ----------
+    ds : xarray.Dataset
+        Dataset to write
+    outfile : str or pathlib.Path
+        Path of the output file. Use the '.zarr' extension to write a Zarr store.
+    append_dim : str, optional
+        Dimension to append along (e.g. 'time') if the Zarr store already exists. If the store doesn't exist yet, it
+        is created. Only supported for Zarr stores. By default None, which overwrites any existing file. Appended
+        data is encoded like the data in the store: if it was packed, a ValueError is raised for values outside of
+        the packed range.
+    compression : str or None, optional
+        Compression for netCDF files, 'zlib', 'zstd' or None. By default 'zlib'.
+    complevel : int, optional
+        Compression level, from 1 (fastest) to 9 (smallest) for zlib, or to 22 for zstd, by default 4
+    shuffle : bool, optional
+        Whether to apply the shuffle filter before compression, by default True
+    pack : bool, optional
+        Whether to pack floating point variables into 16-bit integers, by default False
+    access : str, optional
+        Expected access pattern of the file, used to choose the chunk sizes in netCDF files. Either 'map' (reading
+        maps at single timesteps) or 'timeseries' (reading long time series at single locations). By default 'map'.
+    timevar : str, optional
+        Label of the time dimension in the dataset, by default 'time'
+    encoding : dict, optional
+        Encoding for each variable, overriding the policy
+    **kwargs :
+        Additional arguments to be passed to xarray.Dataset.to_netcdf or xarray.Dataset.to_zarr
+
+    Returns
+    -------
+    pathlib.Path
+        Path of the output file
+    """
+    outfile = Path(outfile)
+    is_zarr = outfile.suffix == ".zarr"
+
+    if is_zarr:
+        # Zarr chunks must be uniform, and encodings from netCDF sources don't apply
+        ds = rechunk_for(ds, "save", timevar=append_dim or timevar)
+        ds = ds.copy()
+        for var in ds.variables.values():
+            for key in _netcdf_encoding_keys:
+                var.encoding.pop(key, None)
+
+    appending = is_zarr and append_dim is not None and outfile.exists()
+    if appending:
+        # The encoding of an existing store can't be changed, so the new data is packed like the stored data
+        _check_packed_range(ds, outfile)
+        write_encoding = {}
+    else:
+        write_encoding = encoding_policy(
+            ds,
+            compression=None if is_zarr else compression,
+            complevel=complevel,
+            shuffle=shuffle,
+            pack=pack,
+            access=None if is_zarr else access,
+            timevar=timevar,
+        )
+    for name, var_encoding in (encoding or {}).items():
+        write_encoding.setdefault(name, {}).update(var_encoding)
+
+    if is_zarr:
+        if appending:
+            ds.to_zarr(outfile, append_dim=append_dim, consolidated=True, **kwargs)
+        else:
+            ds.to_zarr(outfile, mode="w", consolidated=True, encoding=write_encoding, **kwargs)
+    else:
+        if append_dim is not None:
+            raise ValueError("write_dataset: append_dim is only supported for Zarr stores (.zarr).")
+        ds.to_netcdf(outfile, encoding=write_encoding, **kwargs)
+
+    return outfile
+
+
+def _check_packed_range(ds, store):
+    """Raise if the data appended to a Zarr store doesn't fit in the packed integers of the stored variables"""
+    with xr.open_zarr(store) as stored:
+        packed = {
+            name: stored[name].encoding
+            for name in ds.data_vars
+            if name in stored
+            and "scale_factor" in stored[name].encoding
+            and np.issubdtype(np.dtype(stored[name].encoding.get("dtype", "float64")), np.integer)
+        }
+    if not packed:
+        return
+
+    # Compute the ranges of all variables together, so the data is only read once
+    values = dask.compute(*[ds[name].min() for name in packed], *[ds[name].max() for name in packed])
+    for i, (name, encoding) in enumerate(packed.items()):
+        info = np.iinfo(np.dtype(encoding["dtype"]))
+        lowest = info.min + 1 if encoding.get("_FillValue") == info.min else info.min
+        scale_factor, add_offset = encoding["scale_factor"], encoding.get("add_offset", 0.0)
+        # Values up to half a step outside the range are rounded to its ends
+        low = add_offset + (lowest - 0.5) * scale_factor
+        high = add_offset + (info.max + 0.5) * scale_factor
+        vmin, vmax = float(values[i]), float(values[i + len(packed)])
+        if vmin < low or vmax > high:
+            raise ValueError(
+                f"write_dataset: values of {name} ({vmin} to {vmax}) are outside of the range of the packed values "
+                f"in {store} ({low} to {high}). Write them to a new store instead of appending."
+            )
+
+
+# Size of the chunks in netCDF files, in bytes
+DEFAULT_FILE_CHUNK_MEMORY = 4 * 2**20
+
+# Range of compression levels of each compression, from the fastest to the smallest
+COMPRESSION_LEVELS = {"zlib": (1, 9), "zstd": (1, 22)}
+
+
+def encoding_policy(
+    ds,
+    compression="zlib",
+    complevel=4,
+    shuffle=True,
+    pack=False,
+    access="map",
+    timevar="time",
+    chunk_memory=DEFAULT_FILE_CHUNK_MEMORY,
+):
+    """
+    Build the encoding for writing the data variables of a dataset to a netCDF file.
+
+    Parameters
+    ----------
+    ds : xarray.Dataset
+        Dataset to write
+    compression : str or None, optional
+        Compression, 'zlib', 'zstd' or None. By default 'zlib'.
+    complevel : int, optional
+        Compression level, from 1 (fastest) to 9 (smallest) for zlib, or to 22 for zstd, by default 4
+    shuffle : bool, optional
+        Whether to apply the shuffle filter before compression, by default True
+    pack : bool, optional
+        Whether to pack floating point variables into 16-bit integers, using a ``scale_factor`` and ``add_offset``
+        computed from the range of each variable. This reduces the precision of the data to 1/65534 of its range.
+        By default False.
+    access : str or None, optional
+        Expected access pattern, used to choose the chunk sizes. Either 'map' (reading maps at single timesteps),
+        'timeseries' (reading long time series at single locations), or None to not set chunk sizes.
+        By default 'map'.
+    timevar : str, optional
+        Label of the time dimension in the dataset, by default 'time'
+    chunk_memory : int, optional
+        Maximum size of one chunk in the file, in bytes. By default 4 MiB.
+
+    Returns
+    -------
+    dict
+        Encoding for each data variable, to be passed to xarray.Dataset.to_netcdf
+    """
+    if compression not in (None, "zlib", "zstd"):
+        raise ValueError(f"encoding_policy: compression must be 'zlib', 'zstd' or None, not {compression!r}")
+    if compression is not None:
+        low, high = COMPRESSION_LEVELS[compression]
+        if not low <= complevel <= high:
+            raise ValueError(
+                f"encoding_policy: complevel of {compression} must be between {low} and {high}, not {complevel}"
+            )
+    if access not in (None, "map", "timeseries"):
+        raise ValueError(f"encoding_policy: access must be 'map', 'timeseries' or None, not {access!r}")
+
+    to_pack = [name for name, var in ds.data_vars.items() if pack and np.issubdtype(var.dtype, np.floating)]
+    ranges = {}
+    if to_pack:
+        # Compute the ranges of all variables together, so the data is only read once
+        mins = [ds[name].min() for name in to_pack]
+        maxs = [ds[name].max() for name in to_pack]
+        values = dask.compute(*mins, *maxs)
+        ranges = {name: (float(values[i]), float(values[i + len(to_pack)])) for i, name in enumerate(to_pack)}
+
+    encoding = {}
+    for name, var in ds.data_vars.items():
+        var_encoding = {}
+
+        if compression == "zlib":
+            var_encoding.update(zlib=True, complevel=complevel, shuffle=shuffle)
+        elif compression == "zstd":
+            var_encoding.update(compression="zstd", complevel=complevel, shuffle=shuffle)
+
+        if access is not None and var.ndim > 0:
+            chunks = plan_chunks(var, access, timevar=timevar, chunk_memory=chunk_memory)
+            var_encoding.update(chunksizes=tuple(chunks[dim] for dim in var.dims), contiguous=False)
+
+        if name in ranges and np.isfinite(ranges[name]).all():
+            vmin, vmax = ranges[name]
+            # Reserve the smallest int16 value for missing values
+            scale_factor = (vmax - vmin) / (2**16 - 2) if vmax > vmin else 1.0
+            var_encoding.update(
+                dtype="int16",
+                scale_factor=scale_factor,
+                add_offset=(vmax + vmin) / 2,
+                _FillValue=np.iinfo(np.int16).min,
+            )
+
+        encoding[name] = var_encoding
+    return encoding
+
+
 def set_time_encoding_modis(ds):
     """
     Change the time encoding of a dataset to the encoding used in MODIS data (days since 2000-01-01).